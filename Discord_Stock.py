@@ -1,27 +1,48 @@
+import time  # 추가: 파일의 수정 시간을 확인하기 위한 모듈
+STARTUP_STARTED = time.perf_counter()  # 시작 시간 측정 기준 (아래 모듈들을 불러오는 시간까지 포함)
+
+import asyncio
 import discord
-import yfinance as yf
-import os
-import matplotlib.pyplot as plt
 import io
+import os
+import atexit
 import logging
-from logging.handlers import TimedRotatingFileHandler
+import queue
+import threading
+from logging.handlers import QueueHandler, QueueListener, TimedRotatingFileHandler
 from discord.ext import commands
-from apscheduler.schedulers.asyncio import AsyncIOScheduler
 from datetime import time as dt_time
 from datetime import datetime, timedelta
 from dotenv import load_dotenv
 
+# pandas/numpy를 쓰는 모듈(가격 캐시, 지표, 규칙, 차트, 데이터 제공자)과 APScheduler는 load_services()에서 불러옴
+from command_cache import CommandCache
+from executor import BlockingExecutor
+from news_store import SentNewsStore
+from outbound import Outbound
+from pipeline import OK, JobRunStore, Pipeline, Stage, latest_fire_time, missed_fire_time
+from market_hours import is_market_open
+from metrics import MetricsRegistry, start_http_server
+from profiling import Profiler
+from ratelimit import TokenBucket
+from subscriptions import CHANNEL_SUBSCRIBER, SubscriptionStore, plan_tickers
+
 import glob  # 추가: 파일 목록을 가져오기 위한 모듈
+import gzip  # 오래된 로그 파일 압축
 import shutil  # 추가: 파일 이동을 위한 모듈
-import time  # 추가: 파일의 수정 시간을 확인하기 위한 모듈
-import json  # 추가: JSON 파일 처리를 위한 모듈
+
+load_dotenv()
 
 # 로깅 설정
 class CustomTimedRotatingFileHandler(TimedRotatingFileHandler):
-    def __init__(self, *args, **kwargs):
+    def __init__(self, *args, metrics=None, **kwargs):
         super(CustomTimedRotatingFileHandler, self).__init__(*args, **kwargs)
-        self.total_data_sent = 0  # 하루 동안 전송된 데이터의 총량을 저장
-        self.total_data_received = 0  # 하루 동안 수신된 데이터의 총량을 저장
+        # 주고받은 데이터 양과 로그 레벨별 개수는 지표 저장소에 누적 (재시작해도 유지됨)
+        self.metrics = metrics if metrics is not None else MetricsRegistry()
+        self.data_bytes = self.metrics.counter('bot_data_bytes_total', 'Bytes sent and received by the bot')
+        self.data_bytes_at_rollover = self.metrics.gauge('bot_data_bytes_at_rollover', 'bot_data_bytes_total at the last log rollover')
+        self.log_records = self.metrics.counter('bot_log_records_total', 'Log records by level')
+        self._archiver = None  # 오래된 로그 파일을 정리하는 스레드
 
         # 추가: old_log 폴더 경로 설정
         self.old_log_dir = os.path.join(os.path.dirname(self.baseFilename), 'old_log')
@@ -31,30 +52,34 @@ class CustomTimedRotatingFileHandler(TimedRotatingFileHandler):
 
     def emit(self, record):
         super(CustomTimedRotatingFileHandler, self).emit(record)
+        self.log_records.inc(level=record.levelname)
         if hasattr(record, 'data_size'):
-            direction = getattr(record, 'direction', 'output')  # 기본값은 'output'
-            if direction == 'input':
-                self.total_data_received += record.data_size
-            else:
-                self.total_data_sent += record.data_size
+            direction = 'input' if getattr(record, 'direction', 'output') == 'input' else 'output'  # 기본값은 'output'
+            self.data_bytes.inc(int(record.data_size), direction=direction)
 
     def doRollover(self):
         # 부모 클래스의 doRollover() 호출로 로그 파일 회전
         super(CustomTimedRotatingFileHandler, self).doRollover()
-        # 새로운 로그 파일에 어제 전송한 데이터 총량 기록
+        # 새로운 로그 파일에 어제 전송한 데이터 총량 기록 (누적값과 지난 회전 시점 값의 차이)
+        totals = {direction: self.data_bytes.get(direction=direction) for direction in ('output', 'input')}
+        daily = {direction: total - self.data_bytes_at_rollover.get(direction=direction) for direction, total in totals.items()}
         if self.stream:
-            self.stream.write(f"어제 전송된 총 데이터 양: {self.total_data_sent} bytes\n")
-            self.stream.write(f"어제 수신된 총 데이터 양: {self.total_data_received} bytes\n")
+            self.stream.write(f"어제 전송된 총 데이터 양: {daily['output']} bytes\n")
+            self.stream.write(f"어제 수신된 총 데이터 양: {daily['input']} bytes\n")
             self.stream.flush()
-        # 데이터 총량 초기화
-        self.total_data_sent = 0
-        self.total_data_received = 0
+        # 다음 회전 때 하루치를 계산할 기준값 저장
+        for direction, total in totals.items():
+            self.data_bytes_at_rollover.set(total, direction=direction)
+        if self.metrics.path is not None:
+            self.metrics.save()
 
-        # 추가: 오래된 로그 파일 이동
-        self.move_old_logs()
+        # 추가: 오래된 로그 파일 이동 (디렉토리 검색과 압축이 로그 기록을 막지 않도록 별도 스레드에서 실행)
+        if self._archiver is None or not self._archiver.is_alive():
+            self._archiver = threading.Thread(target=self.move_old_logs, name='log-archiver', daemon=True)
+            self._archiver.start()
 
     def move_old_logs(self):
-        """2주(14일) 이상된 로그 파일을 old_log 폴더로 이동"""
+        """2주(14일) 이상된 로그 파일을 gzip으로 압축하여 old_log 폴더로 이동"""
         log_dir = os.path.dirname(self.baseFilename)
         if not log_dir:
             log_dir = '.'
@@ -71,8 +96,13 @@ class CustomTimedRotatingFileHandler(TimedRotatingFileHandler):
             # 파일이 14일(14 * 86400초)보다 오래되었는지 확인
             if (current_time - file_mtime) > (14 * 86400):
                 try:
-                    # 파일을 old_log 폴더로 이동
-                    shutil.move(log_file, self.old_log_dir)
+                    # 압축 파일을 임시 이름으로 만든 뒤 교체하고 원본 삭제 (중간에 종료되어도 원본은 남음)
+                    target = os.path.join(self.old_log_dir, os.path.basename(log_file) + '.gz')
+                    with open(log_file, 'rb') as src, gzip.open(target + '.tmp', 'wb') as dst:
+                        shutil.copyfileobj(src, dst)
+                    os.replace(target + '.tmp', target)
+                    os.utime(target, (file_mtime, file_mtime))
+                    os.remove(log_file)
                     logging.info(f"Moved old log file to {self.old_log_dir}: {log_file}")
                 except Exception as e:
                     logging.error(f"Failed to move old log file {log_file}: {e}")
@@ -82,29 +112,102 @@ class CustomTimedRotatingFileHandler(TimedRotatingFileHandler):
         """로그 파일의 접두사를 반환"""
         return os.path.basename(self.baseFilename).split('.')[0]
 
-logger = logging.getLogger()
-logger.setLevel(logging.INFO)
 
-# 핸들러 설정 (매일 자정에 로그 파일 갱신)
-handler = CustomTimedRotatingFileHandler('bot.log', when='midnight', interval=1, atTime=dt_time(20, 0), encoding='utf-8')
-handler.suffix = "%Y%m%d"  # 로그 파일명에 날짜 추가
-handler.setFormatter(logging.Formatter('%(asctime)s %(levelname)s:%(message)s'))
-logger.addHandler(handler)
+class DeferredQueueHandler(QueueHandler):
+    """로그 레코드를 대기열에 넣기만 하는 핸들러 (포맷팅과 파일/콘솔 출력은 QueueListener 스레드에서 수행)"""
 
-# 콘솔 출력 핸들러 추가
-console_handler = logging.StreamHandler()
-console_handler.setFormatter(logging.Formatter('%(asctime)s %(levelname)s:%(message)s'))
-logger.addHandler(console_handler)
+    def prepare(self, record):
+        # 기본 구현은 호출한 스레드에서 포맷팅까지 하므로, 메시지 인자만 적용하고 나머지는 리스너 스레드로 넘김
+        record = logging.makeLogRecord(record.__dict__)
+        record.msg = record.getMessage()
+        record.args = None
+        return record
 
-load_dotenv()
 
-# 디스코드 봇 토큰
-TOKEN = os.getenv('DISCORD_TOKEN')
-CHANNEL_ID = 1272735912148861011  # 메세지를 보낼 디스코드 채널 ID를 입력하세요
+# 운영 지표 저장소 (명령어/작업 지연 시간, 다운로드 시간, 오류 수, 주고받은 데이터 양)
+METRICS_FILE = 'metrics.json'  # 재시작해도 누적값이 유지되도록 저장하는 파일
+METRICS_HOST = '127.0.0.1'  # Prometheus 형식 지표를 제공할 로컬 주소
+METRICS_PORT = 9108
+METRICS_SAVE_INTERVAL = 5  # 지표 파일 저장 주기(분)
+
+metrics = MetricsRegistry()  # 저장된 누적값은 setup()에서 METRICS_FILE을 읽어 이어감
+
+# 프로파일링 모드 (켜면 작업/명령어마다 단계별 벽시계/CPU 시간과 스택 샘플을 bot.log 옆 폴더에 저장, !프로파일로 켜고 끔)
+PROFILING_ENABLED = os.getenv('PROFILING', '0') == '1'
+PROFILE_DIR = 'profiles'  # 실행별 요약 표(.txt)와 플레임 그래프용 접힌 스택(.folded)을 저장할 폴더
+PROFILE_SAMPLE_INTERVAL = 0.02  # 스택 샘플링 주기(초), 0이면 단계별 시간만 기록 (짧을수록 GIL을 자주 잡아 작업이 느려짐)
+PROFILE_MIN_SECONDS = 0.5  # 이보다 빨리 끝난 작업/명령어는 저장하지 않음 (매분 실행하는 장중 조회 등)
+PROFILE_MAX_RUNS = 200  # 보관할 최대 실행 기록 수 (넘으면 오래된 것부터 삭제)
 
-if TOKEN is None:
-    logging.error("DISCORD_TOKEN is not set. Check your .env file.")
-    raise ValueError("DISCORD_TOKEN is not set. Check your .env file.")
+profiler = Profiler(PROFILE_DIR, enabled=PROFILING_ENABLED, sample_interval=PROFILE_SAMPLE_INTERVAL,
+                    min_seconds=PROFILE_MIN_SECONDS, max_runs=PROFILE_MAX_RUNS)
+metrics.profiler = profiler  # metrics.timer로 재는 작업, 명령어, 단계를 그대로 구간으로 기록
+
+# 로그 핸들러 (setup_logging()에서 만듦, 차트/샤드 워커 프로세스가 이 파일을 다시 불러올 때는 만들지 않음)
+handler = None
+console_handler = None
+log_listener = None
+
+
+def setup_logging():
+    global handler, console_handler, log_listener
+    if log_listener is not None:
+        return
+    logger = logging.getLogger()
+    logger.setLevel(logging.INFO)
+
+    # 이벤트 루프에서는 대기열에 넣기만 하고, 실제 기록은 백그라운드 리스너 스레드에서 처리
+    # (핸들러를 만드는 중에 남기는 로그도 대기열에 쌓였다가 리스너가 시작되면 기록됨)
+    log_queue = queue.SimpleQueue()
+    logger.addHandler(DeferredQueueHandler(log_queue))
+
+    # 핸들러 설정 (매일 자정에 로그 파일 갱신)
+    handler = CustomTimedRotatingFileHandler('bot.log', when='midnight', interval=1, atTime=dt_time(20, 0), encoding='utf-8', metrics=metrics)
+    handler.suffix = "%Y%m%d"  # 로그 파일명에 날짜 추가
+    handler.setFormatter(logging.Formatter('%(asctime)s %(levelname)s:%(message)s'))
+
+    # 콘솔 출력 핸들러 추가
+    console_handler = logging.StreamHandler()
+    console_handler.setFormatter(logging.Formatter('%(asctime)s %(levelname)s:%(message)s'))
+
+    log_listener = QueueListener(log_queue, handler, console_handler, respect_handler_level=True)
+    log_listener.start()
+    atexit.register(log_listener.stop)  # 종료 시 대기열에 남은 로그까지 기록
+
+
+# 지표 누적값 파일을 읽어 이어서 집계 (이후에 등록되는 지표부터 저장된 값을 이어받음)
+def open_metrics():
+    if metrics.path is not None:
+        return
+    metrics.path = METRICS_FILE
+    if os.path.exists(METRICS_FILE):
+        metrics.load()
+
+# 디스코드 봇 토큰 (봇 실행 시 확인하므로 벤치마크 등에서는 토큰 없이 모듈을 불러올 수 있음)
+TOKEN = os.getenv('DISCORD_TOKEN')
+CHANNEL_ID = 1272735912148861011  # 이전 단일 알림 채널 (watchlist.txt의 관심종목을 이 채널의 구독으로 옮김)
+
+# 시세/뉴스 데이터 제공자: 'yahoo', 'synthetic', 'fixture:<폴더>', 'record:<폴더>'
+DATA_PROVIDER = os.getenv('DATA_PROVIDER', 'yahoo')
+
+# 외부 데이터 요청 설정 (일시적인 오류는 재시도하고, 429 응답이면 동시 요청 수를 줄이고,
+# 연속으로 실패하면 잠시 요청을 멈추고 캐시된 데이터로 응답)
+UPSTREAM_RETRIES = 3  # 요청 한도 초과/네트워크 오류 재시도 횟수
+UPSTREAM_BACKOFF = 1.0  # 첫 재시도 대기 시간(초), 재시도마다 두 배 (무작위로 최대 절반까지 줄임)
+UPSTREAM_MAX_BACKOFF = 30.0
+UPSTREAM_CONCURRENCY = 8  # 동시에 보내는 최대 요청 수 (묶음 다운로드의 티커 스레드와 뉴스 조회를 합친 수)
+UPSTREAM_FAILURE_THRESHOLD = 5  # 이만큼 연속으로 실패하면 요청을 멈춤
+UPSTREAM_RESET_TIMEOUT = 120  # 요청을 멈추는 시간(초), 지나면 요청 하나로 회복 여부 확인
+UPSTREAM_CONFIG = {
+    'retries': UPSTREAM_RETRIES,
+    'backoff': UPSTREAM_BACKOFF,
+    'max_backoff': UPSTREAM_MAX_BACKOFF,
+    'concurrency': UPSTREAM_CONCURRENCY,
+    'failure_threshold': UPSTREAM_FAILURE_THRESHOLD,
+    'reset_timeout': UPSTREAM_RESET_TIMEOUT,
+}
+
+data_provider = None  # upstream.UpstreamClient (load_services()에서 만듦)
 
 # 인텐트 설정
 intents = discord.Intents.default()
@@ -113,32 +216,505 @@ intents.message_content = True  # 메시지 내용 인텐트 활성화
 # Bot 객체 생성
 bot = commands.Bot(command_prefix="!", intents=intents)
 
-# 스케줄러 초기화
-scheduler = AsyncIOScheduler()
+# 스케줄러 (load_services()에서 만들고 start_services()에서 시작)
+scheduler = None
+
+# 관심종목 구독 (서버/채널별 관심종목과 채널 안 사용자별 관심종목)
+SUBSCRIPTIONS_DB = 'subscriptions.db'
+WATCHLIST_FILE = 'watchlist.txt'  # 이전 형식의 관심종목 파일 (시작 시 SUBSCRIPTIONS_DB로 옮김)
+SENT_NEWS_FILE = 'sent_news.json'  # 추가: 전송된 뉴스 저장 파일 (이전 형식, 시작 시 SENT_NEWS_DB로 옮김)
+SENT_NEWS_DB = 'sent_news.db'  # 전송된 뉴스 기록 데이터베이스
+NEWS_WINDOW_DAYS = 7  # 최근 며칠 동안의 뉴스를 전송할지 (지난 기록은 자동 삭제)
+NEWS_CONCURRENCY = 8  # 동시에 조회할 티커 뉴스 수
+
+# 구독/전송한 뉴스 저장소 (모듈을 불러오기만 해서는 파일을 만들거나 옮기지 않도록 시작할 때 open_stores()에서 엶)
+sent_news = None
+subscriptions = None
+
+# 가격 데이터 캐시 설정
+PRICE_CACHE_DIR = 'price_cache'  # OHLCV 데이터를 저장할 폴더
+PRICE_CACHE_MAX_AGE = 30 * 60  # 이 시간(초) 이내에 갱신된 데이터는 다시 다운로드하지 않음
+PRICE_CACHE_MAX_BYTES = 200 * 1024 * 1024  # 캐시 폴더 최대 크기 (초과 시 오래된 항목부터 삭제)
+PRICE_CACHE_FLOAT_DTYPE = 'float64'  # 저장할 가격 형식 ('float32'면 용량이 절반이지만 유효숫자 약 7자리)
+PRICE_BATCH_SIZE = 50  # 한 번의 다중 티커 요청에 포함할 최대 티커 수
+FETCH_CONCURRENCY = 8  # 묶음 요청 안에서 동시에 다운로드할 티커 수
+YAHOO_RATE = 5  # Yahoo로 보내는 초당 티커 요청 수
+YAHOO_BURST = PRICE_BATCH_SIZE  # 한 번에 몰아서 보낼 수 있는 최대 요청 수
+
+price_cache = None  # load_services()에서 만듦
+
+# 블로킹 작업 실행 설정 (이벤트 루프가 멈추지 않도록 별도 스레드에서 실행)
+IO_WORKERS = 8  # yfinance 다운로드/뉴스 조회 동시 실행 수
+IO_TIMEOUT = 120  # 다운로드 작업 하나당 제한 시간(초)
+
+io_executor = BlockingExecutor('io', max_workers=IO_WORKERS, timeout=IO_TIMEOUT)
+
+# 차트 렌더링 설정 (워커 프로세스 풀에서 렌더링하고 결과 PNG는 캐시)
+CHART_WORKERS = 2  # 차트 렌더링 워커 프로세스 수
+CHART_TIMEOUT = 30  # 차트 렌더링 하나당 제한 시간(초)
+CHART_CACHE_DIR = 'chart_cache'  # 렌더링한 차트를 저장할 폴더
+CHART_CACHE_MAX_FILES = 500  # 캐시에 보관할 최대 차트 수
+
+# 관심종목 처리 설정
+WATCHLIST_CONCURRENCY = 16  # 동시에 분석/차트 렌더링할 티커 수
+DISCORD_SEND_RATE = 1  # 채널로 보내는 초당 메시지 수 (디스코드 채널 제한: 5초에 5개)
+DISCORD_SEND_BURST = 5
+
+# 모든 정기 알림은 outbound를 거쳐 레코드 경계에서 묶어 보내고 채널별 전송 속도 제한을 지킴
+outbound = Outbound(rate=DISCORD_SEND_RATE, burst=DISCORD_SEND_BURST)
+
+# 관심종목 이동평균선 기간 (메시지, 크로스 판별, 차트에 공통 사용)
+WATCHLIST_MA_WINDOWS = (20, 50, 100, 200)
+RSI_PERIOD = 14
+
+# 티커별 지표 누적 상태 (새 일봉만 반영하여 이동평균선/RSI 갱신)
+INDICATOR_STATE_FILE = 'indicator_state.json'
+indicator_state = None  # load_services()에서 만듦
+chart_renderer = None
+# 지표 상태에서 바로 읽을 수 있는 지표 이름
+STATE_INDICATORS = {'close', f'rsi{RSI_PERIOD}'} | {f'sma{window}' for window in WATCHLIST_MA_WINDOWS}
+
+# 매수/매도 및 관심종목 알림 신호 규칙 (load_services()에서 한 번 읽어서 컴파일)
+SIGNAL_RULES_FILE = 'signal_rules.json'
+signal_rule_list = None
+# 티커를 지정한 규칙은 매수/매도 신호 알림, 'watchlist' 규칙은 관심종목 점검에 사용
+alert_rules = None
+watchlist_rules = None
+
+# 명령어 결과 캐시 설정 (장 마감 후에는 다음 장 시작까지 마지막 완성 봉 기준 결과를 재사용)
+COMMAND_CACHE_TTL = 60  # 장중 결과 재사용 시간(초)
+COMMAND_CACHE_MAX_ENTRIES = 1000
+COMMAND_CACHE_SETTLE = PRICE_CACHE_MAX_AGE + 5 * 60  # 장 마감 후 가격 캐시의 마감 전 데이터가 모두 갱신될 때까지(초)
+
+command_cache = CommandCache(open_ttl=COMMAND_CACHE_TTL, max_entries=COMMAND_CACHE_MAX_ENTRIES, settle=COMMAND_CACHE_SETTLE)
+
+# 장중 감시 설정 (정규장 동안 분봉을 주기적으로 받아 신호 규칙을 바로 평가)
+INTRADAY_ENABLED = True
+INTRADAY_INTERVAL = 60  # 분봉 조회 주기(초)
+INTRADAY_ALERT_COOLDOWN = 30 * 60  # 같은 규칙의 반대 방향 알림을 다시 보내기까지 최소 간격(초)
+INTRADAY_RESUME_GROUP = 5 * 60  # 마지막으로 본 분봉 시각을 이 간격(초)으로 묶어 묶음마다 한 번씩 요청
+
+intraday_monitor = None  # load_services()에서 만듦
+
+# 백테스트 설정
+BACKTEST_PERIOD = '10y'  # 백테스트에 사용할 일봉 기간
+BACKTEST_HORIZON = 20  # 신호 적중 여부를 판단할 신호 이후 봉 수
+BACKTEST_WORKERS = os.cpu_count() or 1  # 규칙을 나누어 계산할 프로세스 수
+BACKTEST_TIMEOUT = 600  # 다운로드/계산 단계별 제한 시간(초)
+
+# 스크리너 설정 (로컬 가격 저장소의 모든 일봉으로 최근 거래일 지표 표를 미리 만들어두고 조회)
+SCREENER_TABLE_FILE = 'screener_table.npz'  # 미리 계산한 지표 표 (재시작 후 바로 조회할 수 있도록 저장)
+SCREENER_UNIVERSE_FILE = 'screener_universe.txt'  # 표를 만들기 전에 갱신할 티커 목록 (한 줄에 하나, 없으면 저장된 티커만 사용)
+SCREENER_PERIOD = '1y'  # 스크리너 대상 티커를 갱신할 때 받아둘 기간 (200일선 계산에 충분한 기간)
+SCREENER_MAX_RESULTS = 30  # 한 번에 출력할 최대 종목 수
+SCREENER_TIMEOUT = 3600  # 표 생성 제한 시간(초)
+
+screener_table = None  # 가장 최근에 만든 screener.ScreenerTable (처음 조회할 때 파일에서 읽음)
+
+# 저녁 정기 작업 설정 (가격 갱신 -> 지표 -> 알림/종가/관심종목/뉴스 -> 스크리너/정리를 의존 관계 순서로 한 번에 실행)
+EVENING_SCHEDULE = {'day_of_week': 'mon-fri', 'hour': 20, 'minute': 15}  # CronTrigger 설정
+evening_trigger = None  # load_services()에서 만듦
+JOB_RUNS_DB = 'job_runs.db'  # 정기 작업 실행 기록 (재시작 후 놓친 실행 확인)
+MISSED_RUN_GRACE = 20 * 3600  # 재시작 후 이 시간(초) 안에 놓친 실행만 다시 실행 (그보다 오래되면 다음 실행을 기다림)
+
+job_runs = None  # open_stores()에서 엶
+
+
+# SQLite 저장소를 열고 이전 형식 파일(watchlist.txt, sent_news.json)을 옮김 (시작할 때 한 번, 여러 번 호출해도 한 번만 실행)
+def open_stores():
+    global sent_news, subscriptions, job_runs
+    if job_runs is not None:
+        return
+    sent_news = SentNewsStore(SENT_NEWS_DB, retention_days=NEWS_WINDOW_DAYS)
+    sent_news.migrate_legacy(SENT_NEWS_FILE)
+    subscriptions = SubscriptionStore(SUBSCRIPTIONS_DB)
+    subscriptions.migrate_legacy(WATCHLIST_FILE, CHANNEL_ID)
+    job_runs = JobRunStore(JOB_RUNS_DB)
+
+
+services_loaded = False
+services_lock = threading.Lock()
+
+
+# pandas/numpy를 쓰는 서비스(데이터 제공자, 가격 캐시, 지표 상태, 차트, 신호 규칙, 장중 감시)와 스케줄러를 만듦
+# (여러 번/여러 스레드에서 호출해도 한 번만 실행, main()은 로그인하는 동안 별도 스레드에서 미리 호출)
+def load_services():
+    global services_loaded, data_provider, price_cache, indicator_state, chart_renderer
+    global signal_rule_list, alert_rules, watchlist_rules, intraday_monitor, scheduler, evening_trigger
+    with services_lock:
+        if services_loaded:
+            return
+        from apscheduler.schedulers.asyncio import AsyncIOScheduler
+        from apscheduler.triggers.cron import CronTrigger
+        from chart_renderer import ChartRenderer
+        from data_provider import make_provider
+        from indicator_state import IndicatorStateStore
+        from intraday import IntradayMonitor
+        from price_cache import PriceCache
+        from signal_rules import WATCHLIST, RuleEngine, load_rules
+        from upstream import UpstreamClient
+
+        data_provider = UpstreamClient(make_provider(DATA_PROVIDER), metrics=metrics, **UPSTREAM_CONFIG)
+        price_cache = PriceCache(PRICE_CACHE_DIR, max_age=PRICE_CACHE_MAX_AGE, max_bytes=PRICE_CACHE_MAX_BYTES,
+                                 max_concurrency=FETCH_CONCURRENCY, rate_limiter=TokenBucket(YAHOO_RATE, YAHOO_BURST),
+                                 metrics=metrics, provider=data_provider, float_dtype=PRICE_CACHE_FLOAT_DTYPE)
+        indicator_state = IndicatorStateStore(INDICATOR_STATE_FILE, windows=WATCHLIST_MA_WINDOWS, rsi_period=RSI_PERIOD)
+        chart_renderer = ChartRenderer(CHART_CACHE_DIR, windows=WATCHLIST_MA_WINDOWS, max_workers=CHART_WORKERS,
+                                       timeout=CHART_TIMEOUT, max_files=CHART_CACHE_MAX_FILES)
+        signal_rule_list = load_rules(SIGNAL_RULES_FILE)
+        alert_rules = RuleEngine(rule for rule in signal_rule_list if rule.tickers != WATCHLIST)
+        watchlist_rules = RuleEngine(rule for rule in signal_rule_list if rule.tickers == WATCHLIST)
+        intraday_monitor = IntradayMonitor(signal_rule_list, windows=WATCHLIST_MA_WINDOWS, rsi_period=RSI_PERIOD,
+                                           cooldown=INTRADAY_ALERT_COOLDOWN)
+        evening_trigger = CronTrigger(**EVENING_SCHEDULE)
+        scheduler = AsyncIOScheduler()
+        services_loaded = True
+    record_startup('services')
+
+
+# 로그인과 동시에 서비스를 미리 만듦 (실패하면 start_services()에서 다시 시도하여 오류를 냄)
+def preload_services():
+    try:
+        load_services()
+    except Exception as e:
+        logging.error(f"Failed to preload services: {e!r}")
 
-# 관심 종목 리스트
-WATCHLIST_FILE = 'watchlist.txt'
-SENT_NEWS_FILE = 'sent_news.json'  # 추가: 전송된 뉴스 저장 파일
+# 샤드 모드 설정 (1 이상이면 관심종목 조회/지표 계산/차트 렌더링/뉴스 조회를 티커별로 나누어 워커 프로세스에서 실행,
+# 0이면 모두 이 프로세스에서 처리). 게이트웨이 프로세스는 디스코드 연결, 명령어, 전송만 맡음.
+SHARD_WORKERS = int(os.getenv('SHARD_WORKERS', '0'))
+SHARD_TIMEOUT = 600  # 샤드 작업 하나당 제한 시간(초)
 
-# 관심종목 초기화
-watchlist = []
+# 지표 HTTP 서버, 샤드 풀, 캐시 예열/놓친 실행 작업 (로그인 후 start_services()에서 한 번만 시작)
+metrics_runner = None
+shard_pool = None
+warmup_task = None
+catch_up_task = None
+services_started = False
 
+# 시작 단계별로 STARTUP_STARTED부터 걸린 시간(초): import, services, login, ready, first_command, warm
+startup_timings = {}
 
-@bot.event
-async def on_ready():
-    logging.info(f'Logged in as {bot.user}')
 
-    load_watchlist()
-    logging.info('Watchlist loaded')
+def record_startup(stage):
+    """시작 단계에 처음 도달한 시간을 기록 (이미 기록된 단계는 무시)"""
+    if stage in startup_timings:
+        return
+    elapsed = time.perf_counter() - STARTUP_STARTED
+    startup_timings[stage] = elapsed
+    metrics.gauge('bot_startup_seconds', 'Seconds from process start to each startup stage').set(elapsed, stage=stage)
+    logging.info(f'Startup stage {stage} reached after {elapsed:.2f}s')
+
+
+# 지표를 내보내기 직전에 실행기 대기열, 캐시, 전송 현황을 게이지로 갱신
+def collect_runtime_metrics(registry):
+    for name, value in io_executor.stats().items():
+        registry.gauge('executor_tasks', 'Blocking executor queue and task counts').set(value, executor=io_executor.name, state=name)
+    for name, value in command_cache.stats().items():
+        registry.gauge('command_cache', 'Command result cache counters').set(value, stat=name)
+    for name, value in chart_renderer.stats().items():
+        registry.gauge('chart_cache', 'Chart PNG cache counters').set(value, stat=name)
+    registry.gauge('outbound_sent', 'Discord messages and files sent since start').set(outbound.sent_messages, kind='messages')
+    registry.gauge('outbound_sent', 'Discord messages and files sent since start').set(outbound.sent_files, kind='files')
+    for name, value in subscriptions.stats().items():
+        registry.gauge('watchlist_subscriptions', 'Watchlist subscriptions, unique tickers and channels').set(value, stat=name)
+    if shard_pool is not None:
+        for name, value in shard_pool.stats().items():
+            registry.gauge('shard_pool', 'Shard worker processes and job counts').set(value, stat=name)
+    upstream = data_provider.stats()
+    registry.gauge('upstream_concurrency_limit', 'Current adaptive limit of concurrent upstream requests').set(upstream['concurrency'])
+    registry.gauge('upstream_circuit_open', '1 while the upstream circuit breaker blocks requests').set(int(upstream['state'] != 'closed'))
+
+
+metrics.add_collector(collect_runtime_metrics)
+
+
+# 샤드 워커 프로세스 시작 (SHARD_WORKERS가 0이면 아무것도 하지 않음)
+def start_shard_pool():
+    global shard_pool
+    if SHARD_WORKERS <= 0 or shard_pool is not None:
+        return
+    from shards import ShardPool  # 샤드 모드에서만 불러옴
+    # Yahoo 요청 속도는 게이트웨이와 샤드들이 (샤드 수 + 1)로 나누어 전체 합이 YAHOO_RATE를 넘지 않게 함
+    share = YAHOO_RATE / (SHARD_WORKERS + 1)
+    price_cache.rate_limiter = TokenBucket(share, YAHOO_BURST)
+    config = {
+        'provider': DATA_PROVIDER,
+        'price_cache_dir': PRICE_CACHE_DIR,
+        'price_cache_max_age': PRICE_CACHE_MAX_AGE,
+        'price_cache_max_bytes': PRICE_CACHE_MAX_BYTES,
+        'price_cache_float_dtype': PRICE_CACHE_FLOAT_DTYPE,
+        'fetch_concurrency': FETCH_CONCURRENCY,
+        'yahoo_rate': share * SHARD_WORKERS,  # 샤드 전체 몫 (샤드마다 샤드 수로 나눔)
+        'yahoo_burst': YAHOO_BURST,
+        'batch_size': PRICE_BATCH_SIZE,
+        'indicator_state_file': INDICATOR_STATE_FILE,
+        'windows': WATCHLIST_MA_WINDOWS,
+        'rsi_period': RSI_PERIOD,
+        'signal_rules_file': SIGNAL_RULES_FILE,
+        'chart_cache_dir': CHART_CACHE_DIR,
+        'chart_cache_max_files': CHART_CACHE_MAX_FILES,
+        'news_concurrency': NEWS_CONCURRENCY,
+        'upstream': UPSTREAM_CONFIG,
+    }
+    shard_pool = ShardPool(SHARD_WORKERS, config, log_handlers=(handler, console_handler), timeout=SHARD_TIMEOUT)
+    shard_pool.start()
+    atexit.register(shard_pool.shutdown)
+
+
+# 스케줄러, 샤드 풀, 지표 서버를 시작하고 캐시 예열을 백그라운드로 시작 (여러 번 호출해도 한 번만 실행)
+async def start_services():
+    global services_started, metrics_runner, warmup_task, catch_up_task
+    if services_started:
+        return
+    services_started = True
+    await io_executor.run(load_services)  # main()에서 미리 만들기 시작했으면 끝나기를 기다림
 
     # 스케줄러 설정
-    scheduler.add_job(calculate_ma_scheduled, 'cron', day_of_week='mon-fri', hour=20, minute=15)
-    scheduler.add_job(stock_price_notification, 'cron', day_of_week='mon-fri', hour=20, minute=16)
-    scheduler.add_job(check_watchlist, 'cron', day_of_week='mon-fri', hour=20, minute=17)
-    scheduler.add_job(check_news, 'cron', day_of_week='mon-fri', hour=20, minute=18)
+    # 저녁 작업은 이전 실행이 끝나지 않았으면 건너뛰고, 밀린 실행은 한 번으로 합침
+    scheduler.add_job(run_evening_pipeline, evening_trigger, id='evening_pipeline', max_instances=1, coalesce=True,
+                      misfire_grace_time=MISSED_RUN_GRACE)
+    scheduler.add_job(save_metrics, 'interval', minutes=METRICS_SAVE_INTERVAL, max_instances=1, coalesce=True)
+    if INTRADAY_ENABLED:
+        # 조회가 주기보다 오래 걸리면 밀린 실행은 한 번으로 합침
+        scheduler.add_job(poll_intraday, 'interval', seconds=INTRADAY_INTERVAL, max_instances=1, coalesce=True)
     scheduler.start()
     logging.info('Scheduler started')
 
+    start_shard_pool()
+
+    try:
+        metrics_runner = await start_http_server(metrics, METRICS_HOST, METRICS_PORT)
+    except OSError as e:
+        logging.error(f"Failed to start metrics endpoint on {METRICS_HOST}:{METRICS_PORT}: {e}")
+
+    warmup_task = asyncio.ensure_future(warm_caches())
+    catch_up_task = asyncio.ensure_future(catch_up_missed_runs())
+
+
+# 로그인 직후, 게이트웨이에 연결하기 전에 한 번만 호출됨 (on_ready는 재연결할 때마다 다시 호출되므로 여기서 시작)
+@bot.event
+async def setup_hook():
+    record_startup('login')
+    await start_services()
+
+
+@bot.event
+async def on_ready():
+    if 'ready' in startup_timings:
+        logging.info(f'Reconnected as {bot.user}')
+        return
+    logging.info(f'Logged in as {bot.user}')
+    record_startup('ready')
+
+
+# 재시작 후 첫 명령어 응답까지 걸린 시간 기록
+@bot.after_invoke
+async def record_first_command(ctx):
+    record_startup('first_command')
+
+
+# 티커들의 가격 캐시를 갱신하고 {티커: 데이터} 반환
+async def refresh_prices(tickers, period='2Y'):
+    # 묶음마다 따로 실행하여 그 사이에 들어온 명령어의 가격 조회가 한 묶음 이상 기다리지 않도록 함
+    prices = {}
+    for i in range(0, len(tickers), PRICE_BATCH_SIZE):
+        prices.update(await io_executor.run(price_cache.get_many, tickers[i:i + PRICE_BATCH_SIZE], period=period,
+                                            chunk_size=PRICE_BATCH_SIZE, timeout=BACKTEST_TIMEOUT))
+    return prices
+
+
+# 지표 상태를 전체 히스토리로 다시 만들어야 하는 티커(처음 보는 티커, 가격 조정 등)는 스레드 풀에서 미리 계산
+# (수백 개의 봉을 하나씩 반영하므로 이벤트 루프에서 하면 티커 수에 비례해 명령어 응답이 밀림)
+async def rebuild_cold_indicators(prices):
+    cold = {ticker: data for ticker, data in prices.items() if indicator_state.needs_rebuild(ticker, data)}
+    if cold:
+        await io_executor.run(indicator_state.rebuild_many, cold)
+
+
+# 새 봉을 지표 상태에 반영하고 저장
+# (새 봉만 반영하는 갱신은 이벤트 루프에서 하되 한 묶음마다 루프에 양보하여 명령어 응답을 오래 막지 않음)
+async def update_indicators(prices):
+    await rebuild_cold_indicators(prices)
+    for count, (ticker, data) in enumerate(prices.items(), 1):
+        if not data.empty:
+            indicator_state.update(ticker, data)
+        if count % PRICE_BATCH_SIZE == 0:
+            await asyncio.sleep(0)
+    await io_executor.run(indicator_state.save)
+
+
+# 구독 티커와 규칙 티커의 가격 캐시와 지표 상태를 미리 갱신하고 티커 수 반환
+async def warm_prices():
+    plan = await io_executor.run(subscriptions.plan)
+    await update_indicators(await fetch_plan_prices(plan))
+    return len(set(alert_rules.tickers()) | set(plan_tickers(plan)))
+
+
+# 로그인 후 백그라운드에서 캐시와 차트 워커를 예열
+# (첫 명령어와 정기 작업이 다운로드, 지표 재계산, 워커 프로세스 시작/matplotlib 로드를 기다리지 않도록)
+async def warm_caches():
+    started = time.perf_counter()
+    charts, tickers = await asyncio.gather(chart_renderer.warm(), warm_prices(), return_exceptions=True)
+    if isinstance(charts, BaseException):
+        logging.error(f"Failed to start chart workers: {charts!r}")
+    if isinstance(tickers, BaseException):
+        logging.error(f"Failed to warm price caches: {tickers!r}")
+    else:
+        logging.info(f'Warmed caches for {tickers} tickers in {time.perf_counter() - started:.2f}s')
+    record_startup('warm')
+
+
+# 저녁 작업이 끝난 뒤 가격 아카이브 정리 (지우지 못한 이전 세대, 중단된 기록, 삭제된 항목)
+@metrics.timed('bot_job', job='compact_price_archive')
+async def compact_price_archive():
+    try:
+        cleaned = await io_executor.run(price_cache.compact, timeout=BACKTEST_TIMEOUT)
+        if shard_pool is not None:
+            cleaned += sum(result or 0 for result in await shard_pool.broadcast('compact'))
+        logging.info(f'Price archive compaction cleaned {cleaned} items')
+    except Exception as e:
+        logging.error(f"Failed to compact price archive: {e}")
+
+
+# 스크리너 대상 티커 목록 (파일이 없으면 빈 목록)
+def load_screener_universe():
+    if not os.path.exists(SCREENER_UNIVERSE_FILE):
+        return []
+    with open(SCREENER_UNIVERSE_FILE, 'r', encoding='utf-8') as f:
+        return list(dict.fromkeys(line.strip().upper() for line in f if line.strip()))
+
+
+# 이 프로세스와 샤드 워커들의 가격 아카이브 전체로 스크리너 표를 만들고 파일에 저장
+def build_screener_table():
+    import screener
+    from price_archive import PriceArchive
+
+    archives = [price_cache.archive] + [
+        PriceArchive(os.path.join(PRICE_CACHE_DIR, f'shard{shard}', 'archive')) for shard in range(max(SHARD_WORKERS, 0))
+    ]
+    frames = screener.archive_frames(archives, bars=max(WATCHLIST_MA_WINDOWS) + 2)
+    table = screener.build_table(frames, windows=WATCHLIST_MA_WINDOWS, rsi_period=RSI_PERIOD)
+    if table is not None:
+        table.save(SCREENER_TABLE_FILE)
+    return table
+
+
+# 저장된 스크리너 표 읽기 (없거나 읽을 수 없으면 None)
+def load_screener_table():
+    if not os.path.exists(SCREENER_TABLE_FILE):
+        return None
+    import screener
+    try:
+        return screener.ScreenerTable.load(SCREENER_TABLE_FILE)
+    except Exception as e:
+        logging.error(f"Failed to load screener table: {e}")
+        return None
+
+
+# 장 마감 후 스크리너 대상 티커를 갱신하고 지표 표를 다시 만듦
+@metrics.timed('bot_job', job='refresh_screener')
+async def refresh_screener():
+    global screener_table
+    logging.info('Running refresh_screener')
+    try:
+        universe = await io_executor.run(load_screener_universe)
+        if universe:
+            with metrics.timer('job_stage', job='refresh_screener', stage='fetch'):
+                # 묶음 단위로 갱신하여 다른 명령어/작업의 가격 조회가 전체 갱신을 기다리지 않도록 함
+                await refresh_prices(universe, period=SCREENER_PERIOD)
+        with metrics.timer('job_stage', job='refresh_screener', stage='build'):
+            table = await io_executor.run(build_screener_table, timeout=SCREENER_TIMEOUT)
+    except Exception as e:
+        logging.error(f"Failed to refresh screener table: {e}")
+        return
+    if table is None:
+        logging.info('No archived prices, screener table not built')
+        return
+    screener_table = table
+    logging.info(f'Built screener table for {table.date.date()} with {len(table)} tickers')
+
+
+# 지표 누적값을 파일에 저장 (재시작 후에도 이어서 집계)
+async def save_metrics():
+    try:
+        await io_executor.run(metrics.save)
+    except Exception as e:
+        logging.error(f"Failed to save metrics: {e}")
+
+
+# 전송 계획의 관심종목과 규칙 티커의 가격을 한 번에 갱신하고 이 프로세스에서 갱신한 {티커: 데이터} 반환
+async def fetch_plan_prices(plan):
+    tickers = plan_tickers(plan)
+    if shard_pool is None:
+        return await refresh_prices(list(dict.fromkeys(alert_rules.tickers() + tickers)))
+    # 관심종목은 샤드 워커의 가격 캐시에서 쓰므로 샤드에서 갱신하고, 이 프로세스는 규칙 티커만 갱신
+    prices, _ = await asyncio.gather(refresh_prices(alert_rules.tickers()), shard_pool.map('refresh', tickers))
+    return prices
+
+
+# 저녁 정기 작업의 단계와 의존 관계
+# 가격과 뉴스는 한 번씩 동시에 받아두고, 전송은 신호 알림 -> 종가 -> 관심종목 -> 뉴스 순서를 유지함.
+# 스크리너 대상 티커 갱신은 다운로드가 많으므로 전송이 모두 끝난 뒤에 실행함.
+# 단계 함수는 지금까지의 결과 {단계 이름: 반환값}을 받음 (needs 단계가 실패하면 건너뛰고, after 단계는 끝나기만 기다림)
+evening_pipeline = Pipeline('evening_pipeline', [
+    Stage('plan', lambda results: io_executor.run(subscriptions.plan)),
+    Stage('fetch_prices', lambda results: fetch_plan_prices(results['plan']), needs=('plan',)),
+    Stage('fetch_news', lambda results: collect_news(plan_tickers(results['plan'])), needs=('plan',)),
+    Stage('indicators', lambda results: update_indicators(results['fetch_prices']), needs=('fetch_prices',)),
+    Stage('signal_alerts', lambda results: calculate_ma_scheduled(results['plan']),
+          needs=('plan',), after=('indicators',)),
+    Stage('watchlist_records', lambda results: collect_watchlist_records(plan_tickers(results['plan'])),
+          needs=('plan',), after=('indicators',)),
+    Stage('stock_prices', lambda results: stock_price_notification(plan=results['plan']),
+          needs=('plan',), after=('fetch_prices', 'signal_alerts')),
+    Stage('watchlist', lambda results: check_watchlist(results['plan'], results['watchlist_records']),
+          needs=('plan', 'watchlist_records'), after=('stock_prices',)),
+    Stage('news', lambda results: check_news(results['plan'], results['fetch_news']),
+          needs=('plan', 'fetch_news'), after=('watchlist',)),
+    Stage('screener', lambda results: refresh_screener(), after=('news',)),
+    Stage('compact', lambda results: compact_price_archive(), after=('news', 'screener')),
+], metrics=metrics)
+
+evening_lock = asyncio.Lock()
+
+
+# 저녁 작업을 실행하고 실행 기록에 남김 (같은 예정 시각은 한 번만, 동시에 하나만 실행)
+@metrics.timed('bot_job', job='evening_pipeline')
+async def run_evening_pipeline(scheduled_at=None):
+    """scheduled_at은 실행 예정 시각 (없으면 방금 지난 예정 시각), 단계별 (상태, 걸린 시간) 반환 (건너뛰면 None)"""
+    if scheduled_at is None:
+        scheduled_at = latest_fire_time(evening_trigger, datetime.now(evening_trigger.timezone))
+    if evening_lock.locked():
+        logging.warning(f'Evening pipeline is already running, skipping run scheduled at {scheduled_at}')
+        return None
+    async with evening_lock:
+        if not await io_executor.run(job_runs.start, evening_pipeline.name, scheduled_at):
+            logging.info(f'Evening pipeline run scheduled at {scheduled_at} already finished, skipping')
+            return None
+        logging.info(f'Running evening pipeline scheduled at {scheduled_at}')
+        statuses = await evening_pipeline.run()
+        status = 'ok' if all(stage_status == OK for stage_status, _ in statuses.values()) else 'partial'
+        detail = {name: [stage_status, round(seconds, 3)] for name, (stage_status, seconds) in statuses.items()}
+        await io_executor.run(job_runs.finish, evening_pipeline.name, scheduled_at, status, detail)
+        logging.info(f'Evening pipeline run scheduled at {scheduled_at} finished: {status}')
+        return statuses
+
+
+# 재시작 전에 놓친 저녁 작업이 있으면 한 번 실행 (여러 번 놓쳤으면 가장 최근 예정 시각으로 한 번만)
+async def catch_up_missed_runs():
+    try:
+        now = datetime.now(evening_trigger.timezone)
+        last = await io_executor.run(job_runs.last_scheduled, evening_pipeline.name, evening_trigger.timezone)
+        missed = missed_fire_time(evening_trigger, last, now, MISSED_RUN_GRACE)
+        if missed is None:
+            return
+        logging.info(f'Evening pipeline missed its run scheduled at {missed}, running it now')
+        # 전송할 채널을 찾을 수 있도록 게이트웨이 연결이 끝난 뒤 실행
+        await bot.wait_until_ready()
+        await run_evening_pipeline(missed)
+    except Exception as e:
+        logging.error(f"Failed to catch up missed evening pipeline run: {e!r}")
+
 
 # 모든 수신 메시지의 크기를 로그에 기록
 @bot.event
@@ -152,100 +728,181 @@ async def on_message(message):
     await bot.process_commands(message)  # 명령어 처리
 
 
-# 전송된 뉴스 로드 함수
-def load_sent_news():
-    """전송된 뉴스 기사 링크를 로드"""
-    if os.path.exists(SENT_NEWS_FILE):
-        with open(SENT_NEWS_FILE, 'r', encoding='utf-8') as f:
-            sent_news = set(json.load(f))
-    else:
-        sent_news = set()
-    return sent_news
+# 티커의 뉴스 목록 조회 (블로킹 호출이므로 io_executor에서 실행)
+def fetch_news(ticker):
+    return data_provider.news(ticker)
 
-# 전송된 뉴스 저장 함수
-def save_sent_news(sent_news):
-    """전송된 뉴스 기사 링크를 저장"""
-    with open(SENT_NEWS_FILE, 'w', encoding='utf-8') as f:
-        json.dump(list(sent_news), f, ensure_ascii=False, indent=4)
 
+# 티커 하나의 뉴스 조회 (동시 조회 수 제한)
+async def fetch_ticker_news(ticker, semaphore):
+    async with semaphore:
+        try:
+            with metrics.timer('news_fetch'):
+                return await io_executor.run(fetch_news, ticker)
+        except Exception as e:
+            logging.error(f"Error fetching news for ticker {ticker}: {e}")
+            return []
+
+
+# 개인적으로 구독한 사용자 멘션 (없으면 빈 문자열)
+def mention_text(users):
+    return '\n' + ' '.join(f'<@{user}>' for user in dict.fromkeys(users)) if users else ''
+
+
+# 전송 계획의 채널 ID를 채널 객체로 변환 (찾을 수 없는 채널은 로그만 남기고 제외)
+def plan_targets(plan):
+    """[(채널, {티커: [개인 구독자 ID]})] 반환"""
+    targets = []
+    for channel_id, tickers in plan.items():
+        channel = bot.get_channel(channel_id)
+        if channel is None:
+            logging.error(f"채널을 찾을 수 없습니다: {channel_id}")
+            continue
+        targets.append((channel, tickers))
+    return targets
+
+
+async def send_ticker_records(targets, records, separator='\n', description='message'):
+    """티커마다 한 번 만든 (메시지, 차트 PNG)를 채널마다 구독한 티커만 묶어 동시에 전송하고 보낸 메시지 수 반환"""
+    async def send(channel, tickers):
+        batch = outbound.batch(channel, separator=separator, description=description)
+        for ticker, users in tickers.items():
+            record = records.get(ticker)
+            if record is None:
+                continue
+            text, png = record
+            # discord.File은 전송하면서 버퍼를 읽으므로 채널마다 새로 만듦
+            files = [discord.File(fp=io.BytesIO(png), filename=f"{ticker}_chart.png")] if png is not None else None
+            batch.add(text + mention_text(users), files)
+        try:
+            return await batch.flush()
+        except Exception as e:
+            logging.error(f"Error sending {description} to channel {channel.id}: {e}")
+            return 0
+
+    return sum(await asyncio.gather(*(send(channel, tickers) for channel, tickers in targets)))
 
-# 관심종목 관련 뉴스 출력
-async def check_news():
-    """관심종목에 대해 최신 뉴스를 체크하여 디스코드로 전송"""
-    logging.info('Running check_news')
-    messages = []
-    current_time = datetime.now()
-    one_week_ago = current_time - timedelta(days=7)
 
-    sent_news = load_sent_news()
-    new_sent_news = set()
+# 티커마다 한 번씩 뉴스를 동시에 조회하여 tickers 순서의 뉴스 목록 반환 (실패한 티커는 빈 목록)
+async def collect_news(tickers):
+    with metrics.timer('job_stage', job='check_news', stage='fetch'):
+        if shard_pool is not None:
+            news = await shard_pool.map('news', tickers)
+            return [news.get(ticker, []) for ticker in tickers]
+        semaphore = asyncio.Semaphore(NEWS_CONCURRENCY)
+        return await asyncio.gather(*(fetch_ticker_news(ticker, semaphore) for ticker in tickers))
 
-    for ticker in watchlist:
-        stock = yf.Ticker(ticker)
-        news_items = stock.news
 
+# 관심종목 관련 뉴스 출력
+@metrics.timed('bot_job', job='check_news')
+async def check_news(plan=None, feeds=None):
+    """관심종목 최신 뉴스를 디스코드로 전송 (저녁 작업에서는 미리 불러온 plan과 feeds를 넘겨받음)"""
+    logging.info('Running check_news')
+    current_time = datetime.now()
+    one_week_ago = current_time - timedelta(days=NEWS_WINDOW_DAYS)
+
+    # 모든 채널이 구독한 티커의 뉴스를 티커마다 한 번씩 동시에 조회
+    if plan is None:
+        plan = await io_executor.run(subscriptions.plan)
+    tickers = plan_tickers(plan)
+    if feeds is None:
+        feeds = await collect_news(tickers)
+
+    cursors = await io_executor.run(sent_news.cursors)
+    new_cursors = {}
+    articles = {}  # 링크 -> 기사 정보 (여러 티커에 같은 기사가 있으면 한 번만 처리)
+    for ticker, news_items in zip(tickers, feeds):
+        cursor = cursors.get(ticker, 0)
         for item in news_items:
-            news_time = datetime.utcfromtimestamp(item['providerPublishTime'])
+            published = item['providerPublishTime']
+            # 지난 실행에서 이미 확인한 시각 이전의 뉴스는 바로 건너뜀
+            if published <= cursor:
+                continue
+            new_cursors[ticker] = max(new_cursors.get(ticker, cursor), published)
+
             link = item['link']
+            if link in articles:
+                if ticker not in articles[link]['tickers']:
+                    articles[link]['tickers'].append(ticker)
+                continue
+            news_time = datetime.utcfromtimestamp(published)
             if news_time > one_week_ago and link not in sent_news:
-                headline = item['title']
-                messages.append(f"**{ticker}**: {headline}\n링크: {link}")
-                new_sent_news.add(link)
-
-    if messages:
-        combined_message = "\n\n".join(messages)
-        channel = bot.get_channel(CHANNEL_ID)
-        if channel:
-            # Discord 메시지 길이 제한(2000자)을 고려하여 메시지를 분할
-            for chunk in [combined_message[i:i+1900] for i in range(0, len(combined_message), 1900)]:
-                await channel.send(chunk)
-                # 전송한 메시지의 크기를 로깅
-                data_size = len(chunk.encode('utf-8'))
-                logging.info(f'Sent news message of size {data_size} bytes', extra={'data_size': data_size, 'direction': 'output'})
-            # 전송된 뉴스 업데이트 및 저장
-            sent_news.update(new_sent_news)
-            save_sent_news(sent_news)
-        else:
-            logging.error("채널을 찾을 수 없습니다. CHANNEL_ID를 확인하세요.")
-    else:
+                articles[link] = {'tickers': [ticker], 'title': item['title'], 'published': published}
+
+    # 지난 실행에서 채널에 전송하지 못한 기사 (그 채널에만 다시 전송)
+    retries = await io_executor.run(sent_news.retries)
+
+    async def send(channel, channel_tickers):
+        """채널이 구독한 티커의 새 기사와 다시 보낼 기사를 Discord 메시지 길이 제한(2000자) 안에서 기사 단위로만 나누어 전송하고
+        (전송한 링크 집합, 전송하지 못한 링크 집합) 반환"""
+        batch = outbound.batch(channel, separator='\n\n', description='news message')
+        pending = {**retries.get(channel.id, {}), **articles}
+        for link, article in pending.items():
+            matched = [ticker for ticker in article['tickers'] if ticker in channel_tickers]
+            if matched:
+                users = [user for ticker in matched for user in channel_tickers[ticker]]
+                batch.add(f"**{'/'.join(matched)}**: {article['title']}\n링크: {link}" + mention_text(users), key=link)
+        links = set(batch.keys)
+        try:
+            await batch.flush()
+        except Exception as e:
+            logging.error(f"Error sending news to channel {channel.id}: {e}")
+        return set(batch.delivered), links - set(batch.delivered)
+
+    targets = plan_targets(plan)
+    if not articles and not any(channel.id in retries for channel, _ in targets):
+        await io_executor.run(sent_news.set_cursors, new_cursors)
         logging.info('No new news to send')
+        return
+
+    with metrics.timer('job_stage', job='check_news', stage='send'):
+        outcomes = await asyncio.gather(*(send(channel, channel_tickers) for channel, channel_tickers in targets))
+    # 새 기사는 모두 기록하고 커서도 옮기되, 채널에 전송하지 못한 기사는 (채널, 링크)별로 남겨 다음 실행에서 그 채널에만 다시 전송
+    # (다시 보낼 기사 중 전송했거나 더 이상 구독하지 않는 티커의 기사는 제거)
+    failed, resolved = [], []
+    for (channel, _), (delivered, undelivered) in zip(targets, outcomes):
+        channel_retries = retries.get(channel.id, {})
+        for link in undelivered:
+            article = articles.get(link) or channel_retries[link]
+            failed.append((channel.id, link, article['title'], article['tickers'], article['published']))
+        resolved.extend((channel.id, link) for link in channel_retries if link not in undelivered)
+    if failed:
+        logging.error(f'Failed to deliver {len(failed)} news articles, will retry them in their channels next run')
+    metrics.counter('news_articles_sent_total', 'News articles sent to Discord').inc(sum(len(delivered) for delivered, _ in outcomes))
+    # 전송된 뉴스 기록 (한 트랜잭션으로 추가) 및 보관 기간이 지난 기록 삭제
+    await io_executor.run(sent_news.add_many, [(link, article['published']) for link, article in articles.items()])
+    await io_executor.run(sent_news.add_retries, failed)
+    await io_executor.run(sent_news.remove_retries, resolved)
+    await io_executor.run(sent_news.set_cursors, new_cursors)
+    await io_executor.run(sent_news.expire)
 
 
 # 이동평균선 계산 함수
 def calculate_moving_averages(data):
     """이동평균선 계산 함수"""
-    ma_20 = data['Close'].rolling(window=20).mean().iloc[-1]
-    ma_50 = data['Close'].rolling(window=50).mean().iloc[-1]
-    ma_100 = data['Close'].rolling(window=100).mean().iloc[-1]
-    ma_200 = data['Close'].rolling(window=200).mean().iloc[-1]
-    return ma_20, ma_50, ma_100, ma_200
+    import indicators
+    values = indicators.compute(indicators.close_row(data), [f'sma{window}' for window in WATCHLIST_MA_WINDOWS])
+    return tuple(values[f'sma{window}'][0, -1] for window in WATCHLIST_MA_WINDOWS)
 
 
-# !MA 명령어를 통해 종목의 MA, 종가를 출력
-@bot.command(name='MA')
-async def moving_averages(ctx, ticker: str):
-    ticker = ticker.upper()
-    input_data_size = len(ctx.message.content.encode('utf-8'))
-    logging.info(f'Command !MA invoked for ticker: {ticker}', extra={'data_size': input_data_size, 'direction': 'input'})
-
+# 종목의 MA, 종가 메시지 생성 (데이터가 없으면 LookupError)
+async def build_ma_message(ticker):
     # 주식 데이터 가져오기 (1년간)
-    data = yf.download(ticker, period='1y')
+    data = await io_executor.run(price_cache.get, ticker, period='1y')
 
     # 다운로드한 데이터의 크기 로깅
     data_size = data.memory_usage(index=True).sum()
     logging.info(f'Fetched data for ticker: {ticker}, size: {data_size} bytes', extra={'data_size': data_size, 'direction': 'input'})
 
     if data.empty:
-        await ctx.send(f"{ticker}에 대한 데이터를 가져올 수 없습니다.")
-        logging.warning(f'No data found for ticker: {ticker}')
-        return
+        raise LookupError(f"{ticker}에 대한 데이터를 가져올 수 없습니다.")
 
     # 종가 및 이동평균선 계산
     latest_close = data['Close'].iloc[-1]
     ma_20, ma_50, ma_100, ma_200 = calculate_moving_averages(data)
 
     # 출력 내용 생성
-    message = (
+    return (
         f"**{ticker}**의 종가와 이동평균선(MA):\n"
         f"종가: ${latest_close:.2f}\n"
         f"20MA: ${ma_20:.2f}\n"
@@ -254,155 +911,183 @@ async def moving_averages(ctx, ticker: str):
         f"200MA: ${ma_200:.2f}"
     )
 
-    # 디스코드 채널에 결과 전송
-    channel = bot.get_channel(CHANNEL_ID)
-    if channel:
-        data_size = len(message.encode('utf-8'))
-        await channel.send(message)
-        logging.info(f'Sent MA message for ticker: {ticker}, size: {data_size} bytes', extra={'data_size': data_size, 'direction': 'output'})
-    else:
-        logging.error("채널을 찾을 수 없습니다. CHANNEL_ID를 확인하세요.")
 
+# !MA 명령어를 통해 종목의 MA, 종가를 출력
+@bot.command(name='MA')
+@metrics.timed('bot_command', command='MA')
+async def moving_averages(ctx, ticker: str):
+    ticker = ticker.upper()
+    input_data_size = len(ctx.message.content.encode('utf-8'))
+    logging.info(f'Command !MA invoked for ticker: {ticker}', extra={'data_size': input_data_size, 'direction': 'input'})
+
+    try:
+        message = await command_cache.get_or_compute(('MA', ticker), lambda: build_ma_message(ticker))
+    except LookupError as e:
+        await ctx.send(str(e))
+        logging.warning(f'No data found for ticker: {ticker}')
+        return
+
+    # 명령어를 입력한 채널에 결과 전송
+    data_size = len(message.encode('utf-8'))
+    await ctx.send(message)
+    logging.info(f'Sent MA message for ticker: {ticker}, size: {data_size} bytes', extra={'data_size': data_size, 'direction': 'output'})
 
-@bot.command(name='관심종목추가')
-async def add_to_watchlist(ctx, ticker: str):
+
+# 관심종목 구독 추가/제거 (personal이면 채널 안에서 명령어를 입력한 사용자의 관심종목)
+async def update_subscription(ctx, command, ticker, add, personal=False):
     ticker = ticker.upper()
     input_data_size = len(ctx.message.content.encode('utf-8'))
-    logging.info(f'Command !관심종목추가 invoked for ticker: {ticker}', extra={'data_size': input_data_size, 'direction': 'input'})
-    if ticker not in watchlist:
-        watchlist.append(ticker)
-        save_watchlist()
-        await ctx.send(f"{ticker}가 관심종목에 추가되었습니다.")
-        logging.info(f'Ticker {ticker} added to watchlist')
+    logging.info(f'Command !{command} invoked for ticker: {ticker}', extra={'data_size': input_data_size, 'direction': 'input'})
+    user_id = ctx.author.id if personal else CHANNEL_SUBSCRIBER
+    label = '내 관심종목' if personal else '관심종목'
+    if add:
+        guild_id = ctx.guild.id if ctx.guild else 0
+        changed = await io_executor.run(subscriptions.add, ticker, ctx.channel.id, guild_id, user_id)
+        message = f"{ticker}가 {label}에 추가되었습니다." if changed else f"{ticker}는 이미 {label}에 있습니다."
     else:
-        await ctx.send(f"{ticker}는 이미 관심종목에 있습니다.")
-        logging.info(f'Ticker {ticker} is already in watchlist')
+        changed = await io_executor.run(subscriptions.remove, ticker, ctx.channel.id, user_id)
+        message = f"{ticker}가 {label}에서 제거되었습니다." if changed else f"{ticker}는 {label}에 없습니다."
+    await ctx.send(message)
+    logging.info(f'Subscription {"add" if add else "remove"} for ticker {ticker} in channel {ctx.channel.id} '
+                 f'(user {user_id}): {"changed" if changed else "unchanged"}')
+
+
+@bot.command(name='관심종목추가')
+@metrics.timed('bot_command', command='관심종목추가')
+async def add_to_watchlist(ctx, ticker: str):
+    await update_subscription(ctx, '관심종목추가', ticker, add=True)
 
 
 @bot.command(name='관심종목제거')
+@metrics.timed('bot_command', command='관심종목제거')
 async def remove_from_watchlist(ctx, ticker: str):
-    ticker = ticker.upper()
-    input_data_size = len(ctx.message.content.encode('utf-8'))
-    logging.info(f'Command !관심종목제거 invoked for ticker: {ticker}', extra={'data_size': input_data_size, 'direction': 'input'})
-    if ticker in watchlist:
-        watchlist.remove(ticker)
-        save_watchlist()
-        await ctx.send(f"{ticker}가 관심종목에서 제거되었습니다.")
-        logging.info(f'Ticker {ticker} removed from watchlist')
-    else:
-        await ctx.send(f"{ticker}는 관심종목에 없습니다.")
-        logging.warning(f'Ticker {ticker} not found in watchlist')
+    await update_subscription(ctx, '관심종목제거', ticker, add=False)
 
 
-# 관심종목을 watchlist.txt 파일에 저장하는 함수
-def save_watchlist():
-    with open(WATCHLIST_FILE, 'w') as f:
-        for ticker in watchlist:
-            f.write(f"{ticker}\n")
-    logging.info('Watchlist saved to file')
+@bot.command(name='내관심종목추가')  # 이 채널에서 나에게만 알림 (멘션)
+@metrics.timed('bot_command', command='내관심종목추가')
+async def add_to_personal_watchlist(ctx, ticker: str):
+    await update_subscription(ctx, '내관심종목추가', ticker, add=True, personal=True)
 
 
-# watchlist.txt 파일에서 관심종목을 불러오는 함수
-def load_watchlist():
-    global watchlist
-    if os.path.exists(WATCHLIST_FILE):
-        with open(WATCHLIST_FILE, 'r') as file:
-            watchlist = [line.strip().upper() for line in file if line.strip()]
-        logging.info('Watchlist loaded from file')
-    else:
-        watchlist = []
-        logging.info('No watchlist file found, starting with empty watchlist')
+@bot.command(name='내관심종목제거')
+@metrics.timed('bot_command', command='내관심종목제거')
+async def remove_from_personal_watchlist(ctx, ticker: str):
+    await update_subscription(ctx, '내관심종목제거', ticker, add=False, personal=True)
 
 
-async def check_watchlist():
-    logging.info('Running check_watchlist')
-    channel = bot.get_channel(CHANNEL_ID)
-    if not channel:
-        logging.error("채널을 찾을 수 없습니다. CHANNEL_ID를 확인하세요.")
-        return
+# 관심종목 신호 규칙 평가
+def evaluate_watchlist_signals(tickers, prices, snapshots):
+    """관심종목 규칙을 전체 티커에 대해 한 번에 평가하여 {티커: [Signal]} 반환"""
+    import reports
+    return reports.evaluate_watchlist_signals(watchlist_rules, tickers, prices, snapshots, STATE_INDICATORS)
 
-    for ticker in watchlist:
+
+# 관심종목 한 종목의 메시지와 (필요 시) 차트 생성
+async def process_watchlist_ticker(ticker, data, snapshot, signals, semaphore):
+    """티커 하나를 분석하여 (메시지, 차트 버퍼 또는 None) 반환, 실패 시 None"""
+    import reports
+    async with semaphore:
         try:
-            # 주식 데이터 가져오기 (2년간)
-            data = yf.download(ticker, period='2Y')
-
-            # 다운로드한 데이터의 크기 로깅
-            data_size = data.memory_usage(index=True).sum()
-            logging.info(f'Fetched data for ticker: {ticker}, size: {data_size} bytes', extra={'data_size': data_size, 'direction': 'input'})
-
-            latest_close = data['Close'].iloc[-1]
-            previous_close = data['Close'].iloc[-2]
-            change_percent = ((latest_close - previous_close) / previous_close) * 100
-
-            # 이동평균선 계산
-            ma_20 = data['Close'].rolling(window=20).mean().iloc[-1]
-            ma_50 = data['Close'].rolling(window=50).mean().iloc[-1]
-            ma_100 = data['Close'].rolling(window=100).mean().iloc[-1]
-            ma_200 = data['Close'].rolling(window=200).mean().iloc[-1]
-
-            # 종가와 이동평균선 비교
-            crossed_mas = []
-            if (previous_close > ma_20 and latest_close < ma_20) or (previous_close < ma_20 and latest_close > ma_20):
-                crossed_mas.append('20MA')
-            if (previous_close > ma_50 and latest_close < ma_50) or (previous_close < ma_50 and latest_close > ma_50):
-                crossed_mas.append('50MA')
-            if (previous_close > ma_100 and latest_close < ma_100) or (previous_close < ma_100 and latest_close > ma_100):
-                crossed_mas.append('100MA')
-            if (previous_close > ma_200 and latest_close < ma_200) or (previous_close < ma_200 and latest_close > ma_200):
-                crossed_mas.append('200MA')
-
-            # 출력 내용 생성
-            message = f"**{ticker}**의 종가: {latest_close:.2f}\n이전 종가 대비 변화율: {change_percent:.2f}%\n"
-
-            if crossed_mas:
-                message += f"크로스된 MA: {', '.join(crossed_mas)}\n"
-
-            # 중요한 변화가 있을 때만 차트 전송
-            send_chart_flag = False
-            if abs(change_percent) >= 5 or crossed_mas:
-                send_chart_flag = True
-
-            # 디스코드 채널에 결과 전송
-            await channel.send(message)
-            data_size = len(message.encode('utf-8'))
-            logging.info(f'Sent watchlist message for ticker: {ticker}, size: {data_size} bytes', extra={'data_size': data_size, 'direction': 'output'})
+            report = reports.watchlist_report(ticker, data, snapshot, signals, indicator_state, watchlist_rules, STATE_INDICATORS)
+            if report is None:
+                return None
+            message, send_chart_flag = report
 
+            buf = None
             if send_chart_flag:
-                # 차트 생성
-                plt.figure(figsize=(6, 4), dpi=80)
-                plt.plot(data['Close'], label='Close Price')
-                plt.plot(data['Close'].rolling(window=20).mean(), label='20MA')
-                plt.plot(data['Close'].rolling(window=50).mean(), label='50MA')
-                plt.plot(data['Close'].rolling(window=100).mean(), label='100MA')
-                plt.plot(data['Close'].rolling(window=200).mean(), label='200MA')
-                plt.title(f"{ticker} Chart")
-                plt.xlabel("Date")
-                plt.ylabel("Price")
-                plt.legend()
-
-                # 차트를 메모리 버퍼에 저장
-                buf = io.BytesIO()
-                plt.savefig(buf, format='png', dpi=80)
-                buf.seek(0)
-                plt.close()
-
-                # 버퍼의 크기 계산
-                buf_size = buf.getbuffer().nbytes
-
-                # 차트 전송
-                await channel.send(file=discord.File(fp=buf, filename=f"{ticker}_chart.png"))
-                logging.info(f'Sent chart for ticker: {ticker}, size: {buf_size} bytes', extra={'data_size': buf_size, 'direction': 'output'})
-            else:
-                logging.info(f'No significant changes for ticker: {ticker}')
+                # 차트 생성 (렌더링은 워커 프로세스에서 실행, 같은 차트는 캐시에서 반환)
+                buf = await chart_renderer.render(ticker, data)
+            return message, buf
         except Exception as e:
             logging.error(f"Error processing ticker {ticker}: {e}")
+            return None
+
+
+# 관심종목 티커 전체를 이 프로세스에서 조회/계산/렌더링
+async def watchlist_records(tickers):
+    """{티커: (메시지, 차트 PNG 바이트 또는 None)} 반환 (데이터가 없거나 실패한 티커는 빠짐)"""
+    # 관심종목 전체 데이터를 묶음 요청으로 가져오기 (2년간)
+    with metrics.timer('job_stage', job='check_watchlist', stage='fetch'):
+        prices = await io_executor.run(price_cache.get_many, tickers, period='2Y', chunk_size=PRICE_BATCH_SIZE)
+
+    # 새로 추가된 봉만 지표 상태에 반영
+    with metrics.timer('job_stage', job='check_watchlist', stage='indicators'):
+        await rebuild_cold_indicators(prices)
+        snapshots = {ticker: indicator_state.update(ticker, prices[ticker]) for ticker in tickers if not prices[ticker].empty}
+
+    # 관심종목 신호 규칙을 전체 티커에 대해 한 번에 평가
+    with metrics.timer('job_stage', job='check_watchlist', stage='signals'):
+        signals = evaluate_watchlist_signals(list(snapshots), prices, snapshots)
+
+    # 티커별 분석과 차트 렌더링을 동시에 실행 (결과 순서는 tickers 순서와 동일)
+    semaphore = asyncio.Semaphore(WATCHLIST_CONCURRENCY)
+    with metrics.timer('job_stage', job='check_watchlist', stage='render'):
+        results = await asyncio.gather(*(
+            process_watchlist_ticker(ticker, prices[ticker], snapshots.get(ticker), signals.get(ticker, []), semaphore)
+            for ticker in tickers
+        ))
+    await io_executor.run(indicator_state.save)
+
+    records = {}
+    for ticker, result in zip(tickers, results):
+        if result is None:
+            continue
+        message, buf = result
+        if buf is None:
+            logging.info(f'No significant changes for ticker: {ticker}')
+        records[ticker] = (message, buf.getvalue() if buf is not None else None)
+    return records
+
+
+# 관심종목 티커 전체의 결과를 샤드 워커들 또는 이 프로세스에서 만듦
+async def collect_watchlist_records(tickers):
+    """{티커: (메시지, 차트 PNG 바이트 또는 None)} 반환"""
+    started = time.perf_counter()
+    if shard_pool is not None:
+        # 샤드 워커 프로세스들이 맡은 티커를 조회/계산/렌더링 (이 프로세스는 명령어에 계속 응답)
+        with metrics.timer('job_stage', job='check_watchlist', stage='shards'):
+            records = await shard_pool.map('watchlist', tickers)
+    else:
+        records = await watchlist_records(tickers)
+    logging.info(f'Processed {len(tickers)} watchlist tickers in {time.perf_counter() - started:.2f}s')
+    return records
+
+
+@metrics.timed('bot_job', job='check_watchlist')
+async def check_watchlist(plan=None, records=None):
+    """관심종목 결과를 구독한 채널마다 전송 (저녁 작업에서는 전송 계획과 만들어둔 결과를 넘겨받음)"""
+    logging.info('Running check_watchlist')
+    started = time.perf_counter()
+
+    # 모든 채널/사용자의 관심종목을 합쳐 티커마다 한 번만 조회/계산/렌더링하고 구독한 채널마다 전송
+    if plan is None:
+        plan = await io_executor.run(subscriptions.plan)
+    tickers = plan_tickers(plan)
+    if not tickers:
+        logging.info('No watchlist subscriptions, skipping check_watchlist')
+        return
+
+    if records is None:
+        records = await collect_watchlist_records(tickers)
+
+    # 채널마다 관심종목 순서대로 결과를 모아 최소한의 메시지로 전송 (차트는 메시지당 최대 10개까지 함께 첨부)
+    with metrics.timer('job_stage', job='check_watchlist', stage='send'):
+        sent = await send_ticker_records(plan_targets(plan), records, separator='\n', description='watchlist message')
+    logging.info(f'Sent watchlist results for {len(tickers)} tickers to {len(plan)} channels in {sent} messages')
+    logging.info(f'check_watchlist finished in {time.perf_counter() - started:.2f}s')
 
 
 @bot.command(name='관심종목')  # 관심종목 조회
+@metrics.timed('bot_command', command='관심종목')
 async def display_watchlist(ctx):
     logging.info('Command !관심종목 invoked', extra={'data_size': len(ctx.message.content.encode('utf-8')), 'direction': 'input'})
-    if watchlist:
-        message = f"현재 관심종목 리스트: {', '.join(watchlist)}"
+    watchlist = await io_executor.run(subscriptions.tickers_for, ctx.channel.id)
+    personal = await io_executor.run(subscriptions.tickers_for, ctx.channel.id, ctx.author.id)
+    if watchlist or personal:
+        message = f"현재 관심종목 리스트: {', '.join(watchlist) or '없음'}"
+        if personal:
+            message += f"\n내 관심종목 리스트: {', '.join(personal)}"
         await ctx.send(message)
         data_size = len(message.encode('utf-8'))
         logging.info(f'Sent watchlist to user, size: {data_size} bytes', extra={'data_size': data_size, 'direction': 'output'})
@@ -414,89 +1099,107 @@ async def display_watchlist(ctx):
 
 
 @bot.command(name='종가')
+@metrics.timed('bot_command', command='종가')
 async def stock_price(ctx, *tickers):
     input_data_size = len(ctx.message.content.encode('utf-8'))
     logging.info(f'Command !종가 invoked with tickers: {tickers}', extra={'data_size': input_data_size, 'direction': 'input'})
     if len(tickers) == 0:
-        # 티커가 입력되지 않으면 관심종목 사용
+        # 티커가 입력되지 않으면 이 채널의 관심종목 사용
         await stock_price_notification(ctx.channel)
     else:
+        import reports
+        # 캐시에 없는 티커가 있을 때만 입력한 티커 전체를 한 번에 다운로드
+        # (샤드 모드에서는 티커를 맡은 샤드 워커의 가격 캐시에서 조회)
+        download = None
+
+        async def build(ticker):
+            nonlocal download
+            if download is None:
+                if shard_pool is not None:
+                    download = asyncio.ensure_future(shard_pool.map('prices', [ticker.upper() for ticker in tickers]))
+                else:
+                    download = asyncio.ensure_future(
+                        io_executor.run(price_cache.get_many, tickers, period='5d', chunk_size=PRICE_BATCH_SIZE))
+            prices = await download
+            if shard_pool is not None:
+                if ticker.upper() not in prices:
+                    raise LookupError('샤드 워커에서 응답이 없습니다.')
+                return prices[ticker.upper()]
+            return reports.format_stock_price_message(ticker, prices[ticker.upper()])
+
+        async def cached_message(ticker):
+            try:
+                return await command_cache.get_or_compute(('종가', ticker.upper()), lambda: build(ticker))
+            except Exception as e:
+                logging.error(f"Error getting stock price for ticker {ticker}: {e}")
+                return reports.stock_price_error_message(ticker, e)
+
         # 사용자가 입력한 티커들에 대해 종가 출력
-        messages = []
-        for ticker in tickers:
-            message = await get_single_stock_price_message(ticker)
-            messages.append(message)
-        combined_message = "\n".join(messages)
-        await ctx.send(combined_message)
-        data_size = len(combined_message.encode('utf-8'))
-        logging.info(f'Sent stock prices for provided tickers, size: {data_size} bytes', extra={'data_size': data_size, 'direction': 'output'})
+        messages = await asyncio.gather(*(cached_message(ticker) for ticker in tickers))
+        batch = outbound.batch(ctx.channel, separator='\n', description='stock prices for provided tickers')
+        for message in messages:
+            batch.add(message)
+        await batch.flush()
 
 
-async def stock_price_notification(channel=None):
+@metrics.timed('bot_job', job='stock_price_notification')
+async def stock_price_notification(channel=None, plan=None):
     logging.info('Running stock_price_notification')
+    if plan is None:
+        plan = await io_executor.run(subscriptions.plan)
     if channel is None:
-        channel = bot.get_channel(CHANNEL_ID)
-    if channel is not None:
-        messages = []
-        for ticker in watchlist:
-            message = await get_single_stock_price_message(ticker)
-            messages.append(message)
-        combined_message = "\n".join(messages)
-        await channel.send(combined_message)
-        data_size = len(combined_message.encode('utf-8'))
-        logging.info(f'Sent stock prices for watchlist, size: {data_size} bytes', extra={'data_size': data_size, 'direction': 'output'})
+        targets = plan_targets(plan)
     else:
-        logging.error("채널을 찾을 수 없습니다. CHANNEL_ID를 확인하세요.")
+        # 명령어로 실행하면 그 채널의 관심종목만 (멘션 없이) 전송
+        targets = [(channel, dict.fromkeys(plan.get(channel.id, {}), []))]
+    tickers = list(dict.fromkeys(ticker for _, channel_tickers in targets for ticker in channel_tickers))
+    if shard_pool is not None:
+        messages = await shard_pool.map('prices', tickers)
+    else:
+        prices = await io_executor.run(price_cache.get_many, tickers, period='5d', chunk_size=PRICE_BATCH_SIZE)
+        messages = {ticker: await get_single_stock_price_message(ticker, prices[ticker]) for ticker in tickers}
+    records = {ticker: (message, None) for ticker, message in messages.items()}
+    # 관심종목이 많아도 메시지 길이 제한을 넘지 않도록 종목 단위로 나누어 전송
+    await send_ticker_records(targets, records, separator='\n', description='stock prices for watchlist')
 
 
-async def get_single_stock_price_message(ticker):
+async def get_single_stock_price_message(ticker, data=None):
+    import reports
     try:
-        data = yf.download(ticker, period='5d')
-
-        # 다운로드한 데이터의 크기 로깅
-        data_size = data.memory_usage(index=True).sum()
-        logging.info(f'Fetched data for ticker: {ticker}, size: {data_size} bytes', extra={'data_size': data_size, 'direction': 'input'})
-
-        latest_close = data['Close'].iloc[-1]
-        previous_close = data['Close'].iloc[-2]
-        change_percent = ((latest_close - previous_close) / previous_close) * 100
-        message = f"{datetime.now().strftime('%Y-%m-%d')} **{ticker.upper()}** 종가: ${latest_close:.2f} ({change_percent:.2f}%)"
-        logging.info(f'Got stock price for ticker: {ticker}')
-        return message
+        if data is None:
+            data = await io_executor.run(price_cache.get, ticker, period='5d')
+        return reports.format_stock_price_message(ticker, data)
     except Exception as e:
         logging.error(f"Error getting stock price for ticker {ticker}: {e}")
-        return f"티커 {ticker}에 대한 정보를 가져오는데 실패했습니다: {e}"
+        return reports.stock_price_error_message(ticker, e)
+
+
+# 특정 티커의 최신 RSI 메시지 생성
+async def build_rsi_message(ticker):
+    # 특정 티커의 데이터 가져오기 (6개월)
+    data = await io_executor.run(price_cache.get, ticker, period='6mo')
+
+    # 다운로드한 데이터의 크기 로깅
+    data_size = data.memory_usage(index=True).sum()
+    logging.info(f'Fetched data for ticker: {ticker}, size: {data_size} bytes', extra={'data_size': data_size, 'direction': 'input'})
+
+    # 지표 상태에서 최신 RSI 값 읽기
+    await rebuild_cold_indicators({ticker: data})
+    latest_rsi = indicator_state.update(ticker, data)['rsi']
+    await io_executor.run(indicator_state.save)
+    return f"{ticker}의 최신 RSI: {latest_rsi:.2f}"
 
 
 @bot.command(name='RSI')  # 특정 티커의 RSI 출력
+@metrics.timed('bot_command', command='RSI')
 async def calculate_rsi(ctx, ticker: str):
     ticker = ticker.upper()
     input_data_size = len(ctx.message.content.encode('utf-8'))
     logging.info(f'Command !RSI invoked for ticker: {ticker}', extra={'data_size': input_data_size, 'direction': 'input'})
     try:
-        # 특정 티커의 데이터 가져오기 (6개월)
-        data = yf.download(ticker, period='6mo')
-
-        # 다운로드한 데이터의 크기 로깅
-        data_size = data.memory_usage(index=True).sum()
-        logging.info(f'Fetched data for ticker: {ticker}, size: {data_size} bytes', extra={'data_size': data_size, 'direction': 'input'})
-
-        # 종가 데이터
-        closing_prices = data['Close']
-
-        # RSI 계산
-        delta = closing_prices.diff()
-        gain = (delta.where(delta > 0, 0)).rolling(window=14).mean()
-        loss = (-delta.where(delta < 0, 0)).rolling(window=14).mean()
-
-        rs = gain / loss
-        rsi = 100 - (100 / (1 + rs))
-
-        # 최신 RSI 값
-        latest_rsi = rsi.iloc[-1]
+        result = await command_cache.get_or_compute(('RSI', ticker), lambda: build_rsi_message(ticker))
 
         # 결과 출력
-        result = f"{ticker}의 최신 RSI: {latest_rsi:.2f}"
         await ctx.send(result)
         data_size = len(result.encode('utf-8'))
         logging.info(f'Sent RSI for ticker: {ticker}, size: {data_size} bytes', extra={'data_size': data_size, 'direction': 'output'})
@@ -507,146 +1210,378 @@ async def calculate_rsi(ctx, ticker: str):
         logging.error(f"Error calculating RSI for ticker {ticker}: {e}", extra={'data_size': data_size, 'direction': 'output'})
 
 
+@bot.command(name='캐시통계')  # 명령어 결과 캐시 적중률 출력
+@metrics.timed('bot_command', command='캐시통계')
+async def cache_stats(ctx):
+    input_data_size = len(ctx.message.content.encode('utf-8'))
+    logging.info('Command !캐시통계 invoked', extra={'data_size': input_data_size, 'direction': 'input'})
+    stats = command_cache.stats()
+    chart_stats = chart_renderer.stats()
+    message = (
+        f"명령어 캐시: 적중 {stats['hits']}회, 미적중 {stats['misses']}회, 동시 요청 병합 {stats['coalesced']}회 "
+        f"(적중률 {stats['hit_rate'] * 100:.1f}%, 항목 {stats['entries']}개)\n"
+        f"차트 캐시: 적중 {chart_stats['hits']}회, 미적중 {chart_stats['misses']}회"
+    )
+    await ctx.send(message)
+    data_size = len(message.encode('utf-8'))
+    logging.info(f'Sent cache stats, size: {data_size} bytes', extra={'data_size': data_size, 'direction': 'output'})
+
+
+@bot.command(name='작업상태')  # 최근 저녁 작업 실행 기록과 단계별 결과 출력
+@metrics.timed('bot_command', command='작업상태')
+async def job_status(ctx):
+    input_data_size = len(ctx.message.content.encode('utf-8'))
+    logging.info('Command !작업상태 invoked', extra={'data_size': input_data_size, 'direction': 'input'})
+    runs = await io_executor.run(job_runs.recent, evening_pipeline.name, 3)
+    batch = outbound.batch(ctx.channel, separator='\n', description='job status')
+    if not runs:
+        batch.add('저녁 작업 실행 기록이 없습니다.')
+    for scheduled, started, finished, status, detail in runs:
+        elapsed = f'{finished - started:.1f}초' if finished is not None else '실행 중 또는 중단됨'
+        text = f"**{datetime.fromtimestamp(scheduled):%Y-%m-%d %H:%M}** {status} ({elapsed})"
+        if detail:
+            text += '\n' + ', '.join(f'{name} {stage_status} {seconds:.1f}s' for name, (stage_status, seconds) in detail.items())
+        batch.add(text)
+    await batch.flush()
+
+
+UPSTREAM_STATE_TEXT = {'closed': '정상', 'open': '요청 중단', 'half_open': '회복 확인 중'}
+
+
+# 외부 데이터 요청 상태 메시지 생성
+def format_upstream_stats(label, stats):
+    state = UPSTREAM_STATE_TEXT.get(stats['state'], stats['state'])
+    if stats['state'] == 'open':
+        state += f" ({stats['retry_after']:.0f}초 남음)"
+    lines = [f"**{label}**: {state}, 동시 요청 상한 {stats['concurrency']}/{stats['max_concurrency']}, "
+             f"429 감속 {stats['rate_limit_backoffs']}회, 요청 중단 {stats['opens']}회"]
+    for op, op_stats in stats['ops'].items():
+        latency = (f"p50 {op_stats['p50']:.2f}s / p95 {op_stats['p95']:.2f}s"
+                   if op_stats['calls'] else '기록 없음')
+        lines.append(f"{op}: 호출 {op_stats['calls']}회 (성공 {op_stats['ok']}, 실패 {op_stats['failed']}, "
+                     f"429 {op_stats['rate_limited']}, 차단 {op_stats['rejected']}, 재시도 {op_stats['retries']}), 지연 {latency}")
+        if op_stats['last_error'] is not None:
+            lines.append(f"마지막 오류 ({datetime.fromtimestamp(op_stats['last_error_at']):%H:%M:%S}): {op_stats['last_error'][:200]}")
+    return '\n'.join(lines)
+
+
+@bot.command(name='데이터상태')  # Yahoo 요청 상태(서킷, 동시 요청 상한, 호출 결과, 지연 시간) 출력
+@metrics.timed('bot_command', command='데이터상태')
+async def upstream_status(ctx):
+    input_data_size = len(ctx.message.content.encode('utf-8'))
+    logging.info('Command !데이터상태 invoked', extra={'data_size': input_data_size, 'direction': 'input'})
+    batch = outbound.batch(ctx.channel, separator='\n\n', description='upstream status')
+    batch.add(format_upstream_stats('게이트웨이', data_provider.stats()))
+    if shard_pool is not None:
+        # 샤드 워커는 각자 요청하므로 샤드마다 따로 출력
+        for shard, stats in enumerate(await shard_pool.broadcast('upstream_stats')):
+            batch.add(format_upstream_stats(f'샤드 {shard}', stats) if stats is not None else f'**샤드 {shard}**: 응답 없음')
+    await batch.flush()
+
+
+# 관리자 명령어 사용 권한 (서버 관리자 또는 봇 소유자)
+async def is_admin(ctx):
+    permissions = getattr(ctx.author, 'guild_permissions', None)
+    return (permissions is not None and permissions.administrator) or await bot.is_owner(ctx.author)
+
+
+PROFILE_ACTIONS = {'켜기': True, '끄기': False, 'on': True, 'off': False}
+
+
+@bot.command(name='프로파일')  # 프로파일링 모드 켜기/끄기(관리자만)와 최근 저장한 실행 기록 출력
+@metrics.timed('bot_command', command='프로파일')
+async def profiling_mode(ctx, action: str = None):
+    input_data_size = len(ctx.message.content.encode('utf-8'))
+    logging.info(f'Command !프로파일 invoked with action: {action}', extra={'data_size': input_data_size, 'direction': 'input'})
+    if action is not None:
+        if action not in PROFILE_ACTIONS:
+            await ctx.send(f"사용법: !프로파일 [{'|'.join(PROFILE_ACTIONS)}]")
+            return
+        if not await is_admin(ctx):
+            await ctx.send('프로파일링 모드는 관리자만 바꿀 수 있습니다.')
+            return
+        profiler.enabled = PROFILE_ACTIONS[action]
+        logging.info(f"Profiling {'enabled' if profiler.enabled else 'disabled'} by {ctx.author}")
+
+    batch = outbound.batch(ctx.channel, separator='\n', description='profiling status')
+    batch.add(f"프로파일링: {'켜짐' if profiler.enabled else '꺼짐'} (저장 위치: {os.path.abspath(profiler.directory)}, "
+              f"{profiler.min_seconds}초 이상 걸린 작업/명령어만 저장)")
+    if profiler.enabled and profiler.sample_interval > 0:
+        batch.add(f"켜져 있는 동안 {profiler.sample_interval * 1000:.0f}ms마다 모든 스레드의 스택을 수집하므로 "
+                  f"작업과 명령어가 조금 느려질 수 있습니다. 측정이 끝나면 꺼주세요.")
+    for name, started_at, wall, path in reversed(profiler.recent):
+        batch.add(f"{datetime.fromtimestamp(started_at):%m-%d %H:%M:%S} {name} {wall:.2f}s ({os.path.basename(path)})")
+    await batch.flush()
+
+
+_backtest_pool = None
+
+
+def backtest_pool():
+    """백테스트 워커 풀 (처음 쓸 때 만들어 이후 백테스트에서 재사용, 워커가 하나면 None)"""
+    global _backtest_pool
+    import backtest
+    if _backtest_pool is None and BACKTEST_WORKERS > 1:
+        _backtest_pool = backtest.BacktestPool(BACKTEST_WORKERS)
+    return _backtest_pool
+
+
+@bot.command(name='백테스트')  # 신호 규칙을 과거 일봉에 적용한 결과 출력
+@metrics.timed('bot_command', command='백테스트')
+async def backtest_signals(ctx, *tickers):
+    input_data_size = len(ctx.message.content.encode('utf-8'))
+    logging.info(f'Command !백테스트 invoked with tickers: {tickers}', extra={'data_size': input_data_size, 'direction': 'input'})
+    # 티커가 입력되지 않으면 이 채널의 관심종목에 규칙 적용 (TQQQ/SOXL처럼 티커가 지정된 규칙은 해당 티커에도 적용)
+    targets = [ticker.upper() for ticker in tickers] or await io_executor.run(subscriptions.tickers_for, ctx.channel.id, None)
+    import backtest  # 백테스트 명령에서만 쓰므로 처음 사용할 때 불러옴
+    from signal_rules import RuleEngine
+    fetch_tickers = RuleEngine(signal_rule_list).tickers(targets)
+    try:
+        available, closes = await io_executor.run(backtest.load_closes, price_cache, fetch_tickers, BACKTEST_PERIOD,
+                                                  PRICE_BATCH_SIZE, timeout=BACKTEST_TIMEOUT)
+        results = await io_executor.run(backtest.run_backtest, closes, available, signal_rule_list, targets,
+                                        BACKTEST_HORIZON, backtest_pool(), timeout=BACKTEST_TIMEOUT)
+    except Exception as e:
+        error_message = f"백테스트 중 오류가 발생했습니다: {e}"
+        await ctx.send(error_message)
+        data_size = len(error_message.encode('utf-8'))
+        logging.error(f"Error running backtest: {e}", extra={'data_size': data_size, 'direction': 'output'})
+        return
+
+    batch = outbound.batch(ctx.channel, separator='\n', description='backtest results')
+    batch.add(f"백테스트: {len(available)}종목, {closes.shape[1]}봉 ({BACKTEST_PERIOD}), 적중 기준 {BACKTEST_HORIZON}봉 뒤 수익률")
+    for result in results:
+        batch.add(backtest.format_result(result))
+    await batch.flush()
+
+
+@bot.command(name='스크리너')  # 미리 계산한 지표 표에서 조건에 맞는 종목 검색
+@metrics.timed('bot_command', command='스크리너')
+async def screen_stocks(ctx, *filters):
+    global screener_table
+    import screener
+    input_data_size = len(ctx.message.content.encode('utf-8'))
+    logging.info(f'Command !스크리너 invoked with filters: {filters}', extra={'data_size': input_data_size, 'direction': 'input'})
+    if screener_table is None:
+        screener_table = await io_executor.run(load_screener_table)
+    table = screener_table
+    if table is None:
+        message = "스크리너 데이터가 아직 없습니다. 장 마감 후 자동으로 만들어집니다."
+    elif not filters:
+        message = (f"사용법: !스크리너 rsi<30 change>5 cross200up ({table.date.date()} 기준 {len(table)}종목)\n"
+                   f"항목: {', '.join(table.column_names())}, 돌파 방향은 crossN / crossNup / crossNdown")
+    else:
+        try:
+            rows, total = table.query(table.parse_filters(filters), limit=SCREENER_MAX_RESULTS)
+        except ValueError as e:
+            message = str(e)
+        else:
+            batch = outbound.batch(ctx.channel, separator='\n', description='screener results')
+            batch.add(f"스크리너 ({table.date.date()} 기준 {len(table)}종목 중 {total}종목): {' '.join(filters)}")
+            for position in rows:
+                batch.add(screener.format_row(table.row(position), WATCHLIST_MA_WINDOWS, RSI_PERIOD))
+            if total > len(rows):
+                batch.add(f"... 외 {total - len(rows)}종목")
+            await batch.flush()
+            return
+    await ctx.send(message)
+    data_size = len(message.encode('utf-8'))
+    logging.info(f'Sent screener message, size: {data_size} bytes', extra={'data_size': data_size, 'direction': 'output'})
+
+
 @bot.command(name='TQQQ_MA')
+@metrics.timed('bot_command', command='TQQQ_MA')
 async def calculate_ma(ctx):
     input_data_size = len(ctx.message.content.encode('utf-8'))
     logging.info('Command !TQQQ_MA invoked', extra={'data_size': input_data_size, 'direction': 'input'})
-    await calculate_ma_scheduled()
+    await send_signal_alerts([ctx.channel])
 
 
-async def calculate_ma_scheduled():
+@metrics.timed('bot_job', job='calculate_ma_scheduled')
+async def calculate_ma_scheduled(plan=None):
     logging.info('Running calculate_ma_scheduled')
-    channel = bot.get_channel(CHANNEL_ID)
-    if channel is not None:
-        await send_TQQQ_MA(channel)
-        await send_SOXL_MA(channel)
+    # 티커를 지정한 규칙의 신호는 관심종목을 구독한 모든 채널로 전송
+    if plan is None:
+        plan = await io_executor.run(subscriptions.plan)
+    channels = [channel for channel, _ in plan_targets(plan)]
+    if channels:
+        await send_signal_alerts(channels)
     else:
-        logging.error("채널을 찾을 수 없습니다. CHANNEL_ID를 확인하세요.")
+        logging.info('No subscribed channels, skipping signal alerts')
+
+
+# 지표 이름을 메시지용 이름으로 변환
+def indicator_label(name):
+    """'sma20' -> '20일 이동평균선'"""
+    if name.startswith('sma'):
+        return f"{name[3:]}일 이동평균선"
+    if name.startswith('ema'):
+        return f"{name[3:]}일 지수이동평균선"
+    if name.startswith('rsi'):
+        return f"RSI({name[3:]})"
+    return name
+
+
+# 장중 알림 메시지에 쓰는 신호 방향 표현
+INTRADAY_DIRECTION_TEXT = {'cross': ('상향 돌파', '하향 돌파'), 'change': ('상승', '하락')}
+
+
+def describe_intraday_alert(signal, snapshot):
+    latest_close = snapshot['close']
+    previous_close = snapshot['prev_close']
+    change_percent = ((latest_close - previous_close) / previous_close) * 100
+    up, down = INTRADAY_DIRECTION_TEXT.get(signal.rule.kind, ('매수 신호', '매도 신호'))
+    message = (f"[장중] **{signal.ticker}** {signal.rule.label} {up if signal.direction > 0 else down} - "
+               f"현재가: {latest_close:.2f} (전일 대비 {change_percent:.2f}%)")
+    if signal.rule.line:
+        message += f", {indicator_label(signal.rule.line)}: {snapshot[signal.rule.line]:.2f}"
+    return message
+
+
+@metrics.timed('bot_job', job='poll_intraday')
+async def poll_intraday():
+    """정규장 동안 관심종목/규칙 티커의 분봉을 한 번에 받아 새로 발생한 신호만 전송"""
+    from signal_rules import WATCHLIST
+    if not is_market_open():
+        return
+    plan = await io_executor.run(subscriptions.plan)
+    targets = plan_targets(plan)
+    if not targets:
+        return
 
+    watchlist = plan_tickers(plan)
+    tickers = intraday_monitor.tickers(watchlist)
+    # 이미 본 티커는 마지막으로 본 분봉부터만 받고 (세션이 길어져도 요청 크기가 늘지 않음), 처음 보는 티커만 오늘 하루치를 받음
+    # (마지막 분봉 시각이 다른 티커는 따로 묶어 요청하므로 거래가 뜸한 티커 때문에 전체 요청 범위가 늘지 않음)
+    fresh = [ticker for ticker in tickers if ticker not in intraday_monitor.last_seen]
+    bars = {}
+    if fresh:
+        bars.update(await io_executor.run(price_cache.download, fresh, period='1d', interval='1m', chunk_size=PRICE_BATCH_SIZE))
+    for start, group in intraday_monitor.resume_groups(tickers, INTRADAY_RESUME_GROUP):
+        bars.update(await io_executor.run(price_cache.download, group, start=start, interval='1m', chunk_size=PRICE_BATCH_SIZE))
+
+    # 세션이 바뀐 티커만 전일까지의 일봉으로 기준 상태를 다시 만듦
+    stale = intraday_monitor.stale(bars)
+    if stale:
+        daily = await io_executor.run(price_cache.get_many, stale, period='1y', chunk_size=PRICE_BATCH_SIZE)
+        for ticker in stale:
+            intraday_monitor.set_base(ticker, daily[ticker], intraday_monitor.session_date(bars[ticker]))
+
+    alerts = intraday_monitor.update(bars, set(watchlist))
+    if not alerts:
+        return
+    messages = []
+    for signal, snapshot in alerts:
+        messages.append((signal, describe_intraday_alert(signal, snapshot)))
+        logging.info(f'Intraday signal for ticker: {signal.ticker}: {signal.rule.name} ({signal.direction})')
+
+    async def send(channel, channel_tickers):
+        # 관심종목 규칙의 알림은 그 티커를 구독한 채널로, 티커를 지정한 규칙의 알림은 모든 채널로
+        batch = outbound.batch(channel, separator='\n', description='intraday alert')
+        for signal, message in messages:
+            if signal.rule.tickers != WATCHLIST:
+                batch.add(message)
+            elif signal.ticker in channel_tickers:
+                batch.add(message + mention_text(channel_tickers[signal.ticker]))
+        try:
+            await batch.flush()
+        except Exception as e:
+            logging.error(f"Error sending intraday alerts to channel {channel.id}: {e}")
 
-async def send_TQQQ_MA(channel):
-    ticker = 'TQQQ'
-    logging.info(f'Processing MA for ticker: {ticker}')
-    try:
-        data = yf.download(ticker, period='1y')  # 약 1년치 데이터
+    await asyncio.gather(*(send(channel, channel_tickers) for channel, channel_tickers in targets))
+
+
+async def send_signal_alerts(channels):
+    """티커를 지정한 신호 규칙을 한 번에 평가하여 매수/매도 신호를 채널마다 전송 (평가는 한 번만)"""
+    import reports
+    tickers = alert_rules.tickers()
+    logging.info(f'Processing signal rules for tickers: {tickers}')
+
+    # 규칙에 쓰이는 티커 전체 데이터를 한 번에 가져오기 (약 1년치)
+    prices = await io_executor.run(price_cache.get_many, tickers, period='1y', chunk_size=PRICE_BATCH_SIZE)
+
+    await rebuild_cold_indicators(prices)
+
+    results = []  # 모든 채널에 같은 내용을 보내므로 메시지를 먼저 모아둠
+    snapshots = {}
+    for ticker in tickers:
+        data = prices[ticker]
+        if data.empty:
+            # 조회에 실패한 티커는 지표 상태를 그대로 두고 이번 평가에서 제외
+            logging.error(f"No price data for ticker {ticker}, skipping signal rules")
+            continue
 
         # 다운로드한 데이터의 크기 로깅
         data_size = data.memory_usage(index=True).sum()
         logging.info(f'Fetched data for ticker: {ticker}, size: {data_size} bytes', extra={'data_size': data_size, 'direction': 'input'})
 
-        # 종가 데이터
-        closing_prices = data['Close']
+        try:
+            # 지표 상태에 새 봉 반영
+            snapshots[ticker] = indicator_state.update(ticker, data)
+        except Exception as e:
+            results.append(f"{ticker}의 MA를 계산하는 중 오류가 발생했습니다: {e}")
+            logging.error(f"Error calculating MA for ticker {ticker}: {e}")
+    await io_executor.run(indicator_state.save)
 
-        # 이동평균선 계산
-        ma_20 = closing_prices.rolling(window=20).mean()
-        ma_200 = closing_prices.rolling(window=200).mean()
+    # 모든 규칙을 한 번에 평가
+    evaluated = list(snapshots)
+    signals = alert_rules.evaluate(evaluated, reports.signal_values(alert_rules, evaluated, prices, snapshots, STATE_INDICATORS))
 
-        # 최신 데이터
-        latest_close = closing_prices.iloc[-1]
-        previous_close = closing_prices.iloc[-2]
-        latest_ma_20 = ma_20.iloc[-1]
-        previous_ma_20 = ma_20.iloc[-2]
-        latest_ma_200 = ma_200.iloc[-1]
-        previous_ma_200 = ma_200.iloc[-2]
+    for ticker in evaluated:
+        if not signals[ticker]:
+            logging.info(f'No significant changes for ticker: {ticker}')
+            continue
 
-        # 변화율 계산
+        snapshot = snapshots[ticker]
+        latest_close = snapshot['close']
+        previous_close = snapshot['prev_close']
         change_percent = ((latest_close - previous_close) / previous_close) * 100
 
-        # 매수/매도 신호 판별
-        significant = False
-        signals = []
-        if previous_close > previous_ma_20 and latest_close < latest_ma_20:
-            signals.append("20MA TQQQ 매도 신호")
-            significant = True
-        elif previous_close < previous_ma_20 and latest_close > latest_ma_20:
-            signals.append("20MA TQQQ 매수 신호")
-            significant = True
-        if previous_close > previous_ma_200 and latest_close < latest_ma_200:
-            signals.append("200MA TQQQ 매도 신호")
-            significant = True
-        elif previous_close < previous_ma_200 and latest_close > latest_ma_200:
-            signals.append("200MA TQQQ 매수 신호")
-            significant = True
-
-        if significant:
-            result = (f"TQQQ의 이전 종가: {previous_close:.2f}\n"
-                      f"TQQQ의 최신 종가: {latest_close:.2f} ({change_percent:.2f}%)\n"
-                      f"20일 이동평균선: {latest_ma_20:.2f}\n"
-                      f"200일 이동평균선: {latest_ma_200:.2f}\n"
-                      f"{', '.join(signals)}")
-            await channel.send(result)
-            data_size = len(result.encode('utf-8'))
-            logging.info(f'Sent MA message for ticker: {ticker}, size: {data_size} bytes', extra={'data_size': data_size, 'direction': 'output'})
-        else:
-            logging.info(f'No significant changes for ticker: {ticker}')
-    except Exception as e:
-        error_message = f"TQQQ의 MA를 계산하는 중 오류가 발생했습니다: {e}"
-        await channel.send(error_message)
-        data_size = len(error_message.encode('utf-8'))
-        logging.error(f"Error calculating MA for ticker {ticker}: {e}", extra={'data_size': data_size, 'direction': 'output'})
-
+        # 이 티커의 규칙에 쓰인 기준선 값과 매수/매도 신호 출력
+        lines = list(dict.fromkeys(rule.line for rule in alert_rules.rules_for(ticker) if rule.line))
+        texts = [f"{signal.rule.label} {ticker} {'매수' if signal.direction > 0 else '매도'} 신호" for signal in signals[ticker]]
+        result = (f"{ticker}의 이전 종가: {previous_close:.2f}\n"
+                  f"{ticker}의 최신 종가: {latest_close:.2f} ({change_percent:.2f}%)\n"
+                  + "".join(f"{indicator_label(line)}: {snapshot[line]:.2f}\n" for line in lines)
+                  + ', '.join(texts))
+        results.append(result)
+        logging.info(f'MA signal for ticker: {ticker}: {", ".join(texts)}')
+
+    async def send(channel):
+        batch = outbound.batch(channel, separator='\n\n', description='MA signal message')
+        for result in results:
+            batch.add(result)
+        try:
+            await batch.flush()
+        except Exception as e:
+            logging.error(f"Error sending MA signals to channel {channel.id}: {e}")
 
-async def send_SOXL_MA(channel):
-    ticker = 'SOXL'
-    logging.info(f'Processing MA for ticker: {ticker}')
-    try:
-        data = yf.download(ticker, period='1y')  # 약 1년치 데이터
+    await asyncio.gather(*(send(channel) for channel in channels))
 
-        # 다운로드한 데이터의 크기 로깅
-        data_size = data.memory_usage(index=True).sum()
-        logging.info(f'Fetched data for ticker: {ticker}, size: {data_size} bytes', extra={'data_size': data_size, 'direction': 'input'})
 
-        # 종가 데이터
-        closing_prices = data['Close']
+record_startup('import')
 
-        # 이동평균선 계산
-        ma_20 = closing_prices.rolling(window=20).mean()
-        ma_200 = closing_prices.rolling(window=200).mean()
 
-        # 최신 데이터
-        latest_close = closing_prices.iloc[-1]
-        previous_close = closing_prices.iloc[-2]
-        latest_ma_20 = ma_20.iloc[-1]
-        previous_ma_20 = ma_20.iloc[-2]
-        latest_ma_200 = ma_200.iloc[-1]
-        previous_ma_200 = ma_200.iloc[-2]
+# 지표 파일, 로그 기록과 저장소를 준비 (봇 실행, 벤치마크 등 모듈을 쓰기 전에 한 번, 무거운 서비스는 load_services())
+def setup():
+    open_metrics()
+    setup_logging()
+    open_stores()
 
-        # 변화율 계산
-        change_percent = ((latest_close - previous_close) / previous_close) * 100
 
-        # 매수/매도 신호 판별
-        significant = False
-        signals = []
-        if previous_close > previous_ma_20 and latest_close < latest_ma_20:
-            signals.append("20MA SOXL 매도 신호")
-            significant = True
-        elif previous_close < previous_ma_20 and latest_close > latest_ma_20:
-            signals.append("20MA SOXL 매수 신호")
-            significant = True
-        if previous_close > previous_ma_200 and latest_close < latest_ma_200:
-            signals.append("200MA SOXL 매도 신호")
-            significant = True
-        elif previous_close < previous_ma_200 and latest_close > latest_ma_200:
-            signals.append("200MA SOXL 매수 신호")
-            significant = True
-
-        if significant:
-            result = (f"SOXL의 이전 종가: {previous_close:.2f}\n"
-                      f"SOXL의 최신 종가: {latest_close:.2f} ({change_percent:.2f}%)\n"
-                      f"20일 이동평균선: {latest_ma_20:.2f}\n"
-                      f"200일 이동평균선: {latest_ma_200:.2f}\n"
-                      f"{', '.join(signals)}")
-            await channel.send(result)
-            data_size = len(result.encode('utf-8'))
-            logging.info(f'Sent MA message for ticker: {ticker}, size: {data_size} bytes', extra={'data_size': data_size, 'direction': 'output'})
-        else:
-            logging.info(f'No significant changes for ticker: {ticker}')
-    except Exception as e:
-        error_message = f"SOXL의 MA를 계산하는 중 오류가 발생했습니다: {e}"
-        await channel.send(error_message)
-        data_size = len(error_message.encode('utf-8'))
-        logging.error(f"Error calculating MA for ticker {ticker}: {e}", extra={'data_size': data_size, 'direction': 'output'})
+# 봇 실행
+def main():
+    setup()
+    if TOKEN is None:
+        logging.error("DISCORD_TOKEN is not set. Check your .env file.")
+        raise ValueError("DISCORD_TOKEN is not set. Check your .env file.")
+    threading.Thread(target=preload_services, name='service-loader', daemon=True).start()
+    try:
+        bot.run(TOKEN)
+    finally:
+        metrics.save()
 
 
-# 봇 실행
-bot.run(TOKEN)
+# 차트/샤드 워커 프로세스가 이 파일을 다시 불러올 때는 실행하지 않음
+if __name__ == '__main__':
+    main()
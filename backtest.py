@@ -0,0 +1,271 @@
+# 신호 규칙 백테스트 (캐시된 일봉 전체 기간에서 규칙별 적중률, 신호 후 수익률, 최대 낙폭 계산)
+# 실행: python backtest.py [--tickers NVDA TQQQ ...] [--period 10y] [--grid] [--workers 4]
+import os
+import sys
+import time
+import logging
+import argparse
+import tempfile
+import itertools
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+
+import indicators
+from executor import process_context
+from signal_rules import WATCHLIST, Rule, RuleEngine, load_rules, signal_directions
+
+
+DEFAULT_PERIOD = '10y'
+DEFAULT_HORIZON = 20  # 적중 여부를 판단할 신호 이후 기간(봉 수)
+
+# 워커 프로세스마다 백테스트 한 번에 한 번 읽어두는 종가 배열과 계산해둔 지표
+_closes = None
+_values = None
+_closes_key = None
+
+
+def _init_worker(closes):
+    global _closes, _values
+    _closes = closes
+    _values = {'close': closes}
+
+
+def _load_closes(key, path):
+    """이번 백테스트의 종가 배열 파일을 아직 읽지 않았으면 읽고 이전 지표를 버림"""
+    global _closes_key
+    if key != _closes_key:
+        _init_worker(np.load(path))
+        _closes_key = key
+
+
+def _indicator_values(closes, values, names):
+    """필요한 지표만 계산하여 values에 더함 (같은 워커의 다음 규칙에서 재사용)"""
+    missing = [name for name in names if name not in values]
+    if missing:
+        values.update(indicators.compute(closes, missing))
+    return values
+
+
+def forward_fill(array):
+    """행마다 NaN을 직전의 값으로 채움 (앞부분의 NaN은 그대로)"""
+    filled = ~np.isnan(array)
+    positions = np.where(filled, np.arange(array.shape[1]), 0)
+    np.maximum.accumulate(positions, axis=1, out=positions)
+    result = array[np.arange(array.shape[0])[:, None], positions]
+    result[~np.maximum.accumulate(filled, axis=1)] = np.nan
+    return result
+
+
+def max_drawdown(equity):
+    """행마다 자산 곡선의 최대 낙폭 (-0.3은 고점 대비 30% 하락)"""
+    peak = np.fmax.accumulate(equity, axis=1)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        return np.nanmin(equity / peak - 1, axis=1)
+
+
+def forward_returns(closes, horizon):
+    """각 봉에서 horizon봉 뒤까지의 수익률 (뒤쪽 horizon봉은 NaN)"""
+    forward = np.full(closes.shape, np.nan)
+    if horizon < closes.shape[1]:
+        forward[:, :-horizon] = closes[:, horizon:] / closes[:, :-horizon] - 1
+    return forward
+
+
+def evaluate_rule(rule, closes, values, mask, horizon=DEFAULT_HORIZON):
+    """규칙 하나를 mask에 해당하는 티커 전체 기간에 적용한 결과 (적중률, horizon봉 뒤 수익률, 매수→매도 매매의 수익률과 최대 낙폭)"""
+    # 모든 티커에 적용되는 규칙은 배열을 복사하지 않음
+    rows = slice(None) if mask.all() else mask
+    directions = signal_directions(rule.kind, rule.series, rule.line, rule.threshold, values)[rows].astype(float)
+    closes = closes[rows]
+
+    key = ('forward', horizon)
+    if key not in values:
+        values[key] = forward_returns(values['close'], horizon)
+    forward = values[key][rows]
+    events = directions != 0
+    evaluated = events & ~np.isnan(forward)
+    signed = (directions * forward)[evaluated]
+
+    # 보유 여부: 마지막 신호가 매수면 1, 매도면 0 (첫 신호 전에는 보유하지 않음)
+    position = np.nan_to_num(forward_fill(np.where(events, (directions > 0).astype(float), np.nan)))
+    with np.errstate(divide='ignore', invalid='ignore'):
+        daily = closes[:, 1:] / closes[:, :-1] - 1
+    strategy = np.nan_to_num(position[:, :-1] * daily)
+    equity = np.cumprod(1 + strategy, axis=1)
+
+    # 보유 후 수익률: 데이터가 있는 첫 봉부터 마지막 봉까지
+    first = np.argmax(~np.isnan(closes), axis=1)
+    buy_hold = closes[:, -1] / closes[np.arange(len(closes)), first] - 1
+
+    has_data = ~np.isnan(closes[:, -1])
+    valid = has_data.any() and equity.shape[1] > 0
+    drawdowns = max_drawdown(equity[has_data]) if valid else None
+    return {
+        'rule': rule.name,
+        'tickers': int(has_data.sum()),
+        'signals': int(events.sum()),
+        'evaluated': int(evaluated.sum()),
+        'hit_rate': float((signed > 0).mean()) if signed.size else float('nan'),
+        'avg_return': float(signed.mean()) if signed.size else float('nan'),
+        'strategy_return': float(np.nanmean(equity[has_data, -1] - 1)) if valid else float('nan'),
+        'buy_hold_return': float(np.nanmean(buy_hold[has_data])) if valid else float('nan'),
+        'max_drawdown': float(np.nanmean(drawdowns)) if valid else float('nan'),
+        'worst_drawdown': float(np.nanmin(drawdowns)) if valid else float('nan'),
+    }
+
+
+def _evaluate_task(task, closes=None, values=None):
+    rule, mask, horizon = task
+    if closes is None:
+        closes, values = _closes, _values
+    names = [rule.series] + ([rule.line] if rule.line is not None else [])
+    return evaluate_rule(rule, closes, _indicator_values(closes, values, names), mask, horizon)
+
+
+def _evaluate_file_task(item):
+    key, path, task = item
+    _load_closes(key, path)
+    return _evaluate_task(task)
+
+
+class BacktestPool:
+    """규칙을 나누어 계산하는 워커 프로세스 풀 (종가 배열은 임시 .npy 파일로 한 번만 넘기고 워커가 재사용)"""
+
+    def __init__(self, workers):
+        self.workers = workers
+        self._pool = ProcessPoolExecutor(max_workers=workers, mp_context=process_context())
+        self._calls = itertools.count()
+
+    def map(self, closes, tasks):
+        """작업들을 워커에 나누어 계산하고 결과를 작업 순서대로 반환"""
+        key = next(self._calls)
+        fd, path = tempfile.mkstemp(prefix='backtest-', suffix='.npy')
+        os.close(fd)
+        try:
+            np.save(path, closes)
+            chunksize = max(1, -(-len(tasks) // self.workers))
+            return list(self._pool.map(_evaluate_file_task, [(key, path, task) for task in tasks], chunksize=chunksize))
+        finally:
+            os.remove(path)
+
+    def shutdown(self):
+        self._pool.shutdown(wait=False)
+
+
+def grid_rules(ma_windows=(20, 50, 100, 200), rsi_periods=(14,), rsi_low=30, rsi_high=70, change_thresholds=(5,)):
+    """파라미터 조합마다 관심종목 전체에 적용되는 규칙을 만듦"""
+    rules = []
+    for window in ma_windows:
+        rules.append(Rule(f'{window}MA 돌파', WATCHLIST, 'cross', line=f'sma{window}'))
+    for period in rsi_periods:
+        rules.append(Rule(f'RSI{period} {rsi_low:g} 미만', WATCHLIST, 'below', series=f'rsi{period}', threshold=rsi_low))
+        rules.append(Rule(f'RSI{period} {rsi_high:g} 초과', WATCHLIST, 'above', series=f'rsi{period}', threshold=rsi_high))
+    for threshold in change_thresholds:
+        rules.append(Rule(f'{threshold:g}% 이상 변동', WATCHLIST, 'change', threshold=threshold))
+    return rules
+
+
+def run_backtest(closes, tickers, rules, watchlist=None, horizon=DEFAULT_HORIZON, pool=None):
+    """규칙마다 적용 대상 티커에 대해 백테스트하여 결과 목록 반환 (pool이 있으면 워커 프로세스에 나누어 계산)"""
+    watchlist = set(tickers if watchlist is None else watchlist)
+    tasks = []
+    for rule in rules:
+        mask = np.array([rule.applies_to(ticker, watchlist) for ticker in tickers], dtype=bool)
+        if mask.any():
+            tasks.append((rule, mask, horizon))
+    # 같은 지표를 쓰는 규칙이 같은 워커에 연속으로 배정되도록 정렬 (워커 안에서 지표 계산 재사용)
+    order = sorted(range(len(tasks)), key=lambda i: (tasks[i][0].series, str(tasks[i][0].line)))
+
+    if pool is None or pool.workers <= 1 or len(tasks) <= 1:
+        values = {'close': closes}
+        results = [_evaluate_task(tasks[i], closes, values) for i in order]
+    else:
+        results = pool.map(closes, [tasks[i] for i in order])
+
+    by_task = dict(zip(order, results))
+    return [by_task[i] for i in range(len(tasks))]
+
+
+def load_closes(price_cache, tickers, period=DEFAULT_PERIOD, chunk_size=50):
+    """가격 캐시에서 티커들의 일봉을 읽어 (데이터가 있는 티커 목록, 종가 배열) 반환"""
+    prices = price_cache.get_many(tickers, period=period, chunk_size=chunk_size)
+    available = [ticker for ticker in prices if not prices[ticker].empty]
+    return available, indicators.close_matrix(prices, available)
+
+
+def _percent(value):
+    return 'N/A' if np.isnan(value) else f'{value * 100:.1f}%'
+
+
+def format_result(result):
+    return (
+        f"**{result['rule']}** ({result['tickers']}종목, 신호 {result['signals']}회): "
+        f"적중률 {_percent(result['hit_rate'])}, 신호 후 평균 수익률 {_percent(result['avg_return'])}, "
+        f"전략 수익률 {_percent(result['strategy_return'])} (보유 {_percent(result['buy_hold_return'])}), "
+        f"최대 낙폭 평균 {_percent(result['max_drawdown'])} / 최악 {_percent(result['worst_drawdown'])}"
+    )
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='신호 규칙 백테스트')
+    parser.add_argument('--tickers', nargs='*', help='대상 티커 (기본값: 관심종목 파일, 없으면 모든 채널의 관심종목)')
+    parser.add_argument('--watchlist-file', default='watchlist.txt')
+    parser.add_argument('--subscriptions', default='subscriptions.db', help='관심종목 구독 데이터베이스')
+    parser.add_argument('--rules', default='signal_rules.json', help='신호 규칙 설정 파일')
+    parser.add_argument('--grid', action='store_true', help='설정 파일 대신 파라미터 조합으로 규칙 생성')
+    parser.add_argument('--ma', default='20,50,100,200', help='이동평균 기간 목록 (--grid)')
+    parser.add_argument('--rsi', default='14', help='RSI 기간 목록 (--grid)')
+    parser.add_argument('--rsi-low', type=float, default=30)
+    parser.add_argument('--rsi-high', type=float, default=70)
+    parser.add_argument('--change', default='5', help='변동률 임계값(%%) 목록 (--grid)')
+    parser.add_argument('--period', default=DEFAULT_PERIOD)
+    parser.add_argument('--horizon', type=int, default=DEFAULT_HORIZON)
+    parser.add_argument('--workers', type=int, default=os.cpu_count() or 1)
+    parser.add_argument('--cache-dir', default='price_cache')
+    parser.add_argument('--provider', default='yahoo', help="데이터 제공자 ('yahoo', 'synthetic', 'fixture:<폴더>')")
+    args = parser.parse_args(argv)
+
+    logging.basicConfig(level=logging.WARNING, format='%(asctime)s %(levelname)s:%(message)s')
+
+    if args.tickers:
+        watchlist = [ticker.upper() for ticker in args.tickers]
+    elif os.path.exists(args.watchlist_file):
+        with open(args.watchlist_file, 'r', encoding='utf-8') as f:
+            watchlist = [line.strip().upper() for line in f if line.strip()]
+    else:
+        from subscriptions import SubscriptionStore, plan_tickers
+        watchlist = plan_tickers(SubscriptionStore(args.subscriptions).plan())
+
+    if args.grid:
+        rules = grid_rules(
+            ma_windows=[int(value) for value in args.ma.split(',')],
+            rsi_periods=[int(value) for value in args.rsi.split(',')],
+            rsi_low=args.rsi_low, rsi_high=args.rsi_high,
+            change_thresholds=[float(value) for value in args.change.split(',')],
+        )
+    else:
+        rules = load_rules(args.rules)
+
+    from data_provider import make_provider
+    from price_cache import PriceCache
+    tickers = RuleEngine(rules).tickers(watchlist)
+    started = time.perf_counter()
+    available, closes = load_closes(PriceCache(args.cache_dir, provider=make_provider(args.provider)), tickers, args.period)
+    loaded = time.perf_counter()
+    pool = BacktestPool(args.workers) if args.workers > 1 else None
+    try:
+        results = run_backtest(closes, available, rules, watchlist, args.horizon, pool)
+    finally:
+        if pool is not None:
+            pool.shutdown()
+    finished = time.perf_counter()
+
+    for result in results:
+        print(format_result(result).replace('**', ''))
+    print(f'{len(available)} tickers x {closes.shape[1]} bars, {len(results)} rules: '
+          f'load {loaded - started:.2f}s, backtest {finished - loaded:.2f}s')
+
+
+if __name__ == '__main__':
+    sys.exit(main())
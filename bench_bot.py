@@ -0,0 +1,351 @@
+# 정기 작업 전체의 오프라인 벤치마크 (가상 시세와 FakeChannel로 작업별 시간, 최대 RSS, 외부 호출 수, 단계별 시간 출력)
+# 실행: python bench_bot.py [--tickers 10 100 1000] [--channels 1] [--shards 0] [--provider synthetic | fixture:<폴더>]
+#       [--keep-rate-limits] [--startup [--connect-delay 1.0]]
+import os
+import sys
+import json
+import time
+import shutil
+import asyncio
+import argparse
+import tempfile
+import subprocess
+from types import SimpleNamespace
+
+REPO_DIR = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, REPO_DIR)
+
+
+TICKER_COUNTS = (10, 100, 1000)
+JOBS = ('calculate_ma_scheduled', 'stock_price_notification', 'check_watchlist', 'check_news', 'refresh_screener',
+        'evening_pipeline')
+
+
+class FakeChannel:
+    """디스코드 채널 대신 보낸 메시지 수와 크기만 기록하는 채널"""
+
+    def __init__(self, channel_id=0):
+        self.id = channel_id
+        self.messages = 0
+        self.files = 0
+        self.bytes = 0
+
+    async def send(self, content=None, **kwargs):
+        files = kwargs.get('files') or ([kwargs['file']] if kwargs.get('file') else [])
+        self.messages += 1
+        self.files += len(files)
+        self.bytes += len((content or '').encode('utf-8'))
+
+
+class FakeContext:
+    """명령어 함수에 넘길 최소한의 commands.Context 대용"""
+
+    def __init__(self, channel, content):
+        self.channel = channel
+        self.message = SimpleNamespace(content=content)
+        self.author = SimpleNamespace(id=1)
+
+    async def send(self, content=None, **kwargs):
+        await self.channel.send(content, **kwargs)
+
+
+class CountingProvider:
+    """다른 제공자로 넘기면서 호출 수를 셈 (--startup에서 봇 모듈보다 pandas를 먼저 불러오지 않도록 data_provider를 상속하지 않음)"""
+
+    def __init__(self, inner):
+        self.inner = inner
+        self.download_calls = 0
+        self.download_tickers = 0
+        self.news_calls = 0
+
+    def download(self, tickers, interval='1d', threads=True, **kwargs):
+        self.download_calls += 1
+        self.download_tickers += 1 if isinstance(tickers, str) else len(tickers)
+        return self.inner.download(tickers, interval=interval, threads=threads, **kwargs)
+
+    def news(self, ticker):
+        self.news_calls += 1
+        return self.inner.news(ticker)
+
+
+def peak_rss_mb():
+    """지금까지의 최대 메모리 사용량(MB)"""
+    try:
+        import resource
+    except ImportError:
+        try:
+            import psutil
+        except ImportError:
+            return float('nan')
+        info = psutil.Process().memory_info()
+        return getattr(info, 'peak_wset', info.rss) / 2 ** 20
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return peak / 2 ** 20 if sys.platform == 'darwin' else peak / 1024
+
+
+def benchmark_tickers(provider_spec):
+    """벤치마크에 쓸 티커 목록 (fixture면 기록된 티커, 아니면 가상 티커)"""
+    kind, _, argument = provider_spec.partition(':')
+    if kind == 'fixture':
+        return sorted(name[:-4] for name in os.listdir(os.path.join(argument, '1d')) if name.endswith('.pkl'))
+    return [f'T{index:04d}' for index in range(max(TICKER_COUNTS) * 10)]
+
+
+def stage_totals(registry):
+    """job_stage 타이머의 (작업, 단계)별 누적 시간"""
+    histogram = registry.histogram('job_stage_duration_seconds')
+    return {tuple(value for _, value in key): state[-2] for key, state in histogram.values.items()}
+
+
+def channel_totals(channels):
+    return sum(channel.messages for channel in channels), sum(channel.files for channel in channels)
+
+
+async def measure_loop_lag(interval, lags):
+    """interval마다 깨어나서 예정보다 늦게 깨어난 최대 시간을 lags[0]에 기록"""
+    while True:
+        expected = time.perf_counter() + interval
+        await asyncio.sleep(interval)
+        lags[0] = max(lags[0], time.perf_counter() - expected)
+
+
+async def run_jobs(bot, channels, counter, tickers):
+    rows = []
+    for phase in ('cold', 'warm'):
+        for job in JOBS:
+            lags = [0.0]
+            monitor = asyncio.ensure_future(measure_loop_lag(0.01, lags))
+            before = (counter.download_calls, counter.download_tickers, counter.news_calls,
+                      *channel_totals(channels), bot.chart_renderer.misses)
+            stages_before = stage_totals(bot.metrics)
+            started = time.perf_counter()
+            # 저녁 작업 파이프라인은 실행 기록 없이 단계만 실행 (같은 예정 시각을 두 번 실행하지 않는 검사를 건너뜀)
+            await (bot.evening_pipeline.run() if job == 'evening_pipeline' else getattr(bot, job)())
+            wall = time.perf_counter() - started
+            monitor.cancel()
+            after = (counter.download_calls, counter.download_tickers, counter.news_calls,
+                     *channel_totals(channels), bot.chart_renderer.misses)
+            stages = {stage: total - stages_before.get((name, stage), 0.0)
+                      for (name, stage), total in stage_totals(bot.metrics).items() if name == job}
+            delta = [b - a for a, b in zip(before, after)]
+            rows.append({
+                'tickers': len(tickers), 'channels': len(channels), 'phase': phase, 'job': job, 'wall': wall,
+                'loop_lag': lags[0], 'peak_rss_mb': peak_rss_mb(),
+                'downloads': delta[0], 'downloaded_tickers': delta[1], 'news_calls': delta[2],
+                'messages': delta[3], 'files': delta[4], 'charts_rendered': delta[5], 'stages': stages,
+            })
+    return rows
+
+
+def run_worker(count, channel_count, shards, provider_spec, keep_rate_limits):
+    """새 작업 폴더에서 봇 모듈을 불러와 티커 count개를 구독한 채널 channel_count개로 작업을 실행하고 결과를 JSON 줄로 출력"""
+    workdir = tempfile.mkdtemp(prefix='bench_bot_')
+    shutil.copy(os.path.join(REPO_DIR, 'signal_rules.json'), workdir)
+    os.chdir(workdir)
+    from data_provider import make_provider
+    counter = CountingProvider(make_provider(provider_spec))
+    os.environ['DATA_PROVIDER'] = provider_spec
+    os.environ['SHARD_WORKERS'] = str(shards)
+
+    import logging
+    import Discord_Stock as bot
+    from outbound import Outbound
+
+    logging.getLogger().setLevel(logging.WARNING)
+    bot.setup()
+    bot.load_services()
+    # 재시도/서킷 브레이커는 그대로 두고 실제 요청만 집계 제공자로 바꿈
+    bot.data_provider.provider = counter
+    bot.start_shard_pool()
+    if not keep_rate_limits:
+        # 속도 제한 대기 시간이 아니라 봇 자체의 처리 시간을 재기 위해 제한을 끔
+        bot.price_cache.rate_limiter = None
+        bot.outbound = Outbound(rate=1e9, burst=10 ** 9)
+    channels = {channel_id: FakeChannel(channel_id) for channel_id in range(1, channel_count + 1)}
+    bot.bot.get_channel = channels.get
+
+    tickers = benchmark_tickers(provider_spec)[:count]
+    for channel_id in channels:
+        for ticker in tickers:
+            bot.subscriptions.add(ticker, channel_id)
+    try:
+        rows = asyncio.run(run_jobs(bot, list(channels.values()), counter, tickers))
+    finally:
+        if bot.shard_pool is not None:
+            bot.shard_pool.shutdown()
+        bot.chart_renderer.shutdown()
+        bot.io_executor.shutdown()
+        os.chdir(REPO_DIR)
+        shutil.rmtree(workdir, ignore_errors=True)
+    for row in rows:
+        print(json.dumps(row))
+
+
+def prepare_startup(count, provider_spec):
+    """현재 폴더에 티커 count개를 구독한 채널과 채워진 캐시를 만든 뒤, 전날 받은 것처럼 가격 캐시를 오래된 상태로 바꿈"""
+    import logging
+    import Discord_Stock as bot
+
+    logging.getLogger().setLevel(logging.WARNING)
+    bot.setup()
+    bot.load_services()
+    tickers = benchmark_tickers(provider_spec)[:count]
+    for ticker in tickers:
+        bot.subscriptions.add(ticker, 1)
+    prices = bot.price_cache.get_many(tickers, period='2Y', chunk_size=bot.PRICE_BATCH_SIZE)
+    for ticker, data in prices.items():
+        bot.indicator_state.update(ticker, data)
+    bot.indicator_state.save()
+    for entry in bot.price_cache.index.values():
+        entry['fetched_at'] -= 86400
+    bot.price_cache._save_index()
+    bot.io_executor.shutdown()
+    bot.chart_renderer.shutdown()
+
+
+async def measure_startup(bot, channel, ticker, warm, connect_delay):
+    """서비스 시작, 게이트웨이 연결 대기, 첫 !종가(채널 관심종목), 첫 차트 렌더링 시간"""
+    async def no_warm():
+        pass
+
+    if not warm:
+        bot.warm_caches = no_warm
+    timings = {}
+    started = time.perf_counter()
+    await bot.start_services()
+    timings['services'] = time.perf_counter() - started
+    await asyncio.sleep(connect_delay)
+
+    started = time.perf_counter()
+    await bot.stock_price.callback(FakeContext(channel, '!종가'))
+    timings['first_command'] = time.perf_counter() - started
+    timings['first_command_since_start'] = time.perf_counter() - bot.STARTUP_STARTED
+
+    started = time.perf_counter()
+    data = await bot.io_executor.run(bot.price_cache.get, ticker, period='2Y')
+    await bot.chart_renderer.render(ticker, data)
+    timings['first_chart'] = time.perf_counter() - started
+    if bot.warmup_task is not None:
+        await bot.warmup_task
+    timings['warm_since_start'] = bot.startup_timings.get('warm', float('nan'))
+    bot.scheduler.shutdown(wait=False)
+    if bot.metrics_runner is not None:
+        await bot.metrics_runner.cleanup()
+    return timings
+
+
+def run_startup_worker(count, warm, connect_delay, provider_spec, keep_rate_limits):
+    """준비한 폴더를 복사한 새 작업 폴더에서 봇 모듈을 처음 불러오는 것부터 측정하여 결과를 JSON 줄로 출력"""
+    workdir = tempfile.mkdtemp(prefix='bench_startup_')
+    os.chdir(workdir)
+    shutil.copy(os.path.join(REPO_DIR, 'signal_rules.json'), workdir)
+    os.environ['DATA_PROVIDER'] = provider_spec
+    subprocess.run([sys.executable, os.path.abspath(__file__), '--prepare-startup', str(count), '--provider', provider_spec],
+                   check=True, capture_output=True)
+
+    started = time.perf_counter()
+    import logging
+    import threading
+    import Discord_Stock as bot
+    from outbound import Outbound
+    bot.setup()
+    import_seconds = time.perf_counter() - started
+
+    logging.getLogger().setLevel(logging.WARNING)
+    bot.METRICS_PORT = 0
+    if not keep_rate_limits:
+        # 가격 캐시는 아래에서 서비스를 만들 때 이 값으로 속도 제한을 설정함
+        bot.YAHOO_RATE = bot.YAHOO_BURST = 10 ** 9
+        bot.outbound = Outbound(rate=1e9, burst=10 ** 9)
+    # main()과 같이 로그인하는 동안 서비스를 미리 만듦
+    threading.Thread(target=bot.preload_services, daemon=True).start()
+    channel = FakeChannel(1)
+    bot.bot.get_channel = {1: channel}.get
+    ticker = benchmark_tickers(provider_spec)[0]
+    try:
+        timings = asyncio.run(measure_startup(bot, channel, ticker, warm, connect_delay))
+    finally:
+        bot.chart_renderer.shutdown()
+        bot.io_executor.shutdown()
+        os.chdir(REPO_DIR)
+        shutil.rmtree(workdir, ignore_errors=True)
+    print(json.dumps({'tickers': count, 'warm': warm, 'import': import_seconds, **timings}))
+
+
+def run_startup(args, provider_spec):
+    print(f"{'tickers':>7} {'warm':>5} {'import(s)':>9} {'services(s)':>11} {'1st cmd(s)':>10} {'since start(s)':>14} {'1st chart(s)':>12} {'warmed at(s)':>12}")
+    for count in args.tickers:
+        for warm in (False, True):
+            command = [sys.executable, os.path.abspath(__file__), '--startup-worker', str(count), '--provider', provider_spec,
+                       '--connect-delay', str(args.connect_delay)]
+            if warm:
+                command.append('--warm')
+            if args.keep_rate_limits:
+                command.append('--keep-rate-limits')
+            result = subprocess.run(command, capture_output=True, text=True, encoding='utf-8')
+            if result.returncode != 0:
+                print(result.stderr, file=sys.stderr)
+                sys.exit(result.returncode)
+            for line in result.stdout.splitlines():
+                if line.startswith('{'):
+                    row = json.loads(line)
+                    print(f"{row['tickers']:>7} {'on' if row['warm'] else 'off':>5} {row['import']:>9.2f} {row['services']:>11.2f} "
+                          f"{row['first_command']:>10.2f} {row['first_command_since_start']:>14.2f} {row['first_chart']:>12.2f} {row['warm_since_start']:>12.2f}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description='봇 정기 작업 오프라인 벤치마크')
+    parser.add_argument('--tickers', nargs='*', type=int, default=list(TICKER_COUNTS))
+    parser.add_argument('--channels', type=int, default=1, help='같은 관심종목을 구독한 채널 수')
+    parser.add_argument('--shards', type=int, default=0, help='샤드 워커 프로세스 수 (0이면 한 프로세스)')
+    parser.add_argument('--provider', default='synthetic', help="'synthetic' 또는 'fixture:<폴더>'")
+    parser.add_argument('--keep-rate-limits', action='store_true', help='Yahoo/디스코드 속도 제한을 그대로 적용')
+    parser.add_argument('--startup', action='store_true', help='재시작 후 첫 응답까지의 시간을 캐시 예열 여부별로 측정')
+    parser.add_argument('--connect-delay', type=float, default=1.0, help='로그인 후 게이트웨이 연결까지 걸린다고 가정할 시간(초)')
+    parser.add_argument('--worker', type=int, help=argparse.SUPPRESS)
+    parser.add_argument('--startup-worker', type=int, help=argparse.SUPPRESS)
+    parser.add_argument('--prepare-startup', type=int, help=argparse.SUPPRESS)
+    parser.add_argument('--warm', action='store_true', help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    provider_spec = args.provider
+    kind, _, argument = provider_spec.partition(':')
+    if kind == 'fixture':
+        provider_spec = f'fixture:{os.path.abspath(argument)}'
+
+    if args.worker is not None:
+        run_worker(args.worker, args.channels, args.shards, provider_spec, args.keep_rate_limits)
+        return
+    if args.prepare_startup is not None:
+        prepare_startup(args.prepare_startup, provider_spec)
+        return
+    if args.startup_worker is not None:
+        run_startup_worker(args.startup_worker, args.warm, args.connect_delay, provider_spec, args.keep_rate_limits)
+        return
+    if args.startup:
+        run_startup(args, provider_spec)
+        return
+
+    print(f"{'tickers':>7} {'phase':>5} {'job':<25} {'wall(s)':>8} {'lag(s)':>7} {'peakRSS':>8} {'dl':>4} {'dl tk':>6} "
+          f"{'news':>5} {'msgs':>5} {'files':>5} {'charts':>6}  stages")
+    for count in args.tickers:
+        command = [sys.executable, os.path.abspath(__file__), '--worker', str(count), '--channels', str(args.channels),
+                   '--shards', str(args.shards), '--provider', provider_spec]
+        if args.keep_rate_limits:
+            command.append('--keep-rate-limits')
+        result = subprocess.run(command, capture_output=True, text=True, encoding='utf-8')
+        if result.returncode != 0:
+            print(result.stderr, file=sys.stderr)
+            sys.exit(result.returncode)
+        for line in result.stdout.splitlines():
+            if not line.startswith('{'):
+                continue
+            row = json.loads(line)
+            stages = ' '.join(f'{stage}={seconds:.2f}s' for stage, seconds in row['stages'].items())
+            print(f"{row['tickers']:>7} {row['phase']:>5} {row['job']:<25} {row['wall']:>8.2f} {row['loop_lag']:>7.2f} {row['peak_rss_mb']:>7.0f}M "
+                  f"{row['downloads']:>4} {row['downloaded_tickers']:>6} {row['news_calls']:>5} {row['messages']:>5} "
+                  f"{row['files']:>5} {row['charts_rendered']:>6}  {stages}")
+
+
+if __name__ == '__main__':
+    main()
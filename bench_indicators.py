@@ -0,0 +1,67 @@
+# indicators 모듈과 기존 티커별 pandas 계산의 속도 비교
+# 실행: python bench_indicators.py [봉 수]
+import sys
+import time
+
+import numpy as np
+import pandas as pd
+
+import indicators
+
+
+WINDOWS = (20, 50, 100, 200)
+TICKER_COUNTS = (10, 100, 1000)
+
+
+def make_frames(count, bars, seed=0):
+    """랜덤워크로 만든 가상 종가 데이터"""
+    rng = np.random.default_rng(seed)
+    index = pd.bdate_range(end=pd.Timestamp.today().normalize(), periods=bars)
+    return {
+        f'T{i:04d}': pd.DataFrame({'Close': 100 * np.exp(np.cumsum(rng.normal(0, 0.02, bars)))}, index=index)
+        for i in range(count)
+    }
+
+
+def pandas_per_ticker(frames):
+    """기존 봇 코드와 같은 방식: 티커마다 rolling().mean()과 RSI를 따로 계산"""
+    results = {}
+    for ticker, data in frames.items():
+        closes = data['Close']
+        mas = [closes.rolling(window=window).mean().iloc[-1] for window in WINDOWS]
+        delta = closes.diff()
+        gain = (delta.where(delta > 0, 0)).rolling(window=14).mean()
+        loss = (-delta.where(delta < 0, 0)).rolling(window=14).mean()
+        rsi = 100 - (100 / (1 + gain / loss))
+        results[ticker] = mas + [rsi.iloc[-1]]
+    return results
+
+
+def vectorized(frames):
+    """indicators 모듈: 전체 티커를 하나의 배열로 한 번에 계산"""
+    tickers = list(frames)
+    closes = indicators.close_matrix(frames, tickers)
+    return indicators.compute(closes, [f'sma{window}' for window in WINDOWS] + ['rsi14'])
+
+
+def best_of(func, frames, repeat=3):
+    timings = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        func(frames)
+        timings.append(time.perf_counter() - started)
+    return min(timings)
+
+
+def main():
+    bars = int(sys.argv[1]) if len(sys.argv) > 1 else 504  # 약 2년치 일봉
+    print(f"{'tickers':>8} {'pandas (s)':>12} {'vectorized (s)':>15} {'speedup':>8}")
+    for count in TICKER_COUNTS:
+        frames = make_frames(count, bars)
+        pandas_time = best_of(pandas_per_ticker, frames)
+        vectorized_time = best_of(vectorized, frames)
+        print(f"{count:>8} {pandas_time:>12.4f} {vectorized_time:>15.4f} {pandas_time / vectorized_time:>7.1f}x")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,168 @@
+import os
+import io
+import asyncio
+import hashlib
+import logging
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+
+import indicators
+from executor import process_context
+
+
+# 워커 프로세스마다 한 번 만들어두고 재사용하는 차트 템플릿
+_template = None
+
+
+class ChartTemplate:
+    """Figure/축/선/범례를 미리 만들어두고 데이터만 바꿔서 렌더링하는 Agg 차트"""
+
+    def __init__(self, windows, figsize=(6, 4), dpi=80):
+        # 워커 프로세스에서만 matplotlib을 불러옴
+        from matplotlib.figure import Figure
+        from matplotlib.backends.backend_agg import FigureCanvasAgg
+
+        self.windows = tuple(windows)
+        self.dpi = dpi
+        self.fig = Figure(figsize=figsize, dpi=dpi)
+        self.canvas = FigureCanvasAgg(self.fig)
+        self.ax = self.fig.add_subplot()
+        # 날짜 축 단위를 등록하기 위해 빈 날짜 데이터로 선을 만들어 둠
+        empty_dates = np.array([], dtype='datetime64[D]')
+        self.close_line, = self.ax.plot(empty_dates, [], label='Close Price')
+        self.ma_lines = {window: self.ax.plot(empty_dates, [], label=f'{window}MA')[0] for window in self.windows}
+        self.ax.set_xlabel("Date")
+        self.ax.set_ylabel("Price")
+        self.ax.legend()
+
+    def render(self, ticker, dates, closes):
+        """종가와 이동평균선을 그려 PNG 바이트로 반환"""
+        row = closes.reshape(1, -1)
+        series = indicators.compute(row, [f'sma{window}' for window in self.windows])
+        self.close_line.set_data(dates, closes)
+        for window, line in self.ma_lines.items():
+            line.set_data(dates, series[f'sma{window}'][0])
+        self.ax.set_title(f"{ticker} Chart")
+        self.ax.relim()
+        self.ax.autoscale_view()
+
+        buf = io.BytesIO()
+        self.fig.savefig(buf, format='png', dpi=self.dpi)
+        return buf.getvalue()
+
+
+def _init_worker(windows):
+    global _template
+    _template = ChartTemplate(windows)
+
+
+def _render(ticker, dates, closes):
+    return _template.render(ticker, dates, closes)
+
+
+def _warm():
+    return os.getpid()
+
+
+class ChartRenderer:
+    """차트를 워커 프로세스 풀에서 렌더링하고 결과 PNG를 (티커, 마지막 봉 날짜, 지표 구성) 기준으로 캐시"""
+
+    def __init__(self, cache_dir='chart_cache', windows=(20, 50, 100, 200), max_workers=2, timeout=30, max_files=500):
+        self.cache_dir = cache_dir
+        self.windows = tuple(windows)
+        self.timeout = timeout  # 차트 하나당 제한 시간(초)
+        self.max_files = max_files  # 캐시에 보관할 최대 PNG 수
+        self.max_workers = max_workers
+        # max_workers가 0이면 풀 없이 render_sync()로 현재 프로세스에서 렌더링 (샤드 워커 프로세스용)
+        self._pool = None
+        if max_workers > 0:
+            self._pool = ProcessPoolExecutor(max_workers=max_workers, mp_context=process_context(),
+                                             initializer=_init_worker, initargs=(self.windows,))
+        self.hits = 0
+        self.misses = 0
+
+        if not os.path.exists(self.cache_dir):
+            os.makedirs(self.cache_dir)
+            logging.info(f"Created chart cache directory at {self.cache_dir}")
+
+    def _cache_path(self, ticker, data):
+        """캐시 파일 경로 (마지막 봉의 종가까지 키에 넣어 장중에 갱신된 봉은 다시 렌더링)"""
+        last_date = data.index[-1].strftime('%Y%m%d')
+        indicator_set = '-'.join(str(window) for window in self.windows)
+        digest = hashlib.blake2b(f"{len(data)}:{float(data['Close'].iloc[-1])!r}".encode('utf-8'), digest_size=4).hexdigest()
+        return os.path.join(self.cache_dir, f"{ticker}_{last_date}_{indicator_set}_{digest}.png")
+
+    def _cached(self, ticker, path):
+        if not os.path.exists(path):
+            return None
+        self.hits += 1
+        logging.info(f'Chart cache hit for ticker: {ticker}')
+        with open(path, 'rb') as f:
+            return io.BytesIO(f.read())
+
+    @staticmethod
+    def _series(data):
+        return data.index.values.astype('datetime64[D]'), indicators.close_row(data)[0]
+
+    def _store(self, path, png):
+        tmp_path = path + '.tmp'
+        with open(tmp_path, 'wb') as f:
+            f.write(png)
+        os.replace(tmp_path, path)
+        self._prune()
+        return io.BytesIO(png)
+
+    async def render(self, ticker, data):
+        """차트 PNG를 io.BytesIO로 반환 (같은 차트는 캐시에서 바로 반환)"""
+        path = self._cache_path(ticker, data)
+        cached = self._cached(ticker, path)
+        if cached is not None:
+            return cached
+
+        self.misses += 1
+        future = self._pool.submit(_render, ticker, *self._series(data))
+        png = await asyncio.wait_for(asyncio.wrap_future(future), self.timeout)
+        return self._store(path, png)
+
+    def render_sync(self, ticker, data):
+        """render()와 같지만 현재 프로세스에서 바로 렌더링 (템플릿은 처음 호출할 때 한 번 만듦)"""
+        path = self._cache_path(ticker, data)
+        cached = self._cached(ticker, path)
+        if cached is not None:
+            return cached
+
+        self.misses += 1
+        if _template is None:
+            _init_worker(self.windows)
+        return self._store(path, _render(ticker, *self._series(data)))
+
+    async def warm(self):
+        """워커 프로세스를 모두 미리 시작하여 차트 템플릿(matplotlib)을 만들어둠 (첫 차트가 워커 시작을 기다리지 않도록)"""
+        if self._pool is None:
+            return
+        futures = [asyncio.wrap_future(self._pool.submit(_warm)) for _ in range(self.max_workers)]
+        await asyncio.wait_for(asyncio.gather(*futures), self.timeout)
+
+    def _prune(self):
+        """캐시 파일 수가 상한을 넘으면 오래된 파일부터 삭제"""
+        files = [os.path.join(self.cache_dir, name) for name in os.listdir(self.cache_dir) if name.endswith('.png')]
+        if len(files) <= self.max_files:
+            return
+        try:
+            files.sort(key=os.path.getmtime)
+        except OSError:
+            # 다른 프로세스가 같은 폴더를 정리하는 중이면 다음 기회에 정리
+            return
+        for path in files[:len(files) - self.max_files]:
+            try:
+                os.remove(path)
+            except OSError as e:
+                logging.error(f"Failed to remove cached chart {path}: {e}")
+
+    def stats(self):
+        return {'hits': self.hits, 'misses': self.misses}
+
+    def shutdown(self):
+        if self._pool is not None:
+            self._pool.shutdown(wait=False)
@@ -0,0 +1,82 @@
+import time
+import asyncio
+import logging
+from collections import OrderedDict
+
+from market_hours import is_market_open, last_market_close, market_now, seconds_until_next_open
+
+
+class CommandCache:
+    """명령어 결과 캐시 (장중 open_ttl초, 장 마감 후 settle초가 지난 결과는 다음 장 시작까지 재사용하고 같은 키의 동시 요청은 계산 하나를 공유)"""
+
+    def __init__(self, open_ttl=60, max_entries=1000, settle=0):
+        self.open_ttl = open_ttl
+        self.max_entries = max_entries
+        self.settle = settle  # 장 마감 후 데이터가 완성 봉으로 바뀌었다고 볼 때까지의 시간(초)
+        self.entries = OrderedDict()  # 키 -> (결과, 만료 시각)
+        self.inflight = {}  # 키 -> 진행 중인 계산의 Future
+        self.hits = 0
+        self.misses = 0
+        self.coalesced = 0
+
+    def ttl(self, started=None):
+        """started(계산을 시작한 시각)에 만든 결과를 재사용할 시간(초)"""
+        now = market_now()
+        started = started if started is not None else now
+        if is_market_open(now) or (started - last_market_close(now)).total_seconds() < self.settle:
+            return self.open_ttl
+        return seconds_until_next_open(now)
+
+    async def get_or_compute(self, key, factory):
+        """캐시된 결과가 있으면 반환하고, 없으면 factory()를 실행 (예외가 나면 캐시하지 않음)"""
+        entry = self.entries.get(key)
+        if entry is not None and entry[1] > time.time():
+            self.hits += 1
+            self.entries.move_to_end(key)
+            logging.info(f'Command cache hit for {key}')
+            return entry[0]
+
+        if key in self.inflight:
+            self.coalesced += 1
+            logging.info(f'Command cache joined in-flight request for {key}')
+            inflight = self.inflight[key]
+            try:
+                return await asyncio.shield(inflight)
+            except asyncio.CancelledError:
+                if not inflight.cancelled():
+                    raise  # 이 요청 자체가 취소됨
+                # 계산하던 요청이 취소되었으면 직접 다시 계산
+                return await self.get_or_compute(key, factory)
+
+        self.misses += 1
+        started = market_now()
+        future = asyncio.get_running_loop().create_future()
+        self.inflight[key] = future
+        try:
+            value = await factory()
+        except Exception as e:
+            future.set_exception(e)
+            future.exception()  # 기다리는 요청이 없어도 경고가 남지 않도록 처리 표시
+            raise
+        else:
+            future.set_result(value)
+            self.entries[key] = (value, time.time() + self.ttl(started))
+            self.entries.move_to_end(key)
+            while len(self.entries) > self.max_entries:
+                self.entries.popitem(last=False)
+            return value
+        finally:
+            # 계산이 취소되면(CancelledError) 기다리는 요청이 멈춰 있지 않도록 future도 취소
+            if not future.done():
+                future.cancel()
+            del self.inflight[key]
+
+    def stats(self):
+        total = self.hits + self.misses + self.coalesced
+        return {
+            'hits': self.hits,
+            'misses': self.misses,
+            'coalesced': self.coalesced,
+            'hit_rate': (self.hits + self.coalesced) / total if total else 0.0,
+            'entries': len(self.entries),
+        }
@@ -0,0 +1 @@
+# pytest가 저장소 최상위의 모듈(indicators, price_archive 등)을 바로 불러올 수 있도록 이 폴더를 sys.path에 넣는 용도
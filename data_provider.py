@@ -0,0 +1,243 @@
+import os
+import abc
+import json
+import zlib
+import logging
+import threading
+
+import numpy as np
+import pandas as pd
+
+from price_cache import PriceCache, parse_period, period_start, slice_period
+from upstream import RateLimitedError, UpstreamError, is_rate_limited, is_transient
+
+
+class DataProvider(abc.ABC):
+    """시세/뉴스 조회 인터페이스 (PriceCache와 뉴스 조회가 이 인터페이스로만 외부 데이터를 받음)"""
+
+    @abc.abstractmethod
+    def download(self, tickers, interval='1d', threads=True, **kwargs):
+        """yf.download(group_by='ticker')와 같은 형식((티커, 항목) 열)의 데이터프레임 반환 (kwargs는 period 또는 start)"""
+
+    @abc.abstractmethod
+    def news(self, ticker):
+        """yf.Ticker(ticker).news와 같은 형식(title, link, providerPublishTime)의 뉴스 목록 반환"""
+
+
+class _DownloadErrors(logging.Handler):
+    """yf.download는 티커별 실패를 예외 대신 'yfinance' 로그로만 남기므로, 호출한 스레드의 오류 로그를 모음"""
+
+    def __init__(self):
+        super().__init__(logging.ERROR)
+        self.thread = threading.get_ident()
+        self.messages = []
+
+    def emit(self, record):
+        if record.thread == self.thread:
+            self.messages.append(record.getMessage())
+
+
+class YahooProvider(DataProvider):
+    """yfinance로 Yahoo Finance에서 실제 데이터를 받음 (429/네트워크 오류는 예외로 올려 UpstreamClient가 재시도)"""
+
+    def download(self, tickers, interval='1d', threads=True, **kwargs):
+        import yfinance as yf
+        errors = _DownloadErrors()
+        yf_logger = logging.getLogger('yfinance')
+        yf_logger.addHandler(errors)
+        try:
+            data = yf.download(tickers, interval=interval, group_by='ticker', threads=threads, **kwargs)
+        finally:
+            yf_logger.removeHandler(errors)
+        rate_limited = [message for message in errors.messages if is_rate_limited(message)]
+        if rate_limited:
+            raise RateLimitedError(rate_limited[-1])
+        transient = [message for message in errors.messages if is_transient(message)]
+        if transient and (data is None or data.empty):
+            raise UpstreamError(transient[-1])
+        return data
+
+    def news(self, ticker):
+        import yfinance as yf
+        return yf.Ticker(ticker).news
+
+
+def combine_frames(frames):
+    """{티커: 데이터}를 yf.download(group_by='ticker') 형식의 하나의 데이터프레임으로 합침"""
+    frames = {ticker: frame for ticker, frame in frames.items() if not frame.empty}
+    if not frames:
+        return pd.DataFrame()
+    return pd.concat(frames, axis=1)
+
+
+def slice_range(data, period=None, start=None):
+    """데이터에서 요청한 구간만 잘라냄 (기간은 데이터의 마지막 봉 기준이라 기록해둔 데이터도 그대로 재생됨)"""
+    if data.empty:
+        return data
+    if start is not None:
+        start = pd.Timestamp(start)
+        if start.tzinfo is None:
+            start = start.tz_localize(data.index.tz)
+        else:
+            # 장중 분봉 시각처럼 시간대가 있는 시각은 데이터의 시간대로 바꿔 비교 (시간대 없는 데이터는 현지 시각으로)
+            start = start.tz_convert(data.index.tz) if data.index.tz is not None else start.tz_localize(None)
+        return data[data.index >= start]
+    if period is None:
+        return data
+    parsed = parse_period(period)
+    if parsed is None or parsed[1] == 'd':
+        return slice_period(data, period)
+    return data[data.index >= period_start(period, data.index[-1])]
+
+
+class SyntheticProvider(DataProvider):
+    """티커 이름으로 시드를 정한 랜덤워크 시세와 가상 뉴스 (네트워크 없이 벤치마크/재현용, 같은 입력엔 같은 값)"""
+
+    EPOCH = pd.Timestamp('2000-01-03')
+
+    def __init__(self, volatility=0.02, news_per_ticker=5, end=None):
+        self.volatility = volatility
+        self.news_per_ticker = news_per_ticker
+        self.end = pd.Timestamp(end) if end is not None else None
+        self._index = None  # (마지막 날짜, 영업일 인덱스): 만드는 데 오래 걸리므로 날짜가 바뀔 때만 새로 만듦
+
+    def _end(self):
+        return (self.end or pd.Timestamp.now()).normalize()
+
+    def _business_days(self):
+        end = self._end()
+        if self._index is None or self._index[0] != end:
+            self._index = (end, pd.bdate_range(self.EPOCH, end))
+        return self._index[1]
+
+    @staticmethod
+    def _seed(*parts):
+        return zlib.crc32('|'.join(str(part) for part in parts).encode('utf-8'))
+
+    def daily(self, ticker):
+        index = self._business_days()
+        rng = np.random.default_rng(self._seed(ticker))
+        closes = 100 * np.exp(np.cumsum(rng.normal(0.0003, self.volatility, len(index))))
+        return self._ohlcv(closes, index)
+
+    def minutes(self, ticker):
+        """마지막 거래일의 정규장 1분봉"""
+        daily = self.daily(ticker)
+        day = daily.index[-1]
+        index = pd.date_range(day + pd.Timedelta(hours=9, minutes=30), periods=390, freq='min', tz='America/New_York')
+        rng = np.random.default_rng(self._seed(ticker, day.date()))
+        previous = daily['Close'].iloc[-2] if len(daily) > 1 else daily['Close'].iloc[-1]
+        closes = previous * np.exp(np.cumsum(rng.normal(0, self.volatility / 20, len(index))))
+        return self._ohlcv(closes, index)
+
+    @staticmethod
+    def _ohlcv(closes, index):
+        opens = np.concatenate([closes[:1], closes[:-1]])
+        return pd.DataFrame({
+            'Open': opens,
+            'High': np.maximum(opens, closes) * 1.005,
+            'Low': np.minimum(opens, closes) * 0.995,
+            'Close': closes,
+            'Volume': np.full(len(closes), 1_000_000, dtype=np.int64),
+        }, index=index)
+
+    def download(self, tickers, interval='1d', threads=True, **kwargs):
+        if isinstance(tickers, str):
+            tickers = [tickers]
+        if interval not in ('1d', '1m'):
+            raise ValueError(f"SyntheticProvider는 1d/1m 봉만 지원합니다: {interval}")
+        frames = {}
+        for ticker in tickers:
+            data = self.daily(ticker) if interval == '1d' else self.minutes(ticker)
+            frames[ticker] = slice_range(data, kwargs.get('period'), kwargs.get('start'))
+        return combine_frames(frames)
+
+    def news(self, ticker):
+        day = self._end()
+        published = int(day.timestamp())
+        return [
+            {
+                'title': f'{ticker} synthetic headline {index + 1} ({day.date()})',
+                'link': f'https://example.com/news/{ticker}/{day.date()}/{index}',
+                'providerPublishTime': published - index * 3600,
+            }
+            for index in range(self.news_per_ticker)
+        ]
+
+
+class FixtureProvider(DataProvider):
+    """기록해둔 시세/뉴스 파일을 재생 (fixture_dir/{봉 간격}/{티커}.pkl, fixture_dir/news/{티커}.json)"""
+
+    def __init__(self, fixture_dir):
+        self.fixture_dir = fixture_dir
+
+    def _price_path(self, ticker, interval):
+        return os.path.join(self.fixture_dir, interval, f'{ticker}.pkl')
+
+    def _news_path(self, ticker):
+        return os.path.join(self.fixture_dir, 'news', f'{ticker}.json')
+
+    def load(self, ticker, interval):
+        path = self._price_path(ticker, interval)
+        if not os.path.exists(path):
+            return pd.DataFrame()
+        return pd.read_pickle(path)
+
+    def download(self, tickers, interval='1d', threads=True, **kwargs):
+        if isinstance(tickers, str):
+            tickers = [tickers]
+        frames = {ticker: slice_range(self.load(ticker, interval), kwargs.get('period'), kwargs.get('start'))
+                  for ticker in tickers}
+        missing = [ticker for ticker, frame in frames.items() if frame.empty]
+        if missing:
+            logging.warning(f'No fixture data for {len(missing)} tickers: {missing[:10]}')
+        return combine_frames(frames)
+
+    def news(self, ticker):
+        path = self._news_path(ticker)
+        if not os.path.exists(path):
+            return []
+        with open(path, 'r', encoding='utf-8') as f:
+            return json.load(f)
+
+
+class RecordingProvider(FixtureProvider):
+    """다른 제공자(보통 YahooProvider)의 응답을 그대로 돌려주면서 FixtureProvider 형식의 파일로 기록"""
+
+    def __init__(self, inner, fixture_dir):
+        super().__init__(fixture_dir)
+        self.inner = inner
+
+    def download(self, tickers, interval='1d', threads=True, **kwargs):
+        data = self.inner.download(tickers, interval=interval, threads=threads, **kwargs)
+        chunk = [tickers] if isinstance(tickers, str) else list(tickers)
+        os.makedirs(os.path.join(self.fixture_dir, interval), exist_ok=True)
+        for ticker, frame in PriceCache._split_frames(chunk, data).items():
+            # 이전 기록과 합쳐 증분 요청도 전체 기간으로 남김
+            recorded = self.load(ticker, interval)
+            if not recorded.empty:
+                frame = pd.concat([recorded, frame])
+                frame = frame[~frame.index.duplicated(keep='last')].sort_index()
+            frame.to_pickle(self._price_path(ticker, interval))
+        return data
+
+    def news(self, ticker):
+        items = self.inner.news(ticker)
+        os.makedirs(os.path.join(self.fixture_dir, 'news'), exist_ok=True)
+        with open(self._news_path(ticker), 'w', encoding='utf-8') as f:
+            json.dump(items, f, ensure_ascii=False)
+        return items
+
+
+def make_provider(spec):
+    """설정 문자열로 제공자 생성: 'yahoo', 'synthetic', 'fixture:<폴더>', 'record:<폴더>'"""
+    kind, _, argument = spec.partition(':')
+    if kind == 'yahoo':
+        return YahooProvider()
+    if kind == 'synthetic':
+        return SyntheticProvider()
+    if kind == 'fixture' and argument:
+        return FixtureProvider(argument)
+    if kind == 'record' and argument:
+        return RecordingProvider(YahooProvider(), argument)
+    raise ValueError(f"지원하지 않는 데이터 제공자 설정입니다: {spec}")
@@ -0,0 +1,74 @@
+import asyncio
+import logging
+import threading
+import multiprocessing
+from concurrent.futures import ThreadPoolExecutor
+
+
+def process_context():
+    """워커 프로세스 풀에 쓸 multiprocessing 시작 방식 (스레드가 있는 봇 프로세스에서 fork하지 않도록 forkserver, 없으면 spawn)"""
+    method = 'forkserver' if 'forkserver' in multiprocessing.get_all_start_methods() else 'spawn'
+    return multiprocessing.get_context(method)
+
+
+class BlockingExecutor:
+    """블로킹 작업(다운로드, 차트 렌더링 등)을 이벤트 루프 밖의 스레드 풀에서 실행"""
+
+    def __init__(self, name, max_workers=4, timeout=60):
+        self.name = name
+        self.max_workers = max_workers  # 동시에 실행되는 작업 수 상한
+        self.timeout = timeout  # 작업 하나당 기본 제한 시간(초)
+        self._pool = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix=f'{name}-worker')
+        self._lock = threading.Lock()
+        self.queued = 0  # 제출되었지만 아직 시작하지 못한 작업 수 (대기열 길이)
+        self.running = 0
+        self.completed = 0
+        self.timeouts = 0
+        self.max_queue_depth = 0
+
+    def _call(self, func, args, kwargs):
+        with self._lock:
+            self.queued -= 1
+            self.running += 1
+        try:
+            return func(*args, **kwargs)
+        finally:
+            with self._lock:
+                self.running -= 1
+                self.completed += 1
+
+    async def run(self, func, *args, timeout=None, **kwargs):
+        """func(*args, **kwargs)를 풀에서 실행하고 결과를 기다림 (제한 시간 초과 시 asyncio.TimeoutError)"""
+        with self._lock:
+            self.queued += 1
+            self.max_queue_depth = max(self.max_queue_depth, self.queued)
+            busy = self.running >= self.max_workers
+            queue_depth = self.queued
+        if busy:
+            logging.info(f'{self.name} executor busy, queue depth: {queue_depth}')
+
+        submitted = self._pool.submit(self._call, func, args, kwargs)
+        try:
+            return await asyncio.wait_for(asyncio.shield(asyncio.wrap_future(submitted)), timeout or self.timeout)
+        except asyncio.TimeoutError:
+            with self._lock:
+                self.timeouts += 1
+                # 아직 시작하지 못한 작업은 취소하고 대기열에서 제외 (이미 실행 중인 작업은 끝까지 실행됨)
+                if submitted.cancel():
+                    self.queued -= 1
+            logging.error(f'{self.name} executor call {getattr(func, "__name__", func)} timed out after {timeout or self.timeout}s')
+            raise
+
+    def stats(self):
+        """현재 대기열 길이와 처리 통계 반환"""
+        with self._lock:
+            return {
+                'queued': max(self.queued, 0),
+                'running': self.running,
+                'completed': self.completed,
+                'timeouts': self.timeouts,
+                'max_queue_depth': self.max_queue_depth,
+            }
+
+    def shutdown(self):
+        self._pool.shutdown(wait=False)
@@ -0,0 +1,307 @@
+import os
+import json
+import math
+import logging
+import threading
+
+import numpy as np
+
+import indicators
+
+
+class TickerState:
+    """티커 하나의 지표 누적 상태 (SMA/RSI를 링버퍼와 누적합으로 유지해 새 일봉 하나를 O(1)로 반영)"""
+
+    def __init__(self, windows, rsi_period):
+        self.windows = tuple(windows)
+        self.rsi_period = rsi_period
+        self.size = max(self.windows)
+        self.last_date = None
+        self.count = 0  # 지금까지 반영된 봉 수
+        self.pos = 0  # 링버퍼에서 다음에 쓸 위치
+        self.closes = [math.nan] * self.size
+        self.sums = {window: 0.0 for window in self.windows}
+        self.prev_sma = {window: math.nan for window in self.windows}
+        self.prev_close = math.nan
+        self.gains = [0.0] * rsi_period
+        self.losses = [0.0] * rsi_period
+        self.gain_sum = 0.0
+        self.loss_sum = 0.0
+        # 마지막 push()가 덮어쓴 값 (날짜, 이전 종가, 기간별 이전 SMA, 링버퍼 값, 상승폭, 하락폭), pop()으로 되돌릴 때 사용
+        self.undo = None
+
+    @property
+    def close(self):
+        return self.closes[(self.pos - 1) % self.size] if self.count else math.nan
+
+    def sma(self, window):
+        if self.count < window:
+            return math.nan
+        return self.sums[window] / window
+
+    def rsi(self):
+        return self._rsi(self.gain_sum, self.loss_sum, self.count)
+
+    def _rsi(self, gain_sum, loss_sum, count):
+        if count < self.rsi_period:
+            return math.nan
+        if loss_sum <= 0:
+            return 100.0 if gain_sum > 0 else math.nan
+        rs = gain_sum / loss_sum
+        return 100 - (100 / (1 + rs))
+
+    def push(self, date, close):
+        """새 봉 하나의 종가를 반영"""
+        slot = self.count % self.rsi_period
+        self.undo = [self.last_date, self.prev_close, [self.prev_sma[window] for window in self.windows],
+                     self.closes[self.pos], self.gains[slot], self.losses[slot]]
+        for window in self.windows:
+            self.prev_sma[window] = self.sma(window)
+            self.sums[window] += close
+            if self.count >= window:
+                self.sums[window] -= self.closes[(self.pos - window) % self.size]
+
+        # 첫 봉의 변화량은 기존 RSI 계산과 같이 0으로 처리
+        delta = close - self.close if self.count else 0.0
+        if self.count >= self.rsi_period:
+            self.gain_sum -= self.gains[slot]
+            self.loss_sum -= self.losses[slot]
+        self.gains[slot] = max(delta, 0.0)
+        self.losses[slot] = max(-delta, 0.0)
+        self.gain_sum += self.gains[slot]
+        self.loss_sum += self.losses[slot]
+
+        self.prev_close = self.close
+        self.closes[self.pos] = close
+        self.pos = (self.pos + 1) % self.size
+        self.count += 1
+        self.last_date = date
+
+    def pop(self):
+        """마지막으로 반영한 봉 하나를 되돌림 (되돌릴 정보가 없으면 False)"""
+        if self.undo is None:
+            return False
+        last_date, prev_close, prev_sma, evicted, gain, loss = self.undo
+        self.count -= 1
+        self.pos = (self.pos - 1) % self.size
+        close = self.closes[self.pos]
+        self.closes[self.pos] = evicted
+        for window, value in zip(self.windows, prev_sma):
+            self.sums[window] -= close
+            if self.count >= window:
+                self.sums[window] += self.closes[(self.pos - window) % self.size]
+            self.prev_sma[window] = value
+
+        slot = self.count % self.rsi_period
+        self.gain_sum -= self.gains[slot]
+        self.loss_sum -= self.losses[slot]
+        if self.count >= self.rsi_period:
+            self.gain_sum += gain
+            self.loss_sum += loss
+        self.gains[slot] = gain
+        self.losses[slot] = loss
+
+        self.prev_close = prev_close
+        self.last_date = last_date
+        self.undo = None
+        return True
+
+    def preview(self, date, close):
+        """새 봉 하나를 반영했을 때의 snapshot()을 상태를 바꾸지 않고 계산 (장중 미완성 봉 평가용)"""
+        values = {'date': date, 'close': close, 'prev_close': self.close}
+        for window in self.windows:
+            total = self.sums[window] + close
+            if self.count >= window:
+                total -= self.closes[(self.pos - window) % self.size]
+            values[f'sma{window}'] = total / window if self.count + 1 >= window else math.nan
+            values[f'prev_sma{window}'] = self.sma(window)
+
+        delta = close - self.close if self.count else 0.0
+        slot = self.count % self.rsi_period
+        gain_sum = self.gain_sum + max(delta, 0.0)
+        loss_sum = self.loss_sum + max(-delta, 0.0)
+        if self.count >= self.rsi_period:
+            gain_sum -= self.gains[slot]
+            loss_sum -= self.losses[slot]
+        values['rsi'] = values[f'rsi{self.rsi_period}'] = self._rsi(gain_sum, loss_sum, self.count + 1)
+        return values
+
+    def snapshot(self):
+        """메시지/신호 판별에 쓰는 최신 값 모음"""
+        values = {'date': self.last_date, 'close': self.close, 'prev_close': self.prev_close, 'rsi': self.rsi()}
+        values[f'rsi{self.rsi_period}'] = values['rsi']  # indicators 모듈과 같은 이름으로도 제공
+        for window in self.windows:
+            values[f'sma{window}'] = self.sma(window)
+            values[f'prev_sma{window}'] = self.prev_sma[window]
+        return values
+
+    def to_dict(self):
+        return {
+            'd': self.last_date, 'n': self.count, 'p': self.pos, 'c': list(self.closes), 'pc': self.prev_close,
+            's': [self.sums[window] for window in self.windows],
+            'ps': [self.prev_sma[window] for window in self.windows],
+            'g': list(self.gains), 'l': list(self.losses), 'gs': self.gain_sum, 'ls': self.loss_sum, 'u': self.undo,
+        }
+
+    @classmethod
+    def from_dict(cls, windows, rsi_period, raw):
+        state = cls(windows, rsi_period)
+        state.last_date = raw['d']
+        state.count = raw['n']
+        state.pos = raw['p']
+        state.closes = raw['c']
+        state.prev_close = raw['pc']
+        state.sums = dict(zip(state.windows, raw['s']))
+        state.prev_sma = dict(zip(state.windows, raw['ps']))
+        state.gains = raw['g']
+        state.losses = raw['l']
+        state.gain_sum = raw['gs']
+        state.loss_sum = raw['ls']
+        state.undo = raw.get('u')  # 이전 형식 파일에는 없음 (마지막 봉이 바뀌면 전체 재계산)
+        return state
+
+
+class IndicatorStateStore:
+    """티커별 지표 상태를 파일에 저장하고 새 봉만 반영하여 갱신"""
+
+    def __init__(self, path='indicator_state.json', windows=(20, 50, 100, 200), rsi_period=14, tolerance=1e-6):
+        self.path = path
+        self.windows = tuple(windows)
+        self.rsi_period = rsi_period
+        self.tolerance = tolerance  # 저장된 종가/지표와 새 데이터 비교 시 허용 오차(상대값)
+        self._lock = threading.Lock()
+        self._save_lock = threading.Lock()  # 여러 작업이 동시에 저장해도 임시 파일을 함께 쓰지 않도록
+        self.states = self._load()
+
+    def _load(self):
+        if not os.path.exists(self.path):
+            return {}
+        try:
+            with open(self.path, 'r', encoding='utf-8') as f:
+                raw = json.load(f)
+        except (OSError, ValueError) as e:
+            logging.error(f"Failed to load indicator state, starting empty: {e}")
+            return {}
+        # 지표 기간 설정이 바뀌었으면 기존 상태는 사용할 수 없으므로 다시 계산
+        if raw.get('windows') != list(self.windows) or raw.get('rsi_period') != self.rsi_period:
+            logging.info('Indicator settings changed, discarding saved indicator state')
+            return {}
+        return {
+            ticker: TickerState.from_dict(self.windows, self.rsi_period, state)
+            for ticker, state in raw['tickers'].items()
+        }
+
+    def save(self):
+        """상태 파일을 원자적으로 저장 (임시 파일에 쓴 뒤 교체)"""
+        with self._lock:
+            raw = {
+                'windows': list(self.windows),
+                'rsi_period': self.rsi_period,
+                'tickers': {ticker: state.to_dict() for ticker, state in self.states.items()},
+            }
+        tmp_path = self.path + '.tmp'
+        with self._save_lock:
+            with open(tmp_path, 'w', encoding='utf-8') as f:
+                json.dump(raw, f, separators=(',', ':'))
+            os.replace(tmp_path, self.path)
+
+    @staticmethod
+    def _dates(data, start=0):
+        return [date.strftime('%Y-%m-%d') for date in data.index[start:]]
+
+    @staticmethod
+    def _find(data, date):
+        """마지막으로 반영한 날짜의 위치 (보통 끝부분에 있으므로 뒤에서부터 찾음, 없으면 None)"""
+        for position in range(len(data) - 1, -1, -1):
+            current = data.index[position].strftime('%Y-%m-%d')
+            if current == date:
+                return position
+            if current < date:
+                break  # 날짜순으로 정렬되어 있으므로 더 앞에는 없음
+        return None
+
+    def rebuild(self, ticker, data):
+        """전체 히스토리로 상태를 새로 만듦 (분할/배당으로 과거 가격이 조정된 경우 등)"""
+        state = TickerState(self.windows, self.rsi_period)
+        for date, close in zip(self._dates(data), indicators.close_row(data)[0]):
+            state.push(date, float(close))
+        with self._lock:
+            self.states[ticker] = state
+        logging.info(f'Rebuilt indicator state for ticker: {ticker} ({state.count} bars)')
+        return state
+
+    def rebuild_many(self, prices):
+        """여러 티커의 상태를 전체 히스토리로 새로 만듦 (이벤트 루프 밖의 스레드에서 실행)"""
+        for ticker, data in prices.items():
+            self.rebuild(ticker.upper(), data)
+
+    def _resume_position(self, ticker, state, data, closes):
+        """(상태에 반영된 봉 중 data와 같은 마지막 봉의 위치, 상태의 마지막 봉을 되돌려야 하는지)
+        (전체 재계산이 필요하면 None)"""
+        if state is None:
+            return None
+        last = self._find(data, state.last_date)
+        if last is None:
+            logging.info(f'Indicator state for {ticker} does not overlap new data, rebuilding')
+            return None
+        replace = False
+        if not math.isclose(closes[last], state.close, rel_tol=self.tolerance):
+            if state.undo is not None and last > 0 and math.isclose(closes[last - 1], state.prev_close, rel_tol=self.tolerance):
+                # 마지막 봉만 달라졌다면 장중 미완성 봉이 갱신/확정된 것이므로 그 봉만 바꿈
+                last, replace = last - 1, True
+            else:
+                # 그 이전 봉까지 종가가 달라졌다면 분할/배당 조정으로 과거 데이터가 바뀐 것
+                logging.info(f'Price history for {ticker} was adjusted, rebuilding indicator state')
+                return None
+        count = state.count - 1 if replace else state.count
+        if count < state.size and last + 1 > count:
+            # 처음에 짧은 기간으로 만들어진 상태라면 더 긴 히스토리로 다시 계산
+            return None
+        return last, replace
+
+    def needs_rebuild(self, ticker, data):
+        """update()가 전체 히스토리로 다시 계산하게 되는지 (비어 있는 data는 갱신하지 않으므로 False)"""
+        if data.empty:
+            return False
+        ticker = ticker.upper()
+        return self._resume_position(ticker, self.states.get(ticker), data, indicators.close_row(data)[0]) is None
+
+    def update(self, ticker, data):
+        """아직 반영되지 않은 봉만 잠금 안에서 추가하고 최신 값 반환 (data가 비어 있으면 상태를 지우지 않도록 ValueError)"""
+        ticker = ticker.upper()
+        if data.empty:
+            raise ValueError(f'No price data for {ticker}')
+        state = self.states.get(ticker)
+        closes = indicators.close_row(data)[0]
+        resume = self._resume_position(ticker, state, data, closes)
+        if resume is None:
+            return self.rebuild(ticker, data).snapshot()
+
+        last, replace = resume
+        with self._lock:
+            if replace:
+                state.pop()
+            for date, close in zip(self._dates(data, last + 1), closes[last + 1:]):
+                state.push(date, float(close))
+            return state.snapshot()
+
+    def verify(self, ticker, data):
+        """저장된 상태가 전체 재계산 결과와 일치하는지 확인 (불일치 시 False)"""
+        ticker = ticker.upper()
+        state = self.states.get(ticker)
+        if state is None:
+            return False
+        last = self._find(data, state.last_date)
+        if last is None:
+            return False
+        closes = indicators.close_row(data)[:, :last + 1]
+        names = [f'sma{window}' for window in self.windows] + [f'rsi{self.rsi_period}']
+        expected = indicators.compute(closes, names)
+        snapshot = state.snapshot()
+        for name in names:
+            key = 'rsi' if name.startswith('rsi') else name
+            if not np.isclose(snapshot[key], expected[name][0, -1], rtol=self.tolerance, equal_nan=True):
+                logging.warning(f'Indicator state mismatch for {ticker} {name}: '
+                                f'{snapshot[key]} != {expected[name][0, -1]}')
+                return False
+        return True
@@ -0,0 +1,96 @@
+import re
+
+import numpy as np
+
+
+# 지표 이름 형식: 'sma20', 'ema12', 'rsi14'
+INDICATOR_PATTERN = re.compile(r'^(sma|ema|rsi)(\d+)$')
+
+
+def close_matrix(frames, tickers, column='Close'):
+    """티커별 데이터프레임을 (티커 수 x 봉 수) 배열로 변환 (최신 봉이 마지막 열, 짧은 티커의 앞부분은 NaN)"""
+    lengths = [len(frames[ticker]) for ticker in tickers]
+    width = max(lengths, default=0)
+    matrix = np.full((len(tickers), width), np.nan)
+    for row, (ticker, length) in enumerate(zip(tickers, lengths)):
+        if length:
+            matrix[row, width - length:] = np.asarray(frames[ticker][column], dtype=float).reshape(-1)
+    return matrix
+
+
+def close_row(data, column='Close'):
+    """티커 하나의 데이터프레임을 (1 x 봉 수) 배열로 변환"""
+    return np.asarray(data[column], dtype=float).reshape(1, -1)
+
+
+def sma(closes, window):
+    """단순 이동평균 (pandas rolling(window).mean()과 동일하게 창 안에 NaN이 있으면 NaN)"""
+    valid = ~np.isnan(closes)
+    sums = np.cumsum(np.where(valid, closes, 0.0), axis=1)
+    counts = np.cumsum(valid, axis=1)
+    sums = np.concatenate([np.zeros((closes.shape[0], 1)), sums], axis=1)
+    counts = np.concatenate([np.zeros((closes.shape[0], 1), dtype=counts.dtype), counts], axis=1)
+
+    result = np.full(closes.shape, np.nan)
+    if window > closes.shape[1]:
+        return result
+    window_sums = sums[:, window:] - sums[:, :-window]
+    window_counts = counts[:, window:] - counts[:, :-window]
+    result[:, window - 1:] = np.where(window_counts == window, window_sums / window, np.nan)
+    return result
+
+
+def ema(closes, span):
+    """지수 이동평균 (pandas ewm(span, adjust=False).mean()과 동일), 시간축 한 번만 순회하며 모든 티커를 함께 계산"""
+    alpha = 2.0 / (span + 1)
+    result = np.full(closes.shape, np.nan)
+    current = np.full(closes.shape[0], np.nan)
+    for col in range(closes.shape[1]):
+        values = closes[:, col]
+        current = np.where(np.isnan(current), values, np.where(np.isnan(values), current, alpha * values + (1 - alpha) * current))
+        result[:, col] = current
+    return result
+
+
+def rsi(closes, period=14):
+    """RSI (기존 !RSI 명령과 동일하게 상승/하락폭의 단순 이동평균 사용)"""
+    delta = np.diff(closes, axis=1, prepend=np.nan)
+    # pandas where()와 동일하게 첫 봉의 변화량(NaN)은 0으로 처리하고, 데이터가 없는 앞부분만 NaN 유지
+    gain = np.where(delta > 0, delta, 0.0)
+    loss = np.where(delta < 0, -delta, 0.0)
+    missing = np.isnan(closes)
+    gain[missing] = np.nan
+    loss[missing] = np.nan
+
+    avg_gain = sma(gain, period)
+    avg_loss = sma(loss, period)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        rs = avg_gain / avg_loss
+        return 100 - (100 / (1 + rs))
+
+
+def cross_direction(series, line):
+    """각 봉에서 series가 line을 상향 돌파하면 1, 하향 돌파하면 -1, 아니면 0"""
+    above = series > line
+    below = series < line
+    result = np.zeros(series.shape, dtype=np.int8)
+    result[:, 1:][below[:, :-1] & above[:, 1:]] = 1
+    result[:, 1:][above[:, :-1] & below[:, 1:]] = -1
+    return result
+
+
+INDICATOR_FUNCTIONS = {'sma': sma, 'ema': ema, 'rsi': rsi}
+
+
+def compute(closes, names):
+    """지표 이름 목록을 한 번에 계산하여 {이름: 배열} 반환 ('close'는 종가 배열 그대로)"""
+    results = {'close': closes}
+    for name in names:
+        if name in results:
+            continue
+        match = INDICATOR_PATTERN.match(name)
+        if match is None:
+            raise ValueError(f"지원하지 않는 지표입니다: {name}")
+        kind, window = match.group(1), int(match.group(2))
+        results[name] = INDICATOR_FUNCTIONS[kind](closes, window)
+    return results
@@ -0,0 +1,105 @@
+import math
+import time
+import logging
+
+import indicators
+from indicator_state import TickerState
+from signal_rules import RuleEngine, snapshot_values
+
+
+class IntradayMonitor:
+    """장중 분봉으로 신호 규칙을 평가하고 같은 알림은 반복해서 보내지 않는 감시기 (최신 가격을 오늘의 미완성 일봉으로 보고 O(1)로 계산)"""
+
+    def __init__(self, rules, windows=(20, 50, 100, 200), rsi_period=14, cooldown=30 * 60):
+        self.windows = tuple(windows)
+        self.rsi_period = rsi_period
+        self.cooldown = cooldown  # 같은 규칙의 반대 방향 알림을 다시 보내기까지 최소 간격(초)
+
+        # 지표 상태로 계산할 수 있는 지표를 쓰는 규칙만 장중에 평가
+        available = {'close', f'rsi{rsi_period}'} | {f'sma{window}' for window in self.windows}
+        supported = []
+        for rule in rules:
+            if {rule.series, rule.line} - {None} <= available:
+                supported.append(rule)
+            else:
+                logging.warning(f'Rule {rule.name} uses indicators not tracked intraday, skipping')
+        self.engine = RuleEngine(supported)
+
+        self.bases = {}  # 티커 -> (세션 날짜, 전일까지의 TickerState)
+        self.last_seen = {}  # 티커 -> 마지막으로 평가한 (분봉 시각, 종가)
+        self.snapshots = {}  # 티커 -> 최신 분봉 기준 지표 값
+        self.alerted = {}  # (티커, 규칙 이름) -> (세션 날짜, 방향, 알림 시각)
+
+    def tickers(self, watchlist=()):
+        return self.engine.tickers(watchlist)
+
+    @staticmethod
+    def session_date(bars):
+        """분봉 데이터의 거래일 (거래소 시간 기준)"""
+        return bars.index[-1].strftime('%Y-%m-%d')
+
+    def stale(self, bars):
+        """기준 상태가 없거나 지난 세션 기준이라 일봉으로 다시 만들어야 하는 티커"""
+        return [
+            ticker for ticker, data in bars.items()
+            if not data.empty and self.bases.get(ticker, (None,))[0] != self.session_date(data)
+        ]
+
+    def resume_groups(self, tickers, granularity=5 * 60):
+        """마지막으로 본 분봉 시각을 granularity초 단위로 내린 시작 시각별 티커 묶음 [(시작 시각, [티커])]"""
+        groups = {}
+        for ticker in tickers:
+            if ticker in self.last_seen:
+                groups.setdefault(self.last_seen[ticker][0].floor(f'{granularity}s'), []).append(ticker)
+        return sorted(groups.items())
+
+    def set_base(self, ticker, daily, session):
+        """session 이전의 완성 일봉으로 기준 상태를 만듦 (오늘의 미완성 일봉은 제외)"""
+        state = TickerState(self.windows, self.rsi_period)
+        dates = [date.strftime('%Y-%m-%d') for date in daily.index]
+        for date, close in zip(dates, indicators.close_row(daily)[0] if len(daily) else []):
+            if date >= session:
+                break
+            if not math.isnan(close):
+                state.push(date, float(close))
+        self.bases[ticker] = (session, state)
+        self.last_seen.pop(ticker, None)
+
+    def update(self, bars, watchlist=()):
+        """새 분봉(또는 갱신된 마지막 분봉)이 있는 티커만 평가하여 새로 발생한 (Signal, 지표 값) 목록 반환"""
+        changed = []
+        for ticker, data in bars.items():
+            if ticker not in self.bases or data.empty:
+                continue
+            closes = data['Close'].dropna()
+            if closes.empty:
+                continue
+            # 마지막으로 본 분봉과 같으면 다시 계산하지 않음
+            seen = (closes.index[-1], float(closes.iloc[-1]))
+            if self.last_seen.get(ticker) == seen:
+                continue
+            self.last_seen[ticker] = seen
+            session, state = self.bases[ticker]
+            self.snapshots[ticker] = state.preview(session, seen[1])
+            changed.append(ticker)
+        if not changed:
+            return []
+
+        values = snapshot_values(self.snapshots, changed, self.engine.indicator_names())
+        signals = self.engine.evaluate(changed, values, watchlist)
+
+        alerts = []
+        now = time.time()
+        for ticker in changed:
+            session = self.bases[ticker][0]
+            for signal in signals[ticker]:
+                # 같은 세션에서 같은 방향의 알림은 한 번만, 반대 방향은 cooldown이 지난 뒤에만 보냄
+                key = (ticker, signal.rule.name)
+                previous = self.alerted.get(key)
+                if previous is not None and previous[0] == session and (
+                        previous[1] == signal.direction or now - previous[2] < self.cooldown):
+                    continue
+                self.alerted[key] = (session, signal.direction, now)
+                alerts.append((signal, self.snapshots[ticker]))
+        logging.info(f'Intraday update: {len(changed)} tickers with new bars, {len(alerts)} new alerts')
+        return alerts
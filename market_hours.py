@@ -0,0 +1,45 @@
+from datetime import datetime, time, timedelta
+from zoneinfo import ZoneInfo
+
+
+# 미국 정규장 시간 (뉴욕 시간 기준, 휴장일은 고려하지 않음)
+MARKET_TZ = ZoneInfo('America/New_York')
+MARKET_OPEN = time(9, 30)
+MARKET_CLOSE = time(16, 0)
+
+
+def market_now():
+    return datetime.now(MARKET_TZ)
+
+
+def is_market_open(now=None):
+    """정규장이 열려 있는지 확인"""
+    now = now.astimezone(MARKET_TZ) if now is not None else market_now()
+    return now.weekday() < 5 and MARKET_OPEN <= now.time() < MARKET_CLOSE
+
+
+def next_market_open(now=None):
+    """다음 정규장 시작 시각 (장중이면 다음 거래일 시작 시각)"""
+    now = now.astimezone(MARKET_TZ) if now is not None else market_now()
+    candidate = now.replace(hour=MARKET_OPEN.hour, minute=MARKET_OPEN.minute, second=0, microsecond=0)
+    if candidate <= now:
+        candidate += timedelta(days=1)
+    while candidate.weekday() >= 5:
+        candidate += timedelta(days=1)
+    return candidate
+
+
+def last_market_close(now=None):
+    """가장 최근에 끝난 정규장 마감 시각 (장중이면 이전 거래일 마감 시각)"""
+    now = now.astimezone(MARKET_TZ) if now is not None else market_now()
+    candidate = now.replace(hour=MARKET_CLOSE.hour, minute=MARKET_CLOSE.minute, second=0, microsecond=0)
+    if candidate > now:
+        candidate -= timedelta(days=1)
+    while candidate.weekday() >= 5:
+        candidate -= timedelta(days=1)
+    return candidate
+
+
+def seconds_until_next_open(now=None):
+    now = now.astimezone(MARKET_TZ) if now is not None else market_now()
+    return (next_market_open(now) - now).total_seconds()
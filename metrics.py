@@ -0,0 +1,232 @@
+import os
+import json
+import time
+import asyncio
+import logging
+import functools
+import threading
+from contextlib import contextmanager, nullcontext
+
+
+# 지연 시간 히스토그램의 기본 구간 상한(초)
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60, 120)
+
+
+def _label_key(labels):
+    return tuple(sorted((name, str(value)) for name, value in labels.items()))
+
+
+def _format_labels(key, extra=()):
+    pairs = list(key) + list(extra)
+    if not pairs:
+        return ''
+    escaped = (value.replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n') for _, value in pairs)
+    return '{' + ','.join(f'{name}="{value}"' for (name, _), value in zip(pairs, escaped)) + '}'
+
+
+class Counter:
+    """계속 증가하기만 하는 값 (레이블 조합별로 따로 집계)"""
+
+    kind = 'counter'
+
+    def __init__(self, name, help_text, lock):
+        self.name = name
+        self.help = help_text
+        self._lock = lock
+        self.values = {}  # 레이블 키 -> 값
+
+    def inc(self, amount=1, **labels):
+        key = _label_key(labels)
+        with self._lock:
+            self.values[key] = self.values.get(key, 0) + amount
+
+    def get(self, **labels):
+        with self._lock:
+            return self.values.get(_label_key(labels), 0)
+
+    def samples(self):
+        for key, value in self.values.items():
+            yield self.name, key, (), value
+
+    def to_dict(self):
+        return [[list(map(list, key)), value] for key, value in self.values.items()]
+
+    def load(self, raw):
+        for key, value in raw:
+            self.values[tuple(map(tuple, key))] = value
+
+
+class Gauge(Counter):
+    """현재 상태를 나타내는 값 (대기열 길이, 캐시 항목 수 등)"""
+
+    kind = 'gauge'
+
+    def set(self, value, **labels):
+        with self._lock:
+            self.values[_label_key(labels)] = value
+
+
+class Histogram:
+    """관측값 분포 (구간별 누적 개수, 합계, 개수)"""
+
+    kind = 'histogram'
+
+    def __init__(self, name, help_text, lock, buckets=DEFAULT_BUCKETS):
+        self.name = name
+        self.help = help_text
+        self._lock = lock
+        self.buckets = tuple(buckets)
+        self.values = {}  # 레이블 키 -> [구간별 개수..., 합계, 개수]
+
+    def observe(self, value, **labels):
+        key = _label_key(labels)
+        with self._lock:
+            state = self.values.get(key)
+            if state is None:
+                state = self.values[key] = [0] * len(self.buckets) + [0.0, 0]
+            for index, bound in enumerate(self.buckets):
+                if value <= bound:
+                    state[index] += 1
+            state[-2] += value
+            state[-1] += 1
+
+    def samples(self):
+        for key, state in self.values.items():
+            for bound, count in zip(self.buckets, state):
+                yield f'{self.name}_bucket', key, (('le', repr(float(bound))),), count
+            yield f'{self.name}_bucket', key, (('le', '+Inf'),), state[-1]
+            yield f'{self.name}_sum', key, (), state[-2]
+            yield f'{self.name}_count', key, (), state[-1]
+
+    def to_dict(self):
+        return {'buckets': list(self.buckets), 'values': [[list(map(list, key)), state] for key, state in self.values.items()]}
+
+    def load(self, raw):
+        # 구간 설정이 바뀌었으면 이전 분포는 버림
+        if tuple(raw['buckets']) != self.buckets:
+            return
+        for key, state in raw['values']:
+            self.values[tuple(map(tuple, key))] = state
+
+
+class MetricsRegistry:
+    """카운터/게이지/히스토그램을 모아 Prometheus 텍스트 형식으로 내보내는 저장소 (save()/load()로 누적값 유지)"""
+
+    def __init__(self, path=None):
+        self.path = path
+        self._lock = threading.Lock()
+        self.metrics = {}  # 이름 -> 지표
+        self.collectors = []  # 내보내기 직전에 호출하여 게이지 등을 갱신하는 함수
+        self._saved = {}  # 파일에서 읽었지만 아직 등록되지 않은 지표
+        self.profiler = None  # timer 블록을 구간으로도 기록할 profiling.Profiler (없으면 기록하지 않음)
+        if path is not None and os.path.exists(path):
+            self.load()
+
+    def _get(self, cls, name, help_text, **kwargs):
+        with self._lock:
+            metric = self.metrics.get(name)
+            if metric is None:
+                metric = self.metrics[name] = cls(name, help_text, self._lock, **kwargs)
+                raw = self._saved.pop(name, None)
+                if raw is not None and raw['kind'] == metric.kind:
+                    metric.load(raw['data'])
+            return metric
+
+    def counter(self, name, help_text=''):
+        return self._get(Counter, name, help_text)
+
+    def gauge(self, name, help_text=''):
+        return self._get(Gauge, name, help_text)
+
+    def histogram(self, name, help_text='', buckets=DEFAULT_BUCKETS):
+        return self._get(Histogram, name, help_text, buckets=buckets)
+
+    def add_collector(self, collector):
+        """collector(registry)를 내보내기 직전마다 호출"""
+        self.collectors.append(collector)
+
+    @contextmanager
+    def timer(self, name, **labels):
+        """블록 실행 시간과 결과를 기록 (profiler가 있으면 레이블 값으로 이름 붙인 구간으로도 기록, 예: 'check_watchlist:fetch')"""
+        started = time.perf_counter()
+        status = 'ok'
+        span = self.profiler.span(':'.join(str(value) for value in labels.values()) or name) if self.profiler is not None else nullcontext()
+        try:
+            with span:
+                yield
+        except BaseException as e:
+            status = 'cancelled' if isinstance(e, asyncio.CancelledError) else 'error'
+            raise
+        finally:
+            self.histogram(f'{name}_duration_seconds', f'{name} duration in seconds').observe(
+                time.perf_counter() - started, **labels)
+            self.counter(f'{name}_total', f'{name} runs by status').inc(status=status, **labels)
+
+    def timed(self, name, **labels):
+        """함수(동기/비동기) 실행 시간과 성공/실패 횟수를 기록하는 데코레이터"""
+        def decorator(func):
+            if asyncio.iscoroutinefunction(func):
+                @functools.wraps(func)
+                async def wrapper(*args, **kwargs):
+                    with self.timer(name, **labels):
+                        return await func(*args, **kwargs)
+            else:
+                @functools.wraps(func)
+                def wrapper(*args, **kwargs):
+                    with self.timer(name, **labels):
+                        return func(*args, **kwargs)
+            return wrapper
+        return decorator
+
+    def render(self):
+        """Prometheus 텍스트 노출 형식으로 변환"""
+        for collector in self.collectors:
+            try:
+                collector(self)
+            except Exception as e:
+                logging.error(f"Metrics collector {getattr(collector, '__name__', collector)} failed: {e}")
+        lines = []
+        with self._lock:
+            for name in sorted(self.metrics):
+                metric = self.metrics[name]
+                if metric.help:
+                    lines.append(f'# HELP {name} {metric.help}')
+                lines.append(f'# TYPE {name} {metric.kind}')
+                for sample, key, extra, value in metric.samples():
+                    lines.append(f'{sample}{_format_labels(key, extra)} {value}')
+        return '\n'.join(lines) + '\n'
+
+    def save(self):
+        """누적값을 파일에 원자적으로 저장 (임시 파일에 쓴 뒤 교체)"""
+        with self._lock:
+            raw = {name: {'kind': metric.kind, 'data': metric.to_dict()} for name, metric in self.metrics.items()}
+            raw.update({name: saved for name, saved in self._saved.items() if name not in raw})
+        tmp_path = self.path + '.tmp'
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            json.dump(raw, f, separators=(',', ':'))
+        os.replace(tmp_path, self.path)
+
+    def load(self):
+        try:
+            with open(self.path, 'r', encoding='utf-8') as f:
+                self._saved = json.load(f)
+        except (OSError, ValueError) as e:
+            logging.error(f"Failed to load metrics from {self.path}, starting empty: {e}")
+            self._saved = {}
+
+
+async def start_http_server(registry, host='127.0.0.1', port=9108):
+    """/metrics 경로로 Prometheus 텍스트를 제공하는 로컬 HTTP 서버 시작 (AppRunner 반환)"""
+    from aiohttp import web
+
+    async def handle_metrics(request):
+        return web.Response(body=registry.render().encode('utf-8'),
+                            headers={'Content-Type': 'text/plain; version=0.0.4; charset=utf-8'})
+
+    app = web.Application()
+    app.router.add_get('/metrics', handle_metrics)
+    runner = web.AppRunner(app, access_log=None)
+    await runner.setup()
+    await web.TCPSite(runner, host, port).start()
+    logging.info(f'Metrics endpoint listening on http://{host}:{port}/metrics')
+    return runner
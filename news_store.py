@@ -0,0 +1,126 @@
+import os
+import json
+import time
+import sqlite3
+import hashlib
+import logging
+import threading
+
+
+class SentNewsStore:
+    """전송한 뉴스 링크를 8바이트 해시로 SQLite에 기록하는 저장소 (retention_days가 지난 기록은 삭제)"""
+
+    def __init__(self, path='sent_news.db', retention_days=7):
+        self.path = path
+        self.retention = retention_days * 86400
+        self._lock = threading.Lock()
+        self.conn = sqlite3.connect(path, check_same_thread=False)
+        with self._lock, self.conn:
+            # WAL 모드: 기록 도중 프로세스가 종료되어도 마지막으로 커밋된 상태가 유지됨
+            self.conn.execute('PRAGMA journal_mode=WAL')
+            self.conn.execute('PRAGMA synchronous=NORMAL')
+            self.conn.execute(
+                'CREATE TABLE IF NOT EXISTS sent_news ('
+                'key BLOB PRIMARY KEY, published_at INTEGER NOT NULL) WITHOUT ROWID'
+            )
+            self.conn.execute('CREATE INDEX IF NOT EXISTS sent_news_published ON sent_news (published_at)')
+            # 티커별로 마지막으로 확인한 뉴스의 발행 시각 (이보다 오래된 뉴스는 바로 건너뜀)
+            self.conn.execute(
+                'CREATE TABLE IF NOT EXISTS news_cursor ('
+                'ticker TEXT PRIMARY KEY, latest INTEGER NOT NULL) WITHOUT ROWID'
+            )
+            # 채널에 전송하지 못한 기사 (다음 실행에서 그 채널에만 다시 전송)
+            self.conn.execute(
+                'CREATE TABLE IF NOT EXISTS news_retry ('
+                'channel_id INTEGER NOT NULL, key BLOB NOT NULL, link TEXT NOT NULL, title TEXT NOT NULL, '
+                'tickers TEXT NOT NULL, published_at INTEGER NOT NULL, PRIMARY KEY (channel_id, key)) WITHOUT ROWID'
+            )
+
+    @staticmethod
+    def key(link):
+        return hashlib.blake2b(link.encode('utf-8'), digest_size=8).digest()
+
+    def migrate_legacy(self, legacy_file):
+        """기존 sent_news.json의 링크를 옮기고 파일 이름을 바꿔 다시 읽지 않도록 함 (파일이 없으면 아무것도 하지 않음)"""
+        if not os.path.exists(legacy_file):
+            return
+        try:
+            with open(legacy_file, 'r', encoding='utf-8') as f:
+                links = json.load(f)
+        except (OSError, ValueError) as e:
+            logging.error(f"Failed to read legacy sent news file {legacy_file}: {e}")
+            return
+        # 발행 시각을 알 수 없으므로 이전 시각으로 기록 (보관 기간이 지나면 함께 만료)
+        now = int(time.time())
+        self.add_many((link, now) for link in links)
+        os.replace(legacy_file, legacy_file + '.migrated')
+        logging.info(f'Migrated {len(links)} sent news links from {legacy_file}')
+
+    def __contains__(self, link):
+        with self._lock:
+            row = self.conn.execute('SELECT 1 FROM sent_news WHERE key = ?', (self.key(link),)).fetchone()
+        return row is not None
+
+    def add_many(self, items):
+        """(링크, 발행 시각 epoch초) 목록을 한 트랜잭션으로 기록"""
+        rows = [(self.key(link), int(published_at)) for link, published_at in items]
+        with self._lock, self.conn:
+            self.conn.executemany('INSERT OR IGNORE INTO sent_news (key, published_at) VALUES (?, ?)', rows)
+
+    def cursors(self):
+        """{티커: 마지막으로 확인한 뉴스 발행 시각}"""
+        with self._lock:
+            return dict(self.conn.execute('SELECT ticker, latest FROM news_cursor').fetchall())
+
+    def set_cursors(self, cursors):
+        """티커별 마지막 확인 시각을 한 트랜잭션으로 갱신"""
+        with self._lock, self.conn:
+            self.conn.executemany(
+                'INSERT INTO news_cursor (ticker, latest) VALUES (?, ?) '
+                'ON CONFLICT(ticker) DO UPDATE SET latest = MAX(latest, excluded.latest)',
+                [(ticker, int(latest)) for ticker, latest in cursors.items()],
+            )
+
+    def add_retries(self, items):
+        """(채널 ID, 링크, 제목, [티커], 발행 시각 epoch초) 목록을 다시 보낼 기사로 기록"""
+        rows = [(channel_id, self.key(link), link, title, json.dumps(tickers), int(published_at))
+                for channel_id, link, title, tickers, published_at in items]
+        with self._lock, self.conn:
+            self.conn.executemany(
+                'INSERT OR REPLACE INTO news_retry (channel_id, key, link, title, tickers, published_at) '
+                'VALUES (?, ?, ?, ?, ?, ?)', rows)
+
+    def retries(self):
+        """{채널 ID: {링크: {'tickers', 'title', 'published'}}} (발행 순서)"""
+        with self._lock:
+            rows = self.conn.execute(
+                'SELECT channel_id, link, title, tickers, published_at FROM news_retry ORDER BY published_at'
+            ).fetchall()
+        retries = {}
+        for channel_id, link, title, tickers, published_at in rows:
+            retries.setdefault(channel_id, {})[link] = {'tickers': json.loads(tickers), 'title': title, 'published': published_at}
+        return retries
+
+    def remove_retries(self, items):
+        """(채널 ID, 링크) 목록을 다시 보낼 기사에서 제거"""
+        with self._lock, self.conn:
+            self.conn.executemany('DELETE FROM news_retry WHERE channel_id = ? AND key = ?',
+                                  [(channel_id, self.key(link)) for channel_id, link in items])
+
+    def expire(self):
+        """보관 기간이 지난 기록 삭제"""
+        cutoff = int(time.time()) - self.retention
+        with self._lock, self.conn:
+            deleted = self.conn.execute('DELETE FROM sent_news WHERE published_at < ?', (cutoff,)).rowcount
+            self.conn.execute('DELETE FROM news_retry WHERE published_at < ?', (cutoff,))
+        if deleted:
+            logging.info(f'Expired {deleted} sent news records')
+        return deleted
+
+    def __len__(self):
+        with self._lock:
+            return self.conn.execute('SELECT COUNT(*) FROM sent_news').fetchone()[0]
+
+    def close(self):
+        with self._lock:
+            self.conn.close()
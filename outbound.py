@@ -0,0 +1,129 @@
+import logging
+
+from ratelimit import TokenBucket
+
+
+MESSAGE_LIMIT = 2000  # 디스코드 메시지 최대 길이
+MAX_FILES = 10  # 메시지 하나에 첨부할 수 있는 최대 파일 수
+
+
+def split_record(text, limit):
+    """메시지 길이 제한보다 긴 레코드 하나를 줄 단위로, 그래도 길면 공백 단위로 나눔 (링크 중간은 자르지 않음)"""
+    pieces = []
+    current = ''
+    for line in text.split('\n'):
+        candidate = f"{current}\n{line}" if current else line
+        if len(candidate) <= limit:
+            current = candidate
+            continue
+        if current:
+            pieces.append(current)
+        # 한 줄이 제한보다 길면 공백에서 끊고, 공백이 없으면 제한 길이에서 끊음
+        while len(line) > limit:
+            cut = line.rfind(' ', 0, limit + 1)
+            if cut <= 0:
+                cut = limit
+            pieces.append(line[:cut])
+            line = line[cut:].lstrip(' ')
+        current = line
+    if current:
+        pieces.append(current)
+    return pieces
+
+
+def _pack(records, limit, separator, max_files):
+    """pack_records()와 같이 묶되, 메시지마다 그 메시지로 전송이 끝나는 레코드 번호 목록도 함께 반환"""
+    messages = []
+    text, files, completed = '', [], []
+    for position, (record_text, record_files) in enumerate(records):
+        parts = split_record(record_text, limit) if len(record_text) > limit else [record_text]
+        for index, part in enumerate(parts):
+            # 레코드의 첨부 파일은 레코드 마지막 조각과 같은 메시지에 붙임
+            last = index == len(parts) - 1
+            part_files = record_files if last else []
+            candidate = f"{text}{separator}{part}" if text else part
+            if (text or files) and (len(candidate) > limit or len(files) + len(part_files) > max_files):
+                messages.append((text, files, completed))
+                text, files, completed = part, list(part_files), []
+            else:
+                text, files = candidate, files + list(part_files)
+            if last:
+                completed.append(position)
+    if text or files:
+        messages.append((text, files, completed))
+    return messages
+
+
+def pack_records(records, limit=MESSAGE_LIMIT, separator='\n', max_files=MAX_FILES):
+    """(텍스트, 파일 목록) 레코드들을 레코드 경계에서만 나누어 최소한의 (텍스트, 파일 목록) 메시지로 묶음"""
+    return [(text, files) for text, files, _ in _pack(records, limit, separator, max_files)]
+
+
+class OutboundBatch:
+    """한 채널로 보낼 레코드를 모았다가 flush()에서 최소한의 메시지로 전송"""
+
+    def __init__(self, outbound, channel, separator='\n', description='message'):
+        self.outbound = outbound
+        self.channel = channel
+        self.separator = separator  # 레코드 사이 구분자
+        self.description = description  # 로그에 남길 메시지 종류
+        self.records = []
+        self.keys = []
+        self.delivered = []  # 마지막 flush()에서 전송을 마친 레코드의 key (전송이 중간에 실패해도 그때까지의 목록)
+
+    def add(self, text, files=None, key=None):
+        """레코드 하나 추가 (files는 discord.File 목록, key는 delivered에 기록할 식별자)"""
+        self.records.append((text, list(files or [])))
+        self.keys.append(key)
+
+    def __len__(self):
+        return len(self.records)
+
+    async def flush(self):
+        """모은 레코드를 전송하고 보낸 메시지 수 반환 (전송에 실패하면 예외를 그대로 발생)"""
+        messages = _pack(self.records, self.outbound.limit, self.separator, MAX_FILES)
+        keys = self.keys
+        self.records, self.keys, self.delivered = [], [], []
+        for text, files, completed in messages:
+            await self.outbound.send(self.channel, text, files, self.description)
+            self.delivered.extend(keys[position] for position in completed)
+        return len(messages)
+
+
+class Outbound:
+    """채널별 전송 속도 제한(토큰 버킷)을 지키며 메시지를 보내는 중앙 전송기"""
+
+    def __init__(self, rate=1, burst=5, limit=MESSAGE_LIMIT):
+        self.rate = rate  # 채널당 초당 메시지 수
+        self.burst = burst  # 채널당 한 번에 몰아서 보낼 수 있는 메시지 수
+        self.limit = limit
+        self.buckets = {}  # 채널 ID -> TokenBucket
+        self.sent_messages = 0
+        self.sent_files = 0
+
+    def batch(self, channel, separator='\n', description='message'):
+        return OutboundBatch(self, channel, separator, description)
+
+    def _bucket(self, channel):
+        channel_id = getattr(channel, 'id', id(channel))
+        if channel_id not in self.buckets:
+            self.buckets[channel_id] = TokenBucket(self.rate, self.burst)
+        return self.buckets[channel_id]
+
+    async def send(self, channel, text=None, files=None, description='message'):
+        """채널의 속도 제한 버킷에서 토큰을 얻은 뒤 메시지 하나 전송"""
+        await self._bucket(channel).acquire()
+        kwargs = {}
+        if files:
+            kwargs['files'] = files
+        message = await channel.send(text or None, **kwargs)
+        self.sent_messages += 1
+        self.sent_files += len(files or [])
+
+        data_size = len((text or '').encode('utf-8'))
+        for file in files or []:
+            fp = getattr(file, 'fp', None)
+            if fp is not None and hasattr(fp, 'getbuffer'):
+                data_size += fp.getbuffer().nbytes
+        logging.info(f'Sent {description} with {len(files or [])} files, size: {data_size} bytes', extra={'data_size': data_size, 'direction': 'output'})
+        return message
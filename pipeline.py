@@ -0,0 +1,195 @@
+import json
+import time
+import sqlite3
+import asyncio
+import logging
+import threading
+from collections import namedtuple
+from contextlib import nullcontext
+from datetime import datetime, timedelta
+
+
+# needs: 결과를 받아 쓰는 단계 (실패하면 이 단계는 건너뜀)
+# after: 끝나기만 기다리는 단계 (채널에 보내는 메시지 순서를 맞추는 용도, 실패해도 실행)
+Stage = namedtuple('Stage', ['name', 'func', 'needs', 'after'], defaults=((), ()))
+
+# 단계 상태
+OK = 'ok'
+FAILED = 'failed'
+SKIPPED = 'skipped'
+
+
+class Pipeline:
+    """의존 관계(DAG)에 따라 단계를 실행하는 작업 묶음 (준비된 단계는 동시에 실행, 실행 중 다시 호출하면 건너뜀)"""
+
+    def __init__(self, name, stages, metrics=None):
+        self.name = name
+        self.metrics = metrics  # 단계별 시간을 기록할 metrics.MetricsRegistry (없으면 기록하지 않음)
+        self.stages = self._order(stages)
+        self._running = False
+
+    @staticmethod
+    def _order(stages):
+        """의존 단계가 먼저 오도록 정렬 (없는 단계를 참조하거나 순환이 있으면 ValueError)"""
+        by_name = {stage.name: stage for stage in stages}
+        if len(by_name) != len(stages):
+            raise ValueError('단계 이름이 중복되었습니다')
+        ordered, visiting, done = [], set(), set()
+
+        def visit(stage):
+            if stage.name in done:
+                return
+            if stage.name in visiting:
+                raise ValueError(f'단계 의존 관계에 순환이 있습니다: {stage.name}')
+            visiting.add(stage.name)
+            for dependency in (*stage.needs, *stage.after):
+                if dependency not in by_name:
+                    raise ValueError(f'{stage.name} 단계가 없는 단계를 참조합니다: {dependency}')
+                visit(by_name[dependency])
+            visiting.discard(stage.name)
+            done.add(stage.name)
+            ordered.append(stage)
+
+        for stage in stages:
+            visit(stage)
+        return ordered
+
+    @property
+    def running(self):
+        return self._running
+
+    async def run(self):
+        """모든 단계를 실행하고 {단계 이름: (상태, 걸린 시간)} 반환 (이미 실행 중이면 None)"""
+        if self._running:
+            logging.warning(f'Pipeline {self.name} is already running, skipping')
+            return None
+        self._running = True
+        try:
+            return await self._run()
+        finally:
+            self._running = False
+
+    async def _run(self):
+        results = {}
+        statuses = {}
+        tasks = {}
+
+        async def run_stage(stage):
+            await asyncio.gather(*(tasks[name] for name in (*stage.needs, *stage.after)))
+            failed = [name for name in stage.needs if statuses[name][0] != OK]
+            if failed:
+                logging.error(f'Pipeline {self.name}: skipping {stage.name} because {", ".join(failed)} did not finish')
+                statuses[stage.name] = (SKIPPED, 0.0)
+                return
+            started = time.perf_counter()
+            timer = self.metrics.timer('job_stage', job=self.name, stage=stage.name) if self.metrics is not None else nullcontext()
+            try:
+                with timer:
+                    results[stage.name] = await stage.func(results)
+                status = OK
+            except Exception as e:
+                logging.error(f'Pipeline {self.name}: stage {stage.name} failed: {e!r}')
+                status = FAILED
+            elapsed = time.perf_counter() - started
+            statuses[stage.name] = (status, elapsed)
+            logging.info(f'Pipeline {self.name}: stage {stage.name} {status} in {elapsed:.2f}s')
+
+        for stage in self.stages:
+            tasks[stage.name] = asyncio.ensure_future(run_stage(stage))
+        await asyncio.gather(*tasks.values())
+        return {stage.name: statuses[stage.name] for stage in self.stages}
+
+
+def fire_times(trigger, since, until):
+    """since 이후부터 until까지 trigger가 실행되었어야 하는 시각 목록 (since는 포함하지 않음)"""
+    times = []
+    fire_time = trigger.get_next_fire_time(None, since + timedelta(microseconds=1))
+    while fire_time is not None and fire_time <= until:
+        times.append(fire_time)
+        fire_time = trigger.get_next_fire_time(fire_time, fire_time + timedelta(microseconds=1))
+    return times
+
+
+def missed_fire_time(trigger, last, now, grace):
+    """last 이후 놓친 실행 시각 중 가장 최근 것 (여러 번 놓쳐도 한 번, grace초보다 오래되었거나 없으면 None)"""
+    if last is None:
+        return None
+    missed = fire_times(trigger, last, now)
+    if not missed or (now - missed[-1]).total_seconds() > grace:
+        return None
+    if len(missed) > 1:
+        logging.info(f'Coalescing {len(missed)} missed runs into one')
+    return missed[-1]
+
+
+def latest_fire_time(trigger, now, lookback=timedelta(days=7)):
+    """now 이전의 가장 최근 실행 예정 시각 (스케줄러가 방금 실행한 예정 시각을 구할 때 사용)"""
+    times = fire_times(trigger, now - lookback, now)
+    return times[-1] if times else now
+
+
+class JobRunStore:
+    """(작업, 예정 시각)마다 실행 기록을 SQLite에 저장하여 놓친 실행 확인과 중복 실행 방지에 씀"""
+
+    def __init__(self, path='job_runs.db', retention_days=30):
+        self.path = path
+        self.retention = retention_days * 86400
+        self._lock = threading.Lock()
+        self.conn = sqlite3.connect(path, check_same_thread=False)
+        with self._lock, self.conn:
+            self.conn.execute('PRAGMA journal_mode=WAL')
+            self.conn.execute('PRAGMA synchronous=NORMAL')
+            self.conn.execute(
+                'CREATE TABLE IF NOT EXISTS job_runs ('
+                'job TEXT NOT NULL, scheduled_at REAL NOT NULL, started_at REAL NOT NULL, finished_at REAL, '
+                'status TEXT NOT NULL, detail TEXT, '
+                'PRIMARY KEY (job, scheduled_at)) WITHOUT ROWID'
+            )
+
+    def start(self, job, scheduled_at):
+        """실행 시작 기록, 같은 예정 시각의 실행이 이미 끝났으면 False"""
+        with self._lock, self.conn:
+            row = self.conn.execute(
+                'SELECT status FROM job_runs WHERE job = ? AND scheduled_at = ?', (job, scheduled_at.timestamp())
+            ).fetchone()
+            if row is not None and row[0] != 'running':
+                return False
+            self.conn.execute(
+                'INSERT OR REPLACE INTO job_runs (job, scheduled_at, started_at, status) VALUES (?, ?, ?, ?)',
+                (job, scheduled_at.timestamp(), time.time(), 'running'),
+            )
+        return True
+
+    def finish(self, job, scheduled_at, status, detail=None):
+        with self._lock, self.conn:
+            self.conn.execute(
+                'UPDATE job_runs SET finished_at = ?, status = ?, detail = ? WHERE job = ? AND scheduled_at = ?',
+                (time.time(), status, json.dumps(detail, ensure_ascii=False) if detail is not None else None,
+                 job, scheduled_at.timestamp()),
+            )
+            # 보관 기간이 지난 기록 삭제
+            self.conn.execute('DELETE FROM job_runs WHERE scheduled_at < ?', (time.time() - self.retention,))
+
+    def last_scheduled(self, job, tz=None):
+        """실행을 마친(중간에 종료되지 않은) 가장 최근 예정 시각 (기록이 없으면 None)"""
+        with self._lock:
+            row = self.conn.execute(
+                "SELECT MAX(scheduled_at) FROM job_runs WHERE job = ? AND status != 'running'", (job,)
+            ).fetchone()
+        if row[0] is None:
+            return None
+        return datetime.fromtimestamp(row[0], tz)
+
+    def recent(self, job, limit=5):
+        """최근 실행 기록 [(예정 시각, 시작, 종료, 상태, 단계별 결과)] (최신순)"""
+        with self._lock:
+            rows = self.conn.execute(
+                'SELECT scheduled_at, started_at, finished_at, status, detail FROM job_runs '
+                'WHERE job = ? ORDER BY scheduled_at DESC LIMIT ?', (job, limit)
+            ).fetchall()
+        return [(scheduled, started, finished, status, json.loads(detail) if detail else None)
+                for scheduled, started, finished, status, detail in rows]
+
+    def close(self):
+        with self._lock:
+            self.conn.close()
@@ -0,0 +1,202 @@
+import os
+import json
+import shutil
+import logging
+import threading
+
+import numpy as np
+import pandas as pd
+
+
+INDEX_FILE = 'index.bin'
+
+
+class PriceArchive:
+    """티커/봉 간격별 OHLCV를 열마다 원시 배열 파일({root}/{키}/{세대}/)로 저장하고 memmap으로 읽는 저장소"""
+
+    def __init__(self, root, float_dtype='float64'):
+        self.root = root
+        self.float_dtype = np.dtype(float_dtype)  # 가격 형식 ('float32'면 용량이 절반이지만 유효숫자 약 7자리, 거래량은 int64)
+        # 저장된 봉의 값이 바뀌면 새 세대 폴더에 다시 쓰므로 이전에 읽은 배열은 계속 같은 값을 가리킴
+        self._lock = threading.RLock()
+        os.makedirs(root, exist_ok=True)
+
+    def _dir(self, key):
+        return os.path.join(self.root, key)
+
+    def _meta_path(self, key):
+        return os.path.join(self._dir(key), 'meta.json')
+
+    def _file(self, key, generation, name):
+        return os.path.join(self._dir(key), str(generation), name)
+
+    @staticmethod
+    def _column_file(position):
+        return f'c{position}.bin'
+
+    def _read_meta(self, key):
+        try:
+            with open(self._meta_path(key), 'r', encoding='utf-8') as f:
+                return json.load(f)
+        except FileNotFoundError:
+            return None
+
+    def _write_meta(self, key, meta):
+        path = self._meta_path(key)
+        with open(path + '.tmp', 'w', encoding='utf-8') as f:
+            json.dump(meta, f)
+        os.replace(path + '.tmp', path)
+
+    def __contains__(self, key):
+        return os.path.exists(self._meta_path(key))
+
+    def keys(self):
+        return [name for name in os.listdir(self.root) if os.path.exists(self._meta_path(name))]
+
+    def _encode(self, data):
+        """데이터프레임을 (시각 배열, [(열 이름, 형식, 값 배열)], 시간대)로 변환"""
+        data = data[~data.index.duplicated(keep='last')].sort_index()
+        index = data.index
+        tz = str(index.tz) if index.tz is not None else None
+        if tz is not None:
+            index = index.tz_convert('UTC').tz_localize(None)
+        stamps = np.ascontiguousarray(index.values.astype('datetime64[ns]').view(np.int64))
+        columns = []
+        for name in data.columns:
+            values = data[name].to_numpy()
+            if name == 'Volume':
+                dtype = np.dtype(np.int64) if np.issubdtype(values.dtype, np.integer) else np.dtype(np.float64)
+            else:
+                dtype = self.float_dtype
+            columns.append((str(name), dtype.str, np.ascontiguousarray(values, dtype=dtype)))
+        return stamps, columns, tz
+
+    @staticmethod
+    def _map(path, dtype, rows):
+        if rows == 0:
+            return np.empty(0, dtype=dtype)
+        return np.memmap(path, dtype=dtype, mode='r', shape=(rows,))
+
+    def read(self, key):
+        """저장된 전체 데이터를 memmap 기반 데이터프레임으로 반환 (없으면 None)"""
+        meta = self._read_meta(key)
+        if meta is None:
+            return None
+        rows, generation = meta['rows'], meta['generation']
+        stamps = self._map(self._file(key, generation, INDEX_FILE), np.int64, rows)
+        index = pd.DatetimeIndex(stamps.view('datetime64[ns]'), copy=False)
+        if meta['tz'] is not None:
+            index = index.tz_localize('UTC').tz_convert(meta['tz'])
+        columns = {
+            name: self._map(self._file(key, generation, self._column_file(position)), np.dtype(dtype), rows)
+            for position, (name, dtype) in enumerate(meta['columns'])
+        }
+        return pd.DataFrame(columns, index=index, copy=False)
+
+    def write(self, key, data):
+        """데이터 전체를 새 세대로 씀"""
+        stamps, columns, tz = self._encode(data)
+        with self._lock:
+            previous = self._read_meta(key)
+            generation = previous['generation'] + 1 if previous is not None else 0
+            os.makedirs(os.path.join(self._dir(key), str(generation)), exist_ok=True)
+            stamps.tofile(self._file(key, generation, INDEX_FILE))
+            for position, (_, _, values) in enumerate(columns):
+                values.tofile(self._file(key, generation, self._column_file(position)))
+            self._write_meta(key, {
+                'generation': generation,
+                'rows': len(stamps),
+                'columns': [[name, dtype] for name, dtype, _ in columns],
+                'tz': tz,
+            })
+            if previous is not None:
+                self._remove_generation(key, previous['generation'])
+
+    def append(self, key, data):
+        """새 봉을 파일 끝에 덧붙임 (겹치는 봉의 값이 바뀌었거나 열 구성이 달라졌으면 기존 데이터와 합쳐 새 세대로 다시 씀)"""
+        if data.empty:
+            return
+        stamps, columns, tz = self._encode(data)
+        with self._lock:
+            meta = self._read_meta(key)
+            if meta is None:
+                self.write(key, data)
+                return
+            rows, generation = meta['rows'], meta['generation']
+            stored = self._map(self._file(key, generation, INDEX_FILE), np.int64, rows)
+            start = int(np.searchsorted(stored, stamps[0]))
+            overlap = rows - start
+            same_layout = meta['tz'] == tz and meta['columns'] == [[name, dtype] for name, dtype, _ in columns]
+            if not same_layout or overlap > len(stamps) or not np.array_equal(stored[start:], stamps[:overlap]) \
+                    or not self._same_values(key, meta, start, columns, overlap):
+                merged = pd.concat([self.read(key), data])
+                self.write(key, merged[~merged.index.duplicated(keep='last')].sort_index())
+                return
+            if overlap == len(stamps):
+                return  # 새 봉이 없음
+
+            files = [(INDEX_FILE, stamps)] + [
+                (self._column_file(position), values) for position, (_, _, values) in enumerate(columns)
+            ]
+            for name, values in files:
+                with open(self._file(key, generation, name), 'r+b') as f:
+                    f.seek(rows * values.itemsize)
+                    f.write(values[overlap:].tobytes())
+            # 열 파일을 모두 쓴 뒤에 행 수를 갱신 (중간에 종료되면 이전 행 수까지만 읽힘)
+            meta['rows'] = start + len(stamps)
+            self._write_meta(key, meta)
+
+    def _same_values(self, key, meta, start, columns, overlap):
+        """저장된 start번째 이후 봉들의 값이 새 값의 앞 overlap개와 같은지 (NaN끼리는 같다고 봄)"""
+        for position, (_, dtype, values) in enumerate(columns):
+            stored = self._map(self._file(key, meta['generation'], self._column_file(position)), np.dtype(dtype), meta['rows'])
+            if not np.array_equal(stored[start:], values[:overlap], equal_nan=np.dtype(dtype).kind == 'f'):
+                return False
+        return True
+
+    def delete(self, key):
+        with self._lock:
+            try:
+                os.remove(self._meta_path(key))
+            except FileNotFoundError:
+                return
+            shutil.rmtree(self._dir(key), ignore_errors=True)
+
+    def size(self, key):
+        """현재 세대 파일의 전체 크기(바이트)"""
+        meta = self._read_meta(key)
+        if meta is None:
+            return 0
+        folder = os.path.join(self._dir(key), str(meta['generation']))
+        return sum(entry.stat().st_size for entry in os.scandir(folder))
+
+    def _remove_generation(self, key, generation):
+        # 다른 곳에서 memmap으로 열어둔 파일은 (Windows에서) 지울 수 없으므로 compact()에서 다시 시도
+        shutil.rmtree(os.path.join(self._dir(key), str(generation)), ignore_errors=True)
+
+    def compact(self):
+        """지우지 못한 이전 세대와 메타 정보가 없는 폴더를 정리하고, 기록 도중 중단되어
+        행 수보다 긴 열 파일은 새 세대로 다시 써서 정리함. 정리한 항목 수 반환"""
+        cleaned = 0
+        with self._lock:
+            for name in os.listdir(self.root):
+                folder = self._dir(name)
+                if not os.path.isdir(folder):
+                    continue
+                meta = self._read_meta(name)
+                if meta is None:
+                    shutil.rmtree(folder, ignore_errors=True)
+                    cleaned += 1
+                    continue
+                current = str(meta['generation'])
+                for entry in os.listdir(folder):
+                    if entry != current and os.path.isdir(os.path.join(folder, entry)):
+                        shutil.rmtree(os.path.join(folder, entry), ignore_errors=True)
+                        cleaned += 1
+                expected = meta['rows'] * 8
+                if os.path.getsize(self._file(name, meta['generation'], INDEX_FILE)) != expected:
+                    self.write(name, self.read(name).copy())
+                    cleaned += 1
+        if cleaned:
+            logging.info(f'Compacted price archive {self.root}: cleaned {cleaned} items')
+        return cleaned
@@ -0,0 +1,391 @@
+import os
+import json
+import time
+import logging
+import threading
+
+import numpy as np
+import pandas as pd
+
+from price_archive import PriceArchive
+from upstream import UpstreamError
+
+
+# 기간 문자열(yfinance period 형식)의 단위
+PERIOD_UNITS = {'d': 'days', 'wk': 'weeks', 'mo': 'months', 'y': 'years'}
+
+
+def parse_period(period):
+    """'5d', '6mo', '1y', '2Y' 형태의 기간 문자열을 (숫자, 단위)로 변환 ('max'는 None)"""
+    period = period.lower()
+    if period == 'max':
+        return None
+    for unit in ('mo', 'wk', 'd', 'y'):
+        if period.endswith(unit) and period[:-len(unit)].isdigit():
+            return int(period[:-len(unit)]), unit
+    raise ValueError(f"지원하지 않는 기간 형식입니다: {period}")
+
+
+def period_start(period, now=None):
+    """기간 문자열이 가리키는 시작 시각 계산 (일 단위 기간과 'max'는 None)"""
+    parsed = parse_period(period)
+    if parsed is None or parsed[1] == 'd':
+        return None
+    count, unit = parsed
+    if now is None:
+        now = pd.Timestamp.now()
+    return now.normalize() - pd.DateOffset(**{PERIOD_UNITS[unit]: count})
+
+
+def slice_period(data, period):
+    """캐시된 전체 데이터에서 요청한 기간만 잘라서 반환"""
+    if data.empty:
+        return data
+    parsed = parse_period(period)
+    if parsed is None:
+        return data
+    count, unit = parsed
+    # 인덱스가 정렬되어 있으므로 시작 위치만 찾아 뒷부분을 잘라냄 (memmap 데이터를 복사하지 않음)
+    if unit == 'd':
+        # yfinance와 동일하게 최근 N 거래일을 반환 (분봉이면 해당 날짜의 모든 봉)
+        last_days = data.index.normalize().unique()[-count:]
+        return data.iloc[data.index.searchsorted(last_days[0]):]
+    start = period_start(period, pd.Timestamp.now(tz=data.index.tz))
+    return data.iloc[data.index.searchsorted(start):]
+
+
+class PriceCache:
+    """티커와 봉 간격별 OHLCV를 price_archive.PriceArchive에 저장하고 증분으로 갱신하는 캐시"""
+
+    def __init__(self, cache_dir='price_cache', max_age=30 * 60, max_bytes=200 * 1024 * 1024, default_period='2y',
+                 max_concurrency=4, rate_limiter=None, metrics=None, provider=None, float_dtype='float64'):
+        self.cache_dir = cache_dir
+        self.max_age = max_age  # 이 시간(초) 안에 갱신된 데이터는 네트워크 요청 없이 사용
+        self.max_bytes = max_bytes  # 캐시 디렉토리 전체 크기 상한
+        self.default_period = default_period  # 최초 다운로드 시 최소한으로 받아둘 기간
+        self.max_concurrency = max_concurrency  # 묶음 요청 안에서 동시에 진행할 티커 다운로드 수
+        self.rate_limiter = rate_limiter  # Yahoo 요청 속도 제한 (ratelimit.TokenBucket, 티커 하나당 토큰 1개)
+        self.metrics = metrics  # 조회/다운로드 지표를 기록할 metrics.MetricsRegistry (없으면 기록하지 않음)
+        if provider is None:
+            from data_provider import YahooProvider
+            provider = YahooProvider()
+        self.provider = provider  # 시세를 받아올 data_provider.DataProvider
+        self.index_file = os.path.join(cache_dir, 'index.json')
+        self.archive = PriceArchive(os.path.join(cache_dir, 'archive'), float_dtype=float_dtype)  # 가격 저장 형식
+        # 인덱스와 아카이브를 읽고 바꾸는 동안만 잡음 (다운로드 중에는 잡지 않으므로 캐시 조회는 다운로드를 기다리지 않음)
+        self._lock = threading.RLock()
+        self._inflight = {}  # 다운로드 중인 키 -> 끝나면 set되는 threading.Event (같은 티커를 동시에 두 번 받지 않도록)
+        self._download_lock = threading.Lock()  # yf.download는 모듈 전역 상태를 쓰므로 캐시 조회/직접 다운로드 모두 한 번에 하나씩
+
+        if not os.path.exists(self.cache_dir):
+            os.makedirs(self.cache_dir)
+            logging.info(f"Created price cache directory at {self.cache_dir}")
+        self.index = self._load_index()
+
+    def _load_index(self):
+        if os.path.exists(self.index_file):
+            try:
+                with open(self.index_file, 'r', encoding='utf-8') as f:
+                    return json.load(f)
+            except (OSError, ValueError) as e:
+                logging.error(f"Failed to load price cache index, starting empty: {e}")
+        return {}
+
+    def _save_index(self):
+        tmp_file = self.index_file + '.tmp'
+        with open(tmp_file, 'w', encoding='utf-8') as f:
+            json.dump(self.index, f, ensure_ascii=False)
+        os.replace(tmp_file, self.index_file)
+
+    @staticmethod
+    def _key(ticker, interval):
+        return f"{ticker.upper()}_{interval}"
+
+    def _legacy_path(self, key):
+        return os.path.join(self.cache_dir, f"{key}.pkl")
+
+    def _load(self, key):
+        if key not in self.index:
+            return None
+        legacy_path = self._legacy_path(key)
+        if key not in self.archive and os.path.exists(legacy_path):
+            # 이전 형식(pickle)의 캐시는 처음 읽을 때 아카이브로 옮김
+            try:
+                self.archive.write(key, pd.read_pickle(legacy_path))
+                os.remove(legacy_path)
+                logging.info(f'Migrated cached data for {key} to price archive')
+            except Exception as e:
+                logging.error(f"Failed to migrate cached data for {key}: {e}")
+                return None
+        try:
+            return self.archive.read(key)
+        except Exception as e:
+            logging.error(f"Failed to read cached data for {key}: {e}")
+            return None
+
+    def _store(self, key, data, covered_from):
+        """전체 데이터를 아카이브에 쓰고 저장된 데이터(memmap) 반환"""
+        self.archive.write(key, data)
+        self._touch(key, covered_from)
+        return self.archive.read(key)
+
+    def _append(self, key, new_data):
+        """새로 받은 봉을 아카이브에 덧붙이고 저장된 전체 데이터(memmap) 반환"""
+        self.archive.append(key, new_data)
+        self._touch(key, self.index[key]['covered_from'])
+        return self.archive.read(key)
+
+    def _touch(self, key, covered_from):
+        self.index[key] = {
+            'fetched_at': time.time(),
+            'last_access': time.time(),
+            'covered_from': covered_from,
+            'bytes': self.archive.size(key),
+        }
+
+    def _covers(self, entry, period):
+        """캐시된 데이터가 요청 기간을 포함하는지 확인"""
+        if entry.get('covered_from') == 'max':
+            return True
+        if parse_period(period) is None:
+            return False
+        start = period_start(period)
+        if start is None:
+            return True  # 일 단위 기간은 최근 봉만 있으면 충분
+        return pd.Timestamp(entry['covered_from']) <= start
+
+    def _fetch_period(self, period):
+        """최초 다운로드 기간: 요청 기간과 기본 기간 중 더 긴 쪽"""
+        if parse_period(period) is None or parse_period(self.default_period) is None:
+            return 'max'
+        requested = period_start(period)
+        default = period_start(self.default_period)
+        if requested is None:
+            return self.default_period
+        if default is None or requested < default:
+            return period
+        return self.default_period
+
+    def get(self, ticker, period='1y', interval='1d'):
+        """티커 데이터를 캐시에서 반환 (필요한 경우 마지막 캐시 날짜 이후만 다운로드)"""
+        return self.get_many([ticker], period=period, interval=interval)[ticker.upper()]
+
+    def get_many(self, tickers, period='1y', interval='1d', chunk_size=50):
+        """여러 티커를 한 번에 조회하여 {티커: 데이터} 반환 (필요한 티커만 묶어서 요청하고, 다른 호출이 받는 중인 티커는 그 결과를 기다림)"""
+        tickers = list(dict.fromkeys(ticker.upper() for ticker in tickers))
+        results = {}
+        cached = {}
+        waiting = {}  # 다른 호출이 받고 있는 티커 -> Event
+        owned = []  # 이 호출이 다운로드를 맡은 키
+        # 같은 방식으로 다운로드할 티커끼리 묶음: ('period', 기간) 또는 ('start', 시작일)
+        groups = {}
+
+        with self._lock:
+            for ticker in tickers:
+                key = self._key(ticker, interval)
+                entry = self.index.get(key)
+                data = self._load(key)
+                if data is not None and self._covers(entry, period) and time.time() - entry['fetched_at'] <= self.max_age:
+                    entry['last_access'] = time.time()
+                    results[ticker] = slice_period(data, period)
+                    logging.info(f'Price cache hit for {key}')
+                    self._record('price_cache_lookups_total', result='hit')
+                    continue
+                if key in self._inflight:
+                    waiting[ticker] = self._inflight[key]
+                    continue
+                self._inflight[key] = threading.Event()
+                owned.append(key)
+                if data is None or not self._covers(entry, period):
+                    groups.setdefault(('period', self._fetch_period(period)), []).append(ticker)
+                else:
+                    # 마지막 캐시 봉 직전 봉부터 다시 받아서 미완성 봉은 최신 값으로 덮어쓰고,
+                    # 겹치는 완성 봉으로 분할/배당 조정 여부를 확인
+                    cached[ticker] = data
+                    groups.setdefault(('start', data.index[max(len(data) - 2, 0)].strftime('%Y-%m-%d')), []).append(ticker)
+
+        try:
+            adjusted = self._fetch_groups(groups, cached, results, period, interval, chunk_size)
+            if adjusted:
+                # 과거 가격이 조정된 티커는 캐시를 지우고 전체 기간을 다시 받음
+                with self._lock:
+                    for ticker in adjusted:
+                        self.index.pop(self._key(ticker, interval), None)
+                self._fetch_groups({('period', self._fetch_period(period)): adjusted}, {}, results, period, interval, chunk_size)
+            if groups:
+                with self._lock:
+                    self._evict()
+                    self._save_index()
+        finally:
+            with self._lock:
+                for key in owned:
+                    self._inflight.pop(key).set()
+
+        if waiting:
+            retry = []
+            for ticker, event in waiting.items():
+                event.wait()
+                with self._lock:
+                    key = self._key(ticker, interval)
+                    data = self._load(key)
+                    if data is not None and self._covers(self.index[key], period):
+                        # 다른 호출이 방금 갱신했거나 갱신에 실패한 경우 모두 저장된 데이터로 응답
+                        self.index[key]['last_access'] = time.time()
+                        results[ticker] = slice_period(data, period)
+                    else:
+                        retry.append(ticker)
+            if retry:
+                results.update(self.get_many(retry, period, interval, chunk_size))
+        return {ticker: results[ticker] for ticker in tickers}
+
+    def download(self, tickers, period='1d', interval='1m', chunk_size=50, start=None):
+        """캐시를 거치지 않고 묶음 요청으로 바로 받아 {티커: 데이터} 반환 (start가 있으면 그 시각 이후만, 받지 못한 티커는 빠짐)"""
+        tickers = list(dict.fromkeys(ticker.upper() for ticker in tickers))
+        window = {'start': start} if start is not None else {'period': period}
+        frames = {}
+        for i in range(0, len(tickers), chunk_size):
+            chunk = tickers[i:i + chunk_size]
+            started = time.perf_counter()
+            frames.update(self._download_chunk(chunk, interval, **window))
+            if self.metrics is not None:
+                self.metrics.histogram('price_download_seconds', 'Duration of one batched Yahoo download').observe(
+                    time.perf_counter() - started, mode=f'direct_{interval}')
+        return frames
+
+    def _fetch_groups(self, groups, cached, results, period, interval, chunk_size):
+        """묶음별로 (잠금 없이) 다운로드하여 캐시와 results에 반영하고, 과거 가격이 조정되어 다시 받아야 하는 티커 목록 반환"""
+        adjusted = []
+        for (kind, value), group in groups.items():
+            for i in range(0, len(group), chunk_size):
+                chunk = group[i:i + chunk_size]
+                started = time.perf_counter()
+                frames = self._download_chunk(chunk, interval, **{kind: value})
+                elapsed = time.perf_counter() - started
+                logging.info(f'Downloaded chunk of {len(chunk)} tickers ({kind}={value}) in {elapsed:.2f}s, '
+                             f'{len(frames)} succeeded')
+                if self.metrics is not None:
+                    mode = 'full' if kind == 'period' else 'incremental'
+                    self.metrics.histogram('price_download_seconds', 'Duration of one batched Yahoo download').observe(elapsed, mode=mode)
+                    # 묶음 요청이라 티커별 시간은 묶음 시간을 티커 수로 나눈 평균으로 기록
+                    self.metrics.histogram('price_download_seconds_per_ticker', 'Batched download time divided by tickers').observe(
+                        elapsed / len(chunk), mode=mode)
+                    self._record('price_cache_lookups_total', len(chunk), result=mode)
+                    self._record('price_download_tickers_total', len(frames), status='ok')
+                    self._record('price_download_tickers_total', len(chunk) - len(frames), status='failed')
+
+                with self._lock:
+                    for ticker in chunk:
+                        key = self._key(ticker, interval)
+                        new_data = frames.get(ticker)
+                        if kind == 'period':
+                            if new_data is None:
+                                logging.warning(f'No data downloaded for ticker: {ticker}')
+                                results[ticker] = pd.DataFrame()
+                                continue
+                            start = period_start(value)
+                            if value == 'max':
+                                covered_from = 'max'
+                            else:
+                                covered_from = (start if start is not None else new_data.index[0]).isoformat()
+                            # 저장된 값(float_dtype으로 저장한 가격)으로 응답하여 이후 캐시 조회 결과와 같은 값을 쓰도록 함
+                            results[ticker] = slice_period(self._store(key, new_data, covered_from), period)
+                        else:
+                            data = cached[ticker]
+                            if new_data is None:
+                                # 갱신에 실패하면 기존 캐시 데이터로 응답
+                                logging.warning(f'Incremental download failed for {key}, serving cached data')
+                            elif self._history_adjusted(data, new_data):
+                                logging.info(f'Price history for {key} was adjusted (split/dividend), refetching')
+                                self._record('price_history_adjustments_total')
+                                adjusted.append(ticker)
+                                continue
+                            else:
+                                data = self._append(key, new_data)
+                            results[ticker] = slice_period(data, period)
+        return adjusted
+
+    def compact(self):
+        """아카이브 정리 (인덱스에 없는 항목 삭제, 남아 있는 이전 세대와 중단된 기록 정리), 정리한 항목 수 반환"""
+        with self._lock:
+            orphans = [key for key in self.archive.keys() if key not in self.index]
+            for key in orphans:
+                self.archive.delete(key)
+            return len(orphans) + self.archive.compact()
+
+    def _record(self, name, amount=1, **labels):
+        if self.metrics is not None and amount:
+            self.metrics.counter(name).inc(amount, **labels)
+
+    @staticmethod
+    def _history_adjusted(data, new_data):
+        """새로 받은 데이터와 겹치는 완성 봉의 종가가 캐시와 다르면 과거 가격이 조정된 것"""
+        if len(data) < 2 or 'Close' not in new_data:
+            return False
+        overlap = data.index[-2]
+        if overlap not in new_data.index:
+            return False
+        return not np.isclose(new_data['Close'].loc[overlap], data['Close'].loc[overlap], rtol=1e-6)
+
+    def _download_chunk(self, chunk, interval, **kwargs):
+        """티커 묶음을 한 번의 요청으로 다운로드하여 티커별 데이터로 분리 (실패한 티커는 제외)"""
+        # yf.download는 모듈 전역 상태를 쓰므로 묶음끼리는 순서대로 호출하고,
+        # 묶음 안의 티커들은 yfinance 내부 스레드(max_concurrency개)로 동시에 받음
+        with self._download_lock:
+            if self.rate_limiter is not None:
+                self.rate_limiter.acquire_blocking(len(chunk))
+            try:
+                data = self.provider.download(chunk, interval=interval, threads=self.max_concurrency, **kwargs)
+            except UpstreamError as e:
+                # 재시도해도 요청 한도 초과/네트워크 오류가 계속되거나 서킷이 열려 있으면 티커별로 다시 보내지 않음
+                # (받지 못한 티커는 결과에서 빠지고, 캐시가 있는 티커는 저장된 데이터로 응답)
+                logging.error(f"Upstream unavailable for {len(chunk)} tickers, serving cached data: {e}")
+                self._record('price_download_upstream_failures_total')
+                return {}
+            except Exception as e:
+                # 묶음 요청 자체가 실패하면 티커별로 다시 시도하여 나머지 티커는 살림
+                logging.error(f"Batch download failed for {len(chunk)} tickers, retrying one by one: {e}")
+                frames = {}
+                for ticker in chunk:
+                    if self.rate_limiter is not None:
+                        self.rate_limiter.acquire_blocking()
+                    try:
+                        frames.update(self._split_frames([ticker], self.provider.download([ticker], interval=interval, **kwargs)))
+                    except UpstreamError as e:
+                        logging.error(f"Upstream unavailable, skipping the rest of the chunk: {e}")
+                        break
+                    except Exception as e:
+                        logging.error(f"Error downloading ticker {ticker}: {e}")
+                return frames
+            return self._split_frames(chunk, data)
+
+    @staticmethod
+    def _split_frames(chunk, data):
+        """다중 티커 다운로드 결과를 {티커: 데이터}로 분리"""
+        frames = {}
+        if isinstance(data.columns, pd.MultiIndex) and data.columns.nlevels > 1:
+            level = 0 if set(chunk) & set(data.columns.get_level_values(0)) else 1
+            available = set(data.columns.get_level_values(level))
+            for ticker in chunk:
+                if ticker in available:
+                    frame = data.xs(ticker, axis=1, level=level).dropna(how='all')
+                    if not frame.empty:
+                        frames[ticker] = frame
+        elif len(chunk) == 1 and not data.empty:
+            frames[chunk[0]] = data.dropna(how='all')
+        return frames
+
+    def _evict(self):
+        """캐시 전체 크기가 상한을 넘으면 가장 오래 사용되지 않은 항목부터 삭제"""
+        total = sum(entry['bytes'] for entry in self.index.values())
+        if total <= self.max_bytes:
+            return
+        for key in sorted(self.index, key=lambda k: self.index[k]['last_access']):
+            if total <= self.max_bytes:
+                break
+            total -= self.index[key]['bytes']
+            del self.index[key]
+            try:
+                self.archive.delete(key)
+            except OSError as e:
+                logging.error(f"Failed to remove cached data for {key}: {e}")
+            logging.info(f'Evicted {key} from price cache')
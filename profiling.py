@@ -0,0 +1,256 @@
+# 정기 작업/명령어의 구간별 벽시계/CPU 시간과 스택 샘플을 기록하는 프로파일링 모드
+# (실행마다 구간별 시간 표 {시각}_{이름}.txt와 플레임 그래프용 접힌 스택 {시각}_{이름}.folded를 남김)
+import os
+import re
+import sys
+import time
+import logging
+import threading
+import contextvars
+from collections import Counter, deque
+from datetime import datetime
+
+
+# 샘플에서 대기 중인 스레드로 보고 함수 목록 집계에서 뺄 가장 안쪽 함수 이름
+IDLE_FUNCTIONS = frozenset({'wait', 'select', 'poll', 'sleep', 'get', 'acquire', 'accept', 'recv', 'recv_into', '_recv',
+                            '_worker', 'readinto', 'epoll', 'control', 'dequeue'})
+
+_current = contextvars.ContextVar('profiling_span', default=None)
+
+
+class _NullSpan:
+    def __enter__(self):
+        return None
+
+    def __exit__(self, *exc):
+        return False
+
+
+NULL_SPAN = _NullSpan()
+
+
+class Run:
+    """바깥 구간 한 번의 실행과 그 안의 모든 구간 기록"""
+
+    def __init__(self, name):
+        self.name = name
+        self.started_at = time.time()
+        self.spans = []  # (경로, 벽시계 시간, 프로세스 CPU 시간, 루프 스레드 CPU 시간 또는 None, 상태)
+        self.samples = Counter()  # 접힌 스택 -> 샘플 수
+        self.sample_count = 0
+        self.wall = None
+        self.closed = False  # 끝난 뒤에는 샘플을 더하지 않음 (저장하는 동안 바뀌지 않도록)
+        self._lock = threading.Lock()
+
+    def add_span(self, record):
+        with self._lock:
+            self.spans.append(record)
+
+    def add_samples(self, stacks):
+        with self._lock:
+            if self.closed:
+                return
+            self.samples.update(stacks)
+            self.sample_count += 1
+
+    def close(self):
+        with self._lock:
+            self.closed = True
+
+
+class Span:
+    """구간 하나 (with 블록 동안의 벽시계/CPU 시간을 실행 기록에 추가)"""
+
+    def __init__(self, profiler, label):
+        self.profiler = profiler
+        self.label = label
+
+    def __enter__(self):
+        parent = _current.get()
+        if parent is None:
+            self.run = self.profiler._begin(self.label)
+            self.path = self.label
+        else:
+            # 'check_watchlist' 아래의 'check_watchlist:fetch'는 'check_watchlist/fetch'로
+            label = self.label[len(parent.label) + 1:] if self.label.startswith(parent.label + ':') else self.label
+            self.run = parent.run
+            self.path = f'{parent.path}/{label}'
+        self.thread = threading.get_ident()
+        self.token = _current.set(self)
+        self.cpu_started = time.process_time()
+        self.thread_cpu_started = time.thread_time()
+        self.started = time.perf_counter()
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        wall = time.perf_counter() - self.started
+        cpu = time.process_time() - self.cpu_started
+        # 루프 스레드 CPU 시간은 같은 스레드에서 끝난 구간만 의미가 있음
+        thread_cpu = time.thread_time() - self.thread_cpu_started if threading.get_ident() == self.thread else None
+        _current.reset(self.token)
+        status = 'ok' if exc_type is None else ('cancelled' if exc_type.__name__ == 'CancelledError' else 'error')
+        self.run.add_span((self.path, wall, cpu, thread_cpu, status))
+        if '/' not in self.path:
+            self.run.wall = wall
+            self.profiler._finish(self.run)
+        return False
+
+
+class StackSampler:
+    """실행 중인 기록이 있는 동안 interval초마다 모든 스레드의 호출 스택을 모아 기록마다 더함"""
+
+    def __init__(self, interval, runs, lock):
+        self.interval = interval
+        self._runs = runs  # Profiler가 관리하는 실행 중인 기록 목록 (lock으로 보호)
+        self._lock = lock
+        self._thread = None
+
+    def ensure_running(self):
+        """샘플링 스레드가 없으면 시작 (lock을 잡은 채로 호출)"""
+        if self._thread is None:
+            self._thread = threading.Thread(target=self._loop, name='profiler-sampler', daemon=True)
+            self._thread.start()
+
+    @staticmethod
+    def _stack(frame):
+        names = []
+        while frame is not None:
+            code = frame.f_code
+            names.append(f'{code.co_name} ({os.path.basename(code.co_filename)}:{code.co_firstlineno})')
+            frame = frame.f_back
+        return ';'.join(reversed(names))
+
+    def _loop(self):
+        own = threading.get_ident()
+        while True:
+            with self._lock:
+                runs = list(self._runs)
+                if not runs:
+                    self._thread = None  # 다음 실행이 시작되면 다시 시작됨
+                    return
+            names = {thread.ident: thread.name for thread in threading.enumerate()}
+            stacks = Counter(
+                f'{names.get(ident, ident)};{self._stack(frame)}'
+                for ident, frame in sys._current_frames().items() if ident != own
+            )
+            for run in runs:
+                run.add_samples(stacks)
+            time.sleep(self.interval)
+
+
+def summarize_spans(spans):
+    """[(경로, 횟수, 벽시계 합계, 최대, CPU 합계, 루프 CPU 합계, 실패 수)] (처음 나온 순서)"""
+    rows = {}
+    for path, wall, cpu, thread_cpu, status in spans:
+        row = rows.setdefault(path, [path, 0, 0.0, 0.0, 0.0, 0.0, 0])
+        row[1] += 1
+        row[2] += wall
+        row[3] = max(row[3], wall)
+        row[4] += cpu
+        row[5] += thread_cpu or 0.0
+        row[6] += status != 'ok'
+    return [tuple(row) for row in rows.values()]
+
+
+def top_functions(samples, limit=20):
+    """가장 안쪽 함수별 샘플 수 (대기 중인 스레드 제외) [(함수, 샘플 수)]"""
+    leaves = Counter()
+    for stack, count in samples.items():
+        leaf = stack.rsplit(';', 1)[-1]
+        if leaf.split(' ', 1)[0] not in IDLE_FUNCTIONS:
+            leaves[leaf] += count
+    return leaves.most_common(limit)
+
+
+class Profiler:
+    """프로파일링 모드 설정과 실행 기록 저장 (enabled가 False면 구간을 만들지 않음)"""
+
+    def __init__(self, directory='profiles', enabled=False, sample_interval=0.02, min_seconds=0.5, max_runs=200):
+        self.directory = directory  # 실행 기록을 저장할 폴더
+        self.enabled = enabled
+        self.sample_interval = sample_interval  # 스택 샘플링 주기(초), 0이면 구간 시간만 기록
+        self.min_seconds = min_seconds  # 이보다 짧게 끝난 실행은 저장하지 않음
+        self.max_runs = max_runs  # 보관할 최대 실행 기록 수 (넘으면 오래된 것부터 삭제)
+        self.recent = deque(maxlen=20)  # 최근 저장한 (이름, 시작 시각, 벽시계 시간, 요약 파일 경로)
+        self._active = []
+        self._lock = threading.Lock()
+        self._sampler = StackSampler(sample_interval, self._active, self._lock) if sample_interval > 0 else None
+
+    def span(self, label):
+        """구간을 기록하는 컨텍스트 관리자 (꺼져 있으면 아무것도 하지 않음)"""
+        if not self.enabled and _current.get() is None:
+            return NULL_SPAN
+        return Span(self, label)
+
+    def _begin(self, name):
+        run = Run(name)
+        with self._lock:
+            self._active.append(run)
+            if self._sampler is not None:
+                self._sampler.ensure_running()
+        return run
+
+    def _finish(self, run):
+        with self._lock:
+            self._active.remove(run)
+        run.close()
+        if run.wall < self.min_seconds:
+            return
+        # 파일 쓰기는 이벤트 루프를 막지 않도록 별도 스레드에서
+        threading.Thread(target=self._write, args=(run,), name='profiler-writer', daemon=True).start()
+
+    def _paths(self, run):
+        stamp = datetime.fromtimestamp(run.started_at).strftime('%Y%m%d-%H%M%S')
+        name = re.sub(r'[^\w.-]+', '_', run.name)
+        base = os.path.join(self.directory, f'{stamp}_{name}')
+        return base + '.txt', base + '.folded'
+
+    def _write(self, run):
+        try:
+            os.makedirs(self.directory, exist_ok=True)
+            summary_path, folded_path = self._paths(run)
+            with open(summary_path, 'w', encoding='utf-8') as f:
+                f.write(self.format_run(run))
+            if run.samples:
+                with open(folded_path, 'w', encoding='utf-8') as f:
+                    for stack, count in sorted(run.samples.items()):
+                        f.write(f'{stack} {count}\n')
+            self.recent.append((run.name, run.started_at, run.wall, summary_path))
+            logging.info(f'Saved profile for {run.name} ({run.wall:.2f}s) to {summary_path}')
+            self._prune()
+        except Exception as e:
+            logging.error(f"Failed to save profile for {run.name}: {e}")
+
+    def format_run(self, run):
+        """실행 하나의 요약 표"""
+        rows = summarize_spans(run.spans)
+        root = next((row for row in rows if row[0] == run.name), None)
+        lines = [
+            f'{run.name}  {datetime.fromtimestamp(run.started_at):%Y-%m-%d %H:%M:%S}  wall {run.wall:.3f}s'
+            + (f'  cpu {root[4]:.3f}s  loop cpu {root[5]:.3f}s' if root is not None else ''),
+        ]
+        if run.sample_count:
+            lines.append(f'{run.sample_count} stack samples every {self.sample_interval * 1000:.0f}ms')
+        lines.append('')
+        width = max([len('span')] + [len(row[0]) for row in rows])
+        lines.append(f"{'span':<{width}}  {'count':>6}  {'wall(s)':>9}  {'max(s)':>9}  {'cpu(s)':>9}  {'loop cpu(s)':>11}  {'failed':>6}")
+        for path, count, wall, longest, cpu, thread_cpu, failed in sorted(rows, key=lambda row: row[0]):
+            lines.append(f'{path:<{width}}  {count:>6}  {wall:>9.3f}  {longest:>9.3f}  {cpu:>9.3f}  {thread_cpu:>11.3f}  {failed:>6}')
+        functions = top_functions(run.samples)
+        if functions:
+            total = sum(run.samples.values())
+            lines += ['', 'top functions (samples where this was the innermost frame, idle waits excluded)']
+            for function, count in functions:
+                lines.append(f'{count:>8}  {count / total * 100:5.1f}%  {function}')
+        return '\n'.join(lines) + '\n'
+
+    def _prune(self):
+        """오래된 실행 기록부터 삭제하여 max_runs개만 남김"""
+        summaries = sorted(name for name in os.listdir(self.directory) if name.endswith('.txt'))
+        for name in summaries[:max(0, len(summaries) - self.max_runs)]:
+            base = os.path.join(self.directory, name[:-len('.txt')])
+            for path in (base + '.txt', base + '.folded'):
+                try:
+                    os.remove(path)
+                except FileNotFoundError:
+                    pass
@@ -0,0 +1,36 @@
+import asyncio
+import threading
+import time
+
+
+class TokenBucket:
+    """초당 rate개씩 채워지고 최대 capacity개까지 쌓이는 토큰 버킷 (스레드/코루틴 양쪽에서 사용 가능)"""
+
+    def __init__(self, rate, capacity):
+        self.rate = rate
+        self.capacity = capacity
+        self.tokens = capacity
+        self.updated = time.monotonic()
+        self._lock = threading.Lock()
+
+    def _take(self, tokens):
+        """토큰을 가져오고, 부족하면 더 기다려야 하는 시간(초)을 반환"""
+        tokens = min(tokens, self.capacity)
+        with self._lock:
+            now = time.monotonic()
+            self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+            self.updated = now
+            if self.tokens >= tokens:
+                self.tokens -= tokens
+                return 0
+            return (tokens - self.tokens) / self.rate
+
+    def acquire_blocking(self, tokens=1):
+        """워커 스레드에서 토큰을 얻을 때까지 대기"""
+        while (wait := self._take(tokens)) > 0:
+            time.sleep(wait)
+
+    async def acquire(self, tokens=1):
+        """이벤트 루프를 막지 않고 토큰을 얻을 때까지 대기"""
+        while (wait := self._take(tokens)) > 0:
+            await asyncio.sleep(wait)
@@ -0,0 +1,81 @@
+import logging
+from datetime import datetime
+
+import indicators
+from signal_rules import snapshot_values
+
+
+# 게이트웨이 프로세스와 샤드 워커 프로세스가 같이 쓰는 관심종목/종가 메시지 생성 함수
+
+
+def signal_values(engine, tickers, prices, snapshots, state_indicators):
+    """필요한 지표가 모두 지표 상태(state_indicators)에 있으면 상태에서, 아니면 가격 데이터로 한 번에 계산"""
+    names = engine.indicator_names()
+    if names <= state_indicators:
+        return snapshot_values(snapshots, tickers, names)
+    return indicators.compute(indicators.close_matrix(prices, tickers), names)
+
+
+def evaluate_watchlist_signals(engine, tickers, prices, snapshots, state_indicators):
+    """관심종목 규칙을 전체 티커에 대해 한 번에 평가하여 {티커: [Signal]} 반환"""
+    values = signal_values(engine, tickers, prices, snapshots, state_indicators)
+    return engine.evaluate(tickers, values, watchlist=set(tickers))
+
+
+def describe_watchlist_ticker(ticker, snapshot, signals):
+    """지표 상태와 신호로 (메시지, 차트 전송 여부) 생성"""
+    latest_close = snapshot['close']
+    previous_close = snapshot['prev_close']
+    change_percent = ((latest_close - previous_close) / previous_close) * 100
+
+    # 종가가 돌파한 이동평균선
+    crossed_mas = [signal.rule.label for signal in signals if signal.rule.kind == 'cross']
+
+    # 출력 내용 생성
+    message = f"**{ticker}**의 종가: {latest_close:.2f}\n이전 종가 대비 변화율: {change_percent:.2f}%\n"
+
+    if crossed_mas:
+        message += f"크로스된 MA: {', '.join(crossed_mas)}\n"
+
+    # 중요한 변화(규칙 신호)가 있을 때만 차트 전송
+    return message, bool(signals)
+
+
+def watchlist_report(ticker, data, snapshot, signals, indicator_state, engine, state_indicators):
+    """관심종목 한 종목의 (메시지, 차트 전송 여부), 데이터가 없으면 None"""
+    # 다운로드한 데이터의 크기 로깅
+    data_size = data.memory_usage(index=True).sum()
+    logging.info(f'Fetched data for ticker: {ticker}, size: {data_size} bytes', extra={'data_size': data_size, 'direction': 'input'})
+
+    if snapshot is None:
+        logging.warning(f'No data found for ticker: {ticker}')
+        return None
+    message, send_chart_flag = describe_watchlist_ticker(ticker, snapshot, signals)
+
+    if send_chart_flag and not indicator_state.verify(ticker, data):
+        # 알림을 보내기 전에 누적 상태를 전체 재계산과 대조하고, 다르면 다시 만들어 메시지 재생성
+        snapshots = {ticker: indicator_state.rebuild(ticker, data).snapshot()}
+        signals = evaluate_watchlist_signals(engine, [ticker], {ticker: data}, snapshots, state_indicators)[ticker]
+        message, send_chart_flag = describe_watchlist_ticker(ticker, snapshots[ticker], signals)
+    return message, send_chart_flag
+
+
+def format_stock_price_message(ticker, data):
+    """종가 메시지 생성 (데이터가 부족하면 예외 발생)"""
+    # 다운로드한 데이터의 크기 로깅
+    data_size = data.memory_usage(index=True).sum()
+    logging.info(f'Fetched data for ticker: {ticker}, size: {data_size} bytes', extra={'data_size': data_size, 'direction': 'input'})
+
+    if len(data) < 2:
+        # 받지 못했거나(외부 요청 실패, 없는 티커) 봉이 하나뿐이면 내부 오류 대신 알아볼 수 있는 메시지로
+        raise LookupError('최근 종가 데이터를 가져올 수 없습니다.')
+    latest_close = data['Close'].iloc[-1]
+    previous_close = data['Close'].iloc[-2]
+    change_percent = ((latest_close - previous_close) / previous_close) * 100
+    message = f"{datetime.now().strftime('%Y-%m-%d')} **{ticker.upper()}** 종가: ${latest_close:.2f} ({change_percent:.2f}%)"
+    logging.info(f'Got stock price for ticker: {ticker}')
+    return message
+
+
+def stock_price_error_message(ticker, error):
+    return f"티커 {ticker}에 대한 정보를 가져오는데 실패했습니다: {error}"
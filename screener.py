@@ -0,0 +1,191 @@
+# 로컬 가격 아카이브 전체의 최신 지표 표와 열별 정렬 인덱스로 다운로드 없이 응답하는 종목 스크리너
+# 필터 형식: 'rsi<30', 'change>5', 'close>=100', 'sma200>50', 'cross200', 'cross200up', 'cross200down'
+import os
+import re
+import time
+import logging
+
+import numpy as np
+import pandas as pd
+
+import indicators
+
+
+FILTER_PATTERN = re.compile(r'^([a-z]+\d*)(<=|>=|<|>|=)(-?\d+(?:\.\d+)?)$')
+CROSS_PATTERN = re.compile(r'^cross(\d+)(up|down)?$')
+CROSS_DIRECTIONS = {'up': 1, 'down': -1}
+
+
+def archive_frames(archives, interval='1d', bars=None):
+    """여러 아카이브에 저장된 {티커: 최근 bars개 봉} (같은 티커가 여러 곳에 있으면 마지막 봉이 최신인 쪽)"""
+    suffix = f'_{interval}'
+    frames = {}
+    for archive in archives:
+        for key in archive.keys():
+            if not key.endswith(suffix):
+                continue
+            try:
+                data = archive.read(key)
+            except Exception as e:
+                logging.error(f"Failed to read archived data for {key}: {e}")
+                continue
+            if data is None or data.empty:
+                continue
+            if bars is not None:
+                data = data.iloc[-bars:]
+            ticker = key[:-len(suffix)]
+            if ticker not in frames or frames[ticker].index[-1] < data.index[-1]:
+                frames[ticker] = data
+    return frames
+
+
+class ScreenerTable:
+    """한 거래일의 티커별 지표 열과 열마다 정렬된 인덱스 (NaN은 정렬된 값의 끝에 모이므로 valid개까지만 검색)"""
+
+    def __init__(self, date, tickers, columns, rsi_period=14, built_at=None):
+        self.date = date
+        self.tickers = np.asarray(tickers, dtype=str)
+        self.columns = {name: np.asarray(values, dtype=float) for name, values in columns.items()}
+        self.rsi_period = rsi_period
+        self.built_at = built_at if built_at is not None else time.time()
+        self._order = {}
+        self._sorted = {}
+        self._valid = {}
+        self._rank = {}
+        for name, values in self.columns.items():
+            order = np.argsort(values, kind='stable')
+            self._order[name] = order
+            self._sorted[name] = values[order]
+            self._valid[name] = int(np.count_nonzero(~np.isnan(values)))
+            # 결과 정렬용: 행 번호 -> 정렬된 순서에서의 위치
+            rank = np.empty(len(order), dtype=np.int64)
+            rank[order] = np.arange(len(order))
+            self._rank[name] = rank
+
+    def __len__(self):
+        return len(self.tickers)
+
+    def column_names(self):
+        return list(self.columns)
+
+    def _resolve(self, name):
+        if name == 'rsi':
+            name = f'rsi{self.rsi_period}'
+        if name not in self.columns:
+            raise ValueError(f"지원하지 않는 항목입니다: {name} (사용 가능: {', '.join(self.columns)})")
+        return name
+
+    def parse_filters(self, tokens):
+        """'rsi<30', 'cross200up' 같은 필터 문자열을 [(열 이름, 비교 연산자, 값)]으로 변환"""
+        filters = []
+        for token in tokens:
+            text = token.lower()
+            match = CROSS_PATTERN.match(text)
+            if match is not None:
+                name = self._resolve(f'cross{match.group(1)}')
+                direction = match.group(2)
+                filters.append((name, '!=', 0.0) if direction is None else (name, '=', float(CROSS_DIRECTIONS[direction])))
+                continue
+            match = FILTER_PATTERN.match(text)
+            if match is None:
+                raise ValueError(f"필터 형식이 올바르지 않습니다: {token} (예: rsi<30, change>5, cross200up)")
+            filters.append((self._resolve(match.group(1)), match.group(2), float(match.group(3))))
+        return filters
+
+    def _rows(self, name, op, value):
+        """조건에 맞는 행 번호 (정렬된 열에서 범위만 찾음)"""
+        order, values = self._order[name], self._sorted[name][:self._valid[name]]
+        if op == '!=':
+            return np.concatenate([self._rows(name, '<', value), self._rows(name, '>', value)])
+        left = int(np.searchsorted(values, value, side='left'))
+        right = int(np.searchsorted(values, value, side='right'))
+        start, stop = {
+            '<': (0, left),
+            '<=': (0, right),
+            '>': (right, len(values)),
+            '>=': (left, len(values)),
+            '=': (left, right),
+        }[op]
+        return order[start:stop]
+
+    def query(self, filters, limit=None):
+        """모든 필터를 만족하는 행 번호 목록과 전체 개수 (첫 필터의 열 기준으로 '<'면 작은 순, 아니면 큰 순 정렬)"""
+        mask = np.ones(len(self.tickers), dtype=bool)
+        for name, op, value in filters:
+            selected = np.zeros(len(self.tickers), dtype=bool)
+            selected[self._rows(name, op, value)] = True
+            mask &= selected
+        rows = np.flatnonzero(mask)
+        total = len(rows)
+
+        sort_name, sort_op = (filters[0][0], filters[0][1]) if filters else ('change', '>')
+        if sort_name.startswith('cross'):
+            sort_name, sort_op = 'change', '>'
+        ranks = self._rank[sort_name][rows]
+        rows = rows[np.argsort(ranks if sort_op in ('<', '<=') else -ranks, kind='stable')]
+        return (rows if limit is None else rows[:limit]), total
+
+    def row(self, position):
+        """행 하나를 {열 이름: 값}으로 (티커 포함)"""
+        values = {name: float(column[position]) for name, column in self.columns.items()}
+        values['ticker'] = str(self.tickers[position])
+        return values
+
+    def save(self, path):
+        """표를 npz 파일로 저장 (정렬된 인덱스는 불러올 때 다시 만듦)"""
+        tmp_path = path + '.tmp.npz'
+        np.savez(tmp_path, _date=np.asarray(self.date.isoformat()), _tickers=self.tickers,
+                 _meta=np.asarray([self.rsi_period, self.built_at]), **self.columns)
+        os.replace(tmp_path, path)
+
+    @classmethod
+    def load(cls, path):
+        with np.load(path, allow_pickle=False) as stored:
+            rsi_period, built_at = stored['_meta']
+            columns = {name: stored[name] for name in stored.files if not name.startswith('_')}
+            return cls(pd.Timestamp(str(stored['_date'])), stored['_tickers'], columns,
+                       rsi_period=int(rsi_period), built_at=float(built_at))
+
+
+def build_table(frames, windows=(20, 50, 100, 200), rsi_period=14):
+    """{티커: 일봉}으로 가장 최근 거래일 기준 표를 만듦 (마지막 봉이 그 날짜가 아닌 티커는 제외)"""
+    if not frames:
+        return None
+    last_dates = {ticker: data.index[-1].normalize().tz_localize(None) for ticker, data in frames.items()}
+    date = max(last_dates.values())
+    tickers = sorted(ticker for ticker, last in last_dates.items() if last == date)
+    skipped = len(frames) - len(tickers)
+    if skipped:
+        logging.info(f'Screener skipped {skipped} tickers without a {date.date()} bar')
+
+    # 이동평균선 최대 기간 + 직전 봉까지만 있으면 되므로 최근 봉만 모아 계산
+    bars = max(max(windows), rsi_period + 1) + 1
+    closes = indicators.close_matrix({ticker: frames[ticker].iloc[-bars:] for ticker in tickers}, tickers)
+    volumes = np.array([float(frames[ticker]['Volume'].iloc[-1]) if 'Volume' in frames[ticker] else np.nan
+                        for ticker in tickers])
+    names = [f'sma{window}' for window in windows] + [f'rsi{rsi_period}']
+    values = indicators.compute(closes, names)
+
+    latest, previous = closes[:, -1], closes[:, -2] if closes.shape[1] > 1 else np.full(len(tickers), np.nan)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        change = (latest - previous) / previous * 100
+    columns = {'close': latest, 'change': change, 'volume': volumes}
+    for name in names:
+        columns[name] = values[name][:, -1]
+    for window in windows:
+        # 마지막 봉에서 종가가 이동평균선을 상향 돌파하면 1, 하향 돌파하면 -1
+        columns[f'cross{window}'] = indicators.cross_direction(closes[:, -2:], values[f'sma{window}'][:, -2:])[:, -1]
+    return ScreenerTable(date, tickers, columns, rsi_period=rsi_period)
+
+
+def format_row(row, windows=(20, 50, 100, 200), rsi_period=14):
+    """'**NVDA** 종가 123.45 (+5.12%) RSI 28.3 200MA 상향 돌파'"""
+    message = f"**{row['ticker']}** 종가 {row['close']:.2f} ({row['change']:+.2f}%)"
+    rsi = row.get(f'rsi{rsi_period}', np.nan)
+    if not np.isnan(rsi):
+        message += f" RSI {rsi:.1f}"
+    crosses = [f"{window}MA {'상향' if row[f'cross{window}'] > 0 else '하향'} 돌파"
+               for window in windows if row.get(f'cross{window}', 0)]
+    if crosses:
+        message += ' ' + ', '.join(crosses)
+    return message
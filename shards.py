@@ -0,0 +1,295 @@
+# 티커 해시로 정한 샤드 워커 프로세스에서 시세 조회/지표/차트 작업을 실행 (같은 티커는 항상 같은 샤드)
+import os
+import zlib
+import queue
+import asyncio
+import logging
+import itertools
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from logging.handlers import QueueHandler, QueueListener
+
+import reports
+from chart_renderer import ChartRenderer
+from data_provider import make_provider
+from executor import process_context
+from indicator_state import IndicatorStateStore
+from price_cache import PriceCache
+from ratelimit import TokenBucket
+from signal_rules import WATCHLIST, RuleEngine, load_rules
+from upstream import UpstreamClient
+
+
+JOB_KINDS = ('watchlist', 'prices', 'news', 'refresh', 'compact', 'upstream_stats')
+
+
+class ShardError(RuntimeError):
+    """샤드 워커에서 작업이 실패함 (워커의 예외 메시지를 담음)"""
+
+
+def shard_of(ticker, shards):
+    """티커를 맡을 샤드 번호 (프로세스를 다시 시작해도 같은 값)"""
+    return zlib.crc32(ticker.upper().encode('utf-8')) % shards
+
+
+def shard_path(path, shard):
+    """'indicator_state.json' -> 'indicator_state.shard0.json'"""
+    root, ext = os.path.splitext(path)
+    return f'{root}.shard{shard}{ext}'
+
+
+class ShardWorker:
+    """워커 프로세스 안에서 작업을 처리 (샤드 전용 가격 캐시, 지표 상태, 차트 템플릿 사용)"""
+
+    def __init__(self, shard, shards, config):
+        self.shard = shard
+        self.batch_size = config['batch_size']
+        windows = tuple(config['windows'])
+        rsi_period = config['rsi_period']
+        # Yahoo 속도 제한(yahoo_rate는 샤드 전체 몫)과 캐시 크기 상한은 샤드 수로 나누어 전체 합이 설정 값을 넘지 않게 함
+        self.price_cache = PriceCache(
+            os.path.join(config['price_cache_dir'], f'shard{shard}'), max_age=config['price_cache_max_age'],
+            max_bytes=config['price_cache_max_bytes'] // shards, max_concurrency=config['fetch_concurrency'],
+            float_dtype=config['price_cache_float_dtype'],
+            rate_limiter=TokenBucket(config['yahoo_rate'] / shards, config['yahoo_burst']),
+            provider=UpstreamClient(make_provider(config['provider']), **config['upstream']),
+        )
+        self.indicator_state = IndicatorStateStore(shard_path(config['indicator_state_file'], shard),
+                                                   windows=windows, rsi_period=rsi_period)
+        self.chart_renderer = ChartRenderer(config['chart_cache_dir'], windows=windows, max_workers=0,
+                                            max_files=config['chart_cache_max_files'])
+        self.watchlist_rules = RuleEngine(rule for rule in load_rules(config['signal_rules_file']) if rule.tickers == WATCHLIST)
+        self.state_indicators = {'close', f'rsi{rsi_period}'} | {f'sma{window}' for window in windows}
+        self._news_pool = ThreadPoolExecutor(max_workers=config['news_concurrency'], thread_name_prefix='shard-news')
+
+    def watchlist(self, tickers, period='2Y'):
+        """{티커: (메시지, 차트 PNG 바이트 또는 None)} (데이터가 없거나 실패한 티커는 빠짐)"""
+        prices = self.price_cache.get_many(tickers, period=period, chunk_size=self.batch_size)
+        snapshots = {ticker: self.indicator_state.update(ticker, prices[ticker]) for ticker in tickers if not prices[ticker].empty}
+        signals = reports.evaluate_watchlist_signals(self.watchlist_rules, list(snapshots), prices, snapshots, self.state_indicators)
+        results = {}
+        for ticker in tickers:
+            try:
+                report = reports.watchlist_report(ticker, prices[ticker], snapshots.get(ticker), signals.get(ticker, []),
+                                                  self.indicator_state, self.watchlist_rules, self.state_indicators)
+                if report is None:
+                    continue
+                message, send_chart_flag = report
+                png = self.chart_renderer.render_sync(ticker, prices[ticker]).getvalue() if send_chart_flag else None
+                results[ticker] = (message, png)
+            except Exception as e:
+                logging.error(f"Error processing ticker {ticker}: {e}")
+        self.indicator_state.save()
+        return results
+
+    def prices(self, tickers, period='5d'):
+        """{티커: 종가 메시지} (실패한 티커는 오류 메시지)"""
+        prices = self.price_cache.get_many(tickers, period=period, chunk_size=self.batch_size)
+        results = {}
+        for ticker in tickers:
+            try:
+                results[ticker] = reports.format_stock_price_message(ticker, prices[ticker])
+            except Exception as e:
+                logging.error(f"Error getting stock price for ticker {ticker}: {e}")
+                results[ticker] = reports.stock_price_error_message(ticker, e)
+        return results
+
+    def news(self, tickers):
+        """{티커: 뉴스 목록} (실패한 티커는 빈 목록)"""
+        def fetch(ticker):
+            try:
+                return self.price_cache.provider.news(ticker)
+            except Exception as e:
+                logging.error(f"Error fetching news for ticker {ticker}: {e}")
+                return []
+        return dict(zip(tickers, self._news_pool.map(fetch, tickers)))
+
+    def refresh(self, tickers, period='2Y'):
+        """샤드 가격 캐시를 미리 갱신하고 {티커: 봉 수} 반환 (이어지는 관심종목/종가 작업은 캐시에서 읽음)"""
+        prices = self.price_cache.get_many(tickers, period=period, chunk_size=self.batch_size)
+        return {ticker: len(data) for ticker, data in prices.items()}
+
+    def upstream_stats(self, tickers=()):
+        """이 샤드의 외부 데이터 요청 상태 (upstream.UpstreamClient.stats)"""
+        return self.price_cache.provider.stats()
+
+    def compact(self, tickers=()):
+        """샤드 가격 캐시의 아카이브 정리, 정리한 항목 수 반환"""
+        return self.price_cache.compact()
+
+
+def _worker_main(shard, shards, config, jobs, results, log_queue):
+    # 로그는 게이트웨이로 보내 한 파일(bot.log)에 기록하고 주고받은 데이터 양도 함께 집계
+    logger = logging.getLogger()
+    for handler in list(logger.handlers):
+        logger.removeHandler(handler)
+    logger.addHandler(QueueHandler(log_queue))
+    logger.setLevel(logging.INFO)
+
+    worker = ShardWorker(shard, shards, config)
+    logging.info(f'Shard worker {shard}/{shards} started (pid {os.getpid()})')
+    while True:
+        item = jobs.get()
+        if item is None:
+            break
+        job_id, kind, tickers, kwargs = item
+        try:
+            if kind not in JOB_KINDS:
+                raise ValueError(f'Unknown shard job kind: {kind}')
+            results.put((job_id, True, getattr(worker, kind)(tickers, **kwargs)))
+        except Exception as e:
+            logging.error(f'Shard {shard} {kind} job failed: {e}')
+            results.put((job_id, False, f'{type(e).__name__}: {e}'))
+
+
+def _resolve(future, ok, value):
+    if future.done():
+        return
+    if ok:
+        future.set_result(value)
+    else:
+        future.set_exception(ShardError(value))
+
+
+class ShardPool:
+    """샤드 워커 프로세스들과 작업/결과 대기열 (게이트웨이 프로세스에서 사용, config 키는 start_shard_pool 참고)"""
+
+    def __init__(self, shards, config, log_handlers=(), timeout=600, check_interval=1.0):
+        self.shards = shards
+        self.config = dict(config)
+        self.timeout = timeout  # 샤드 작업 하나당 제한 시간(초)
+        self.check_interval = check_interval  # 워커가 종료되었는지 확인하는 간격(초)
+        # 스레드가 있는 게이트웨이에서 fork하지 않도록 forkserver(없으면 spawn)로 시작
+        self._context = process_context()
+        self._log_queue = self._context.Queue()
+        self._log_listener = QueueListener(self._log_queue, *log_handlers, respect_handler_level=True)
+        self._results = self._context.Queue()
+        self._jobs = [None] * shards
+        self._processes = [None] * shards
+        self._pending = {}  # 작업 ID -> (샤드, 이벤트 루프, future)
+        self._ids = itertools.count()
+        self._lock = threading.Lock()
+        self._spawn_lock = threading.Lock()
+        self._reader = None
+        self._closing = False
+        self.completed = 0
+        self.failed = 0
+        self.restarts = 0
+
+    def start(self):
+        self._log_listener.start()
+        for shard in range(self.shards):
+            self._spawn(shard)
+        self._reader = threading.Thread(target=self._read_results, name='shard-results', daemon=True)
+        self._reader.start()
+        logging.info(f'Started {self.shards} shard workers')
+
+    def _spawn(self, shard):
+        jobs = self._context.Queue()
+        process = self._context.Process(target=_worker_main, name=f'shard-{shard}', daemon=True,
+                                        args=(shard, self.shards, self.config, jobs, self._results, self._log_queue))
+        process.start()
+        self._jobs[shard] = jobs
+        self._processes[shard] = process
+
+    def _read_results(self):
+        """결과 대기열을 읽어 기다리는 코루틴의 future를 완료하고, 종료된 워커를 확인 (별도 스레드)"""
+        while True:
+            try:
+                item = self._results.get(timeout=self.check_interval)
+            except queue.Empty:
+                item = ()
+            if item is None:
+                break
+            if item:
+                job_id, ok, value = item
+                with self._lock:
+                    pending = self._pending.pop(job_id, None)
+                    if ok:
+                        self.completed += 1
+                    else:
+                        self.failed += 1
+                if pending is not None:  # 없으면 제한 시간이 지났거나 워커 종료로 이미 실패 처리한 작업
+                    _, loop, future = pending
+                    loop.call_soon_threadsafe(_resolve, future, ok, value)
+            for shard in range(self.shards):
+                self._restart_if_dead(shard)
+
+    def _restart_if_dead(self, shard):
+        """워커가 종료되었으면 그 샤드에서 기다리던 작업을 바로 실패 처리하고 다시 시작"""
+        with self._spawn_lock:
+            process = self._processes[shard]
+            if self._closing or process is None or process.is_alive():
+                return
+            logging.error(f'Shard worker {shard} exited with code {process.exitcode}, restarting')
+            with self._lock:
+                lost = [job_id for job_id, (owner, _, _) in self._pending.items() if owner == shard]
+                lost = [self._pending.pop(job_id) for job_id in lost]
+                self.failed += len(lost)
+                self.restarts += 1
+            self._spawn(shard)
+        for _, loop, future in lost:
+            loop.call_soon_threadsafe(_resolve, future, False, f'shard {shard} worker exited with code {process.exitcode}')
+
+    async def submit(self, shard, kind, tickers, **kwargs):
+        """샤드 하나에 작업을 보내고 결과를 기다림 (워커가 종료되어 있으면 다시 시작)"""
+        self._restart_if_dead(shard)
+        loop = asyncio.get_running_loop()
+        future = loop.create_future()
+        job_id = next(self._ids)
+        with self._lock:
+            self._pending[job_id] = (shard, loop, future)
+        self._jobs[shard].put((job_id, kind, list(tickers), kwargs))
+        try:
+            return await asyncio.wait_for(future, self.timeout)
+        finally:
+            with self._lock:
+                self._pending.pop(job_id, None)
+
+    async def map(self, kind, tickers, **kwargs):
+        """티커를 샤드별로 나누어 동시에 실행하고 {티커: 결과}를 합쳐 반환 (실패한 샤드의 티커는 빠짐)"""
+        groups = {}
+        for ticker in tickers:
+            groups.setdefault(shard_of(ticker, self.shards), []).append(ticker)
+        outcomes = await asyncio.gather(*(self.submit(shard, kind, group, **kwargs) for shard, group in groups.items()),
+                                        return_exceptions=True)
+        merged = {}
+        for (shard, group), outcome in zip(groups.items(), outcomes):
+            if isinstance(outcome, BaseException):
+                logging.error(f'Shard {shard} {kind} job for {len(group)} tickers failed: {outcome!r}')
+                continue
+            merged.update(outcome)
+        return merged
+
+    async def broadcast(self, kind, **kwargs):
+        """모든 샤드에 같은 작업을 보내고 샤드 순서대로 결과 목록 반환 (실패한 샤드는 None)"""
+        outcomes = await asyncio.gather(*(self.submit(shard, kind, [], **kwargs) for shard in range(self.shards)),
+                                        return_exceptions=True)
+        for shard, outcome in enumerate(outcomes):
+            if isinstance(outcome, BaseException):
+                logging.error(f'Shard {shard} {kind} job failed: {outcome!r}')
+        return [None if isinstance(outcome, BaseException) else outcome for outcome in outcomes]
+
+    def stats(self):
+        with self._lock:
+            return {
+                'shards': self.shards,
+                'alive': sum(1 for process in self._processes if process is not None and process.is_alive()),
+                'pending': len(self._pending),
+                'completed': self.completed,
+                'failed': self.failed,
+                'restarts': self.restarts,
+            }
+
+    def shutdown(self):
+        self._closing = True
+        for jobs in self._jobs:
+            if jobs is not None:
+                jobs.put(None)
+        for process in self._processes:
+            if process is not None:
+                process.join(timeout=5)
+                if process.is_alive():
+                    process.terminate()
+        self._results.put(None)
+        self._log_listener.stop()
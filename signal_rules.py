@@ -0,0 +1,128 @@
+import json
+from collections import namedtuple
+
+import numpy as np
+
+import indicators
+
+
+# 규칙의 tickers에 이 값을 쓰면 현재 관심종목 전체에 적용
+WATCHLIST = 'watchlist'
+
+RULE_KINDS = ('cross', 'change', 'below', 'above')
+
+# direction: 1은 상향 돌파/상승/매수, -1은 하향 돌파/하락/매도
+Signal = namedtuple('Signal', ['rule', 'ticker', 'direction'])
+
+
+class Rule:
+    """신호 규칙 하나 (kind: 'cross' 돌파, 'change' 전일 대비 변화율(%) 임계값, 'below'/'above' 최신 값 비교)"""
+
+    def __init__(self, name, tickers, kind, series='close', line=None, threshold=None, label=None):
+        if kind not in RULE_KINDS:
+            raise ValueError(f"지원하지 않는 규칙 종류입니다: {kind}")
+        if kind == 'cross' and line is None:
+            raise ValueError(f"cross 규칙에는 line이 필요합니다: {name}")
+        if kind != 'cross' and threshold is None:
+            raise ValueError(f"{kind} 규칙에는 threshold가 필요합니다: {name}")
+        self.name = name
+        self.tickers = tickers if tickers == WATCHLIST else [ticker.upper() for ticker in tickers]
+        self.kind = kind
+        self.series = series
+        self.line = line
+        self.threshold = threshold
+        self.label = label or name
+
+    @property
+    def key(self):
+        """같은 계산을 공유하는 규칙끼리 묶기 위한 키"""
+        return self.kind, self.series, self.line, self.threshold
+
+    def applies_to(self, ticker, watchlist):
+        return ticker in watchlist if self.tickers == WATCHLIST else ticker in self.tickers
+
+
+def load_rules(path):
+    """JSON 설정 파일에서 규칙 목록을 읽음"""
+    with open(path, 'r', encoding='utf-8') as f:
+        return [Rule(**item) for item in json.load(f)]
+
+
+def snapshot_values(snapshots, tickers, names):
+    """지표 상태 스냅샷을 (티커 수 x 2) 배열(이전 봉, 최신 봉)로 변환하여 규칙 평가에 사용"""
+    values = {}
+    for name in names:
+        array = np.full((len(tickers), 2), np.nan)
+        for row, ticker in enumerate(tickers):
+            snapshot = snapshots.get(ticker)
+            if snapshot is not None:
+                array[row] = snapshot.get(f'prev_{name}', np.nan), snapshot[name]
+        values[name] = array
+    return values
+
+
+def signal_directions(kind, series, line, threshold, values):
+    """values({지표 이름: (티커 수 x 봉 수) 배열})의 모든 봉에 대한 신호 방향 (1, -1, 0) 배열"""
+    current = values[series]
+    if kind == 'cross':
+        return indicators.cross_direction(current, values[line])
+    if kind == 'change':
+        change = np.zeros(current.shape)
+        with np.errstate(divide='ignore', invalid='ignore'):
+            change[:, 1:] = (current[:, 1:] - current[:, :-1]) / current[:, :-1] * 100
+        return np.where(np.abs(change) >= threshold, np.sign(change), 0).astype(np.int8)
+    if kind == 'below':
+        return np.where(current < threshold, 1, 0).astype(np.int8)
+    return np.where(current > threshold, -1, 0).astype(np.int8)
+
+
+class RuleEngine:
+    """규칙을 한 번 컴파일해두고 전체 티커에 대해 한꺼번에 평가"""
+
+    def __init__(self, rules):
+        self.rules = list(rules)
+        # 같은 계산(종류, 시리즈, 기준선, 임계값)을 쓰는 규칙끼리 묶어 계산은 한 번만 수행
+        self._groups = {}
+        for rule in self.rules:
+            self._groups.setdefault(rule.key, []).append(rule)
+
+    def indicator_names(self):
+        """규칙 평가에 필요한 지표 이름"""
+        names = set()
+        for rule in self.rules:
+            names.add(rule.series)
+            if rule.line is not None:
+                names.add(rule.line)
+        return names
+
+    def tickers(self, watchlist=()):
+        """규칙이 적용되는 티커 목록 (설정 파일 순서 유지)"""
+        tickers = []
+        for rule in self.rules:
+            tickers.extend(watchlist if rule.tickers == WATCHLIST else rule.tickers)
+        return list(dict.fromkeys(tickers))
+
+    def rules_for(self, ticker, watchlist=()):
+        return [rule for rule in self.rules if rule.applies_to(ticker, watchlist)]
+
+    @staticmethod
+    def _directions(kind, series, line, threshold, values):
+        """규칙 종류별로 전체 티커의 최신 봉 신호 방향을 한 번에 계산"""
+        recent = {name: array[:, -2:] for name, array in values.items()}
+        return signal_directions(kind, series, line, threshold, recent)[:, -1]
+
+    def evaluate(self, tickers, values, watchlist=()):
+        """values({지표 이름: (티커 수 x 봉 수) 배열})로 모든 규칙을 평가하여 {티커: [Signal]} 반환"""
+        results = {ticker: [] for ticker in tickers}
+        for (kind, series, line, threshold), rules in self._groups.items():
+            directions = self._directions(kind, series, line, threshold, values)
+            for row in np.nonzero(directions)[0]:
+                ticker = tickers[row]
+                for rule in rules:
+                    if rule.applies_to(ticker, watchlist):
+                        results[ticker].append(Signal(rule, ticker, int(directions[row])))
+        # 한 티커의 신호는 설정 파일의 규칙 순서대로 정렬
+        order = {id(rule): position for position, rule in enumerate(self.rules)}
+        for signals in results.values():
+            signals.sort(key=lambda signal: order[id(signal.rule)])
+        return results
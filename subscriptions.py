@@ -0,0 +1,121 @@
+import os
+import time
+import sqlite3
+import logging
+import threading
+
+
+CHANNEL_SUBSCRIBER = 0  # user_id가 0이면 채널 전체의 관심종목, 아니면 채널 안에서 그 사용자의 관심종목
+
+
+class SubscriptionStore:
+    """서버/채널/사용자별 관심종목 구독을 (티커, 채널, 사용자) 기본 키로 SQLite에 기록하는 저장소"""
+
+    def __init__(self, path='subscriptions.db'):
+        self.path = path
+        self._lock = threading.Lock()
+        self.conn = sqlite3.connect(path, check_same_thread=False)
+        with self._lock, self.conn:
+            self.conn.execute('PRAGMA journal_mode=WAL')
+            self.conn.execute('PRAGMA synchronous=NORMAL')
+            self.conn.execute(
+                'CREATE TABLE IF NOT EXISTS subscriptions ('
+                'ticker TEXT NOT NULL, channel_id INTEGER NOT NULL, user_id INTEGER NOT NULL, '
+                'guild_id INTEGER NOT NULL, added_at REAL NOT NULL, '
+                'PRIMARY KEY (ticker, channel_id, user_id)) WITHOUT ROWID'
+            )
+            # 채널/사용자별 목록 조회용 (추가한 순서로 정렬)
+            self.conn.execute(
+                'CREATE INDEX IF NOT EXISTS subscriptions_channel ON subscriptions (channel_id, user_id, added_at)'
+            )
+
+    def migrate_legacy(self, legacy_file, channel_id):
+        """기존 watchlist.txt의 티커를 이전 단일 채널의 관심종목으로 옮기고 파일 이름을 바꿔 다시 읽지 않도록 함
+        (파일이 없으면 아무것도 하지 않음)"""
+        if not os.path.exists(legacy_file):
+            return
+        try:
+            with open(legacy_file, 'r', encoding='utf-8') as f:
+                tickers = [line.strip().upper() for line in f if line.strip()]
+        except OSError as e:
+            logging.error(f"Failed to read legacy watchlist file {legacy_file}: {e}")
+            return
+        # 파일 순서를 유지하도록 추가 시각을 조금씩 늘림 (서버 ID는 알 수 없으므로 0)
+        now = time.time()
+        rows = [(ticker, channel_id, CHANNEL_SUBSCRIBER, 0, now + index * 1e-6) for index, ticker in enumerate(tickers)]
+        with self._lock, self.conn:
+            self.conn.executemany(
+                'INSERT OR IGNORE INTO subscriptions (ticker, channel_id, user_id, guild_id, added_at) VALUES (?, ?, ?, ?, ?)',
+                rows,
+            )
+        os.replace(legacy_file, legacy_file + '.migrated')
+        logging.info(f'Migrated {len(tickers)} watchlist tickers from {legacy_file} to channel {channel_id}')
+
+    def add(self, ticker, channel_id, guild_id=0, user_id=CHANNEL_SUBSCRIBER):
+        """구독 추가, 이미 있으면 False"""
+        with self._lock, self.conn:
+            cursor = self.conn.execute(
+                'INSERT OR IGNORE INTO subscriptions (ticker, channel_id, user_id, guild_id, added_at) VALUES (?, ?, ?, ?, ?)',
+                (ticker.upper(), channel_id, user_id, guild_id or 0, time.time()),
+            )
+        return cursor.rowcount > 0
+
+    def remove(self, ticker, channel_id, user_id=CHANNEL_SUBSCRIBER):
+        """구독 제거, 없었으면 False"""
+        with self._lock, self.conn:
+            cursor = self.conn.execute(
+                'DELETE FROM subscriptions WHERE ticker = ? AND channel_id = ? AND user_id = ?',
+                (ticker.upper(), channel_id, user_id),
+            )
+        return cursor.rowcount > 0
+
+    def tickers_for(self, channel_id, user_id=CHANNEL_SUBSCRIBER):
+        """채널(또는 채널 안 사용자)의 관심종목 (추가한 순서), user_id가 None이면 채널 안의 모든 구독"""
+        with self._lock:
+            if user_id is None:
+                rows = self.conn.execute(
+                    'SELECT ticker FROM subscriptions WHERE channel_id = ? GROUP BY ticker ORDER BY MIN(added_at)',
+                    (channel_id,),
+                ).fetchall()
+            else:
+                rows = self.conn.execute(
+                    'SELECT ticker FROM subscriptions WHERE channel_id = ? AND user_id = ? ORDER BY added_at',
+                    (channel_id, user_id),
+                ).fetchall()
+        return [ticker for ticker, in rows]
+
+    def subscribers(self, ticker):
+        """티커를 구독한 (채널, 사용자) 목록"""
+        with self._lock:
+            return self.conn.execute(
+                'SELECT channel_id, user_id FROM subscriptions WHERE ticker = ?', (ticker.upper(),)
+            ).fetchall()
+
+    def plan(self):
+        """전송 계획 {채널 ID: {티커: [개인 구독자 ID]}} (채널마다 티커는 한 번, 채널 관심종목만 있으면 빈 목록)"""
+        with self._lock:
+            rows = self.conn.execute(
+                'SELECT channel_id, ticker, user_id FROM subscriptions ORDER BY channel_id, added_at'
+            ).fetchall()
+        plan = {}
+        for channel_id, ticker, user_id in rows:
+            users = plan.setdefault(channel_id, {}).setdefault(ticker, [])
+            if user_id != CHANNEL_SUBSCRIBER:
+                users.append(user_id)
+        return plan
+
+    def stats(self):
+        with self._lock:
+            subscriptions, tickers, channels = self.conn.execute(
+                'SELECT COUNT(*), COUNT(DISTINCT ticker), COUNT(DISTINCT channel_id) FROM subscriptions'
+            ).fetchone()
+        return {'subscriptions': subscriptions, 'tickers': tickers, 'channels': channels}
+
+    def close(self):
+        with self._lock:
+            self.conn.close()
+
+
+def plan_tickers(plan):
+    """전송 계획에 포함된 모든 티커 (중복 없이, 처음 나온 순서)"""
+    return list(dict.fromkeys(ticker for tickers in plan.values() for ticker in tickers))
@@ -0,0 +1,47 @@
+import numpy as np
+import pytest
+
+import backtest
+import indicators
+from signal_rules import WATCHLIST, Rule
+
+
+@pytest.fixture
+def closes():
+    return 100 * np.cumprod(1 + np.random.default_rng(0).normal(0, 0.02, (20, 400)), axis=1)
+
+
+TICKERS = [f'T{i}' for i in range(20)]
+
+
+def test_forward_fill_and_drawdown():
+    filled = backtest.forward_fill(np.array([[np.nan, 1.0, np.nan, 0.0, np.nan]]))
+    np.testing.assert_array_equal(filled, [[np.nan, 1.0, 1.0, 0.0, 0.0]])
+    np.testing.assert_allclose(backtest.max_drawdown(np.array([[1.0, 2.0, 1.0, 3.0]])), [-0.5])
+
+
+def test_rules_only_apply_to_their_tickers(closes):
+    rules = [Rule('T0 20MA', ['T0'], 'cross', line='sma20'), Rule('관심종목 20MA', WATCHLIST, 'cross', line='sma20')]
+    results = backtest.run_backtest(closes, TICKERS, rules, watchlist=TICKERS[:5])
+    assert [(result['rule'], result['tickers']) for result in results] == [('T0 20MA', 1), ('관심종목 20MA', 5)]
+
+
+def test_signal_counts_and_hit_rate_match_indicator(closes):
+    rule = Rule('RSI 과매도', WATCHLIST, 'below', series='rsi14', threshold=30)
+    result = backtest.run_backtest(closes, TICKERS, [rule], horizon=10)[0]
+
+    signals = indicators.rsi(closes, 14) < 30
+    forward = backtest.forward_returns(closes, 10)
+    evaluated = signals & ~np.isnan(forward)
+    assert result['signals'] == signals.sum() and result['evaluated'] == evaluated.sum()
+    assert result['hit_rate'] == pytest.approx((forward[evaluated] > 0).mean())
+
+
+def test_pool_is_reused_and_matches_single_process(closes):
+    rules = backtest.grid_rules(rsi_periods=(7, 14))
+    pool = backtest.BacktestPool(2)
+    try:
+        for data in (closes, closes[::-1] * 1.5):
+            assert backtest.run_backtest(data, TICKERS, rules, pool=pool) == backtest.run_backtest(data, TICKERS, rules)
+    finally:
+        pool.shutdown()
@@ -0,0 +1,59 @@
+import os
+import asyncio
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from chart_renderer import ChartRenderer
+
+
+PNG = b'\x89PNG'
+
+
+def prices(closes):
+    index = pd.date_range(end='2026-10-16', periods=len(closes), freq='B')
+    return pd.DataFrame({'Close': closes}, index=index)
+
+
+@pytest.fixture
+def renderer(tmp_path):
+    return ChartRenderer(str(tmp_path / 'charts'), windows=(5, 20), max_workers=0, max_files=2)
+
+
+def test_same_chart_is_served_from_cache(renderer):
+    data = prices(np.linspace(100, 120, 60))
+    first = renderer.render_sync('A', data).getvalue()
+    assert first.startswith(PNG)
+    assert renderer.render_sync('A', data).getvalue() == first
+    assert renderer.stats() == {'hits': 1, 'misses': 1}
+
+
+def test_updated_last_bar_renders_again(renderer):
+    closes = np.linspace(100, 120, 60)
+    renderer.render_sync('A', prices(closes))
+    closes[-1] += 1  # 장중에 마지막 봉 종가가 바뀜
+    renderer.render_sync('A', prices(closes))
+    assert renderer.stats() == {'hits': 0, 'misses': 2}
+
+
+def test_cache_keeps_at_most_max_files(renderer):
+    for ticker in ('A', 'B', 'C'):
+        renderer.render_sync(ticker, prices(np.linspace(100, 120, 30)))
+    assert len([name for name in os.listdir(renderer.cache_dir) if name.endswith('.png')]) == 2
+
+
+def test_worker_pool_renders_charts(tmp_path):
+    renderer = ChartRenderer(str(tmp_path / 'charts'), windows=(5,), max_workers=1)
+    data = prices(np.linspace(100, 120, 30))
+
+    async def scenario():
+        await renderer.warm()
+        return (await renderer.render('A', data)).getvalue(), (await renderer.render('A', data)).getvalue()
+
+    try:
+        first, second = asyncio.run(scenario())
+    finally:
+        renderer.shutdown()
+    assert first.startswith(PNG) and second == first
+    assert renderer.stats() == {'hits': 1, 'misses': 1}
@@ -0,0 +1,55 @@
+import time
+import asyncio
+
+import pytest
+
+import Discord_Stock as bot
+from news_store import SentNewsStore
+from outbound import Outbound
+
+
+class FakeChannel:
+    def __init__(self, channel_id, failing=False):
+        self.id = channel_id
+        self.failing = failing
+        self.texts = []
+
+    async def send(self, content=None, **kwargs):
+        if self.failing:
+            raise RuntimeError('send failed')
+        self.texts.append(content)
+
+
+@pytest.fixture
+def channels(tmp_path, monkeypatch):
+    channels = {1: FakeChannel(1), 2: FakeChannel(2, failing=True)}
+    store = SentNewsStore(str(tmp_path / 'sent_news.db'))
+    monkeypatch.setattr(bot, 'sent_news', store)
+    monkeypatch.setattr(bot, 'outbound', Outbound(rate=1e9, burst=10 ** 9))
+    monkeypatch.setattr(bot.bot, 'get_channel', channels.get)
+    yield channels
+    store.close()
+
+
+NOW = int(time.time())
+PUBLISHED = {'https://a': NOW - 300, 'https://b': NOW - 200, 'https://c': NOW - 100}
+
+
+def news(*links):
+    return [{'link': link, 'title': link, 'providerPublishTime': PUBLISHED[link]} for link in links]
+
+
+def test_failed_channel_gets_only_its_missed_articles(channels):
+    plan = {1: {'NVDA': []}, 2: {'NVDA': [], 'AAPL': []}}
+    asyncio.run(bot.check_news(plan, [news('https://a', 'https://b'), []]))
+    assert len(channels[1].texts) == 1 and 'https://b' in channels[1].texts[0]
+
+    # 다음 실행에서는 새 기사와 함께 실패했던 채널에만 지난 기사를 다시 보냄
+    channels[2].failing = False
+    asyncio.run(bot.check_news(plan, [news('https://c', 'https://a', 'https://b'), []]))
+    assert 'https://a' not in channels[1].texts[1] and 'https://c' in channels[1].texts[1]
+    assert all(link in channels[2].texts[0] for link in ('https://a', 'https://b', 'https://c'))
+
+    asyncio.run(bot.check_news(plan, [news('https://c', 'https://a', 'https://b'), []]))
+    assert len(channels[1].texts) == 2 and len(channels[2].texts) == 1
+    assert bot.sent_news.retries() == {}
@@ -0,0 +1,97 @@
+import asyncio
+from datetime import datetime
+
+import pytest
+
+import command_cache
+from command_cache import CommandCache
+from market_hours import MARKET_TZ
+
+
+def at(*args):
+    return datetime(*args, tzinfo=MARKET_TZ)
+
+
+def test_second_call_is_served_from_cache():
+    calls = []
+
+    async def factory():
+        calls.append(1)
+        return 'result'
+
+    async def run():
+        cache = CommandCache()
+        return [await cache.get_or_compute('k', factory) for _ in range(2)], cache
+
+    results, cache = asyncio.run(run())
+    assert results == ['result', 'result']
+    assert len(calls) == 1 and cache.hits == 1
+
+
+def test_concurrent_requests_share_one_computation():
+    calls = []
+
+    async def factory():
+        calls.append(1)
+        await asyncio.sleep(0.01)
+        return 'result'
+
+    async def run():
+        cache = CommandCache()
+        results = await asyncio.gather(*(cache.get_or_compute('k', factory) for _ in range(5)))
+        return results, cache
+
+    results, cache = asyncio.run(run())
+    assert results == ['result'] * 5
+    assert len(calls) == 1 and cache.coalesced == 4
+
+
+def test_errors_are_not_cached():
+    async def failing():
+        raise LookupError('no data')
+
+    async def run():
+        cache = CommandCache()
+        with pytest.raises(LookupError):
+            await cache.get_or_compute('k', failing)
+        return cache
+
+    cache = asyncio.run(run())
+    assert cache.entries == {} and cache.inflight == {}
+
+
+def test_cancelled_owner_does_not_leave_waiters_hanging():
+    async def run():
+        cache = CommandCache()
+        started = asyncio.Event()
+
+        async def slow():
+            started.set()
+            await asyncio.sleep(10)
+
+        async def quick():
+            return 'recomputed'
+
+        owner = asyncio.create_task(cache.get_or_compute('k', slow))
+        await started.wait()
+        waiter = asyncio.create_task(cache.get_or_compute('k', quick))
+        await asyncio.sleep(0)
+        owner.cancel()
+        return await asyncio.wait_for(waiter, 1), cache
+
+    result, cache = asyncio.run(run())
+    assert result == 'recomputed'
+    assert cache.inflight == {}
+
+
+@pytest.mark.parametrize('now, started, long_ttl', [
+    (at(2026, 10, 14, 11, 0), at(2026, 10, 14, 11, 0), False),  # 장중
+    (at(2026, 10, 14, 16, 10), at(2026, 10, 14, 16, 10), False),  # 마감 직후 (가격 캐시에 마감 전 데이터가 남아 있을 수 있음)
+    (at(2026, 10, 14, 18, 0), at(2026, 10, 14, 15, 59), False),  # 마감 전에 시작한 계산
+    (at(2026, 10, 14, 18, 0), at(2026, 10, 14, 18, 0), True),
+    (at(2026, 10, 17, 12, 0), at(2026, 10, 17, 12, 0), True),  # 주말
+])
+def test_after_close_ttl_only_for_settled_data(monkeypatch, now, started, long_ttl):
+    monkeypatch.setattr(command_cache, 'market_now', lambda: now)
+    cache = CommandCache(open_ttl=60, settle=35 * 60)
+    assert (cache.ttl(started) > 60) == long_ttl
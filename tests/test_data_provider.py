@@ -0,0 +1,61 @@
+import pandas as pd
+import pytest
+
+from data_provider import DataProvider, FixtureProvider, RecordingProvider, SyntheticProvider, make_provider
+from price_cache import PriceCache
+
+
+END = '2026-10-16'
+
+
+def split(tickers, data):
+    return PriceCache._split_frames(tickers, data)
+
+
+def test_provider_interface_is_abstract():
+    class NoNews(DataProvider):
+        def download(self, tickers, interval='1d', threads=True, **kwargs):
+            return pd.DataFrame()
+
+    with pytest.raises(TypeError):
+        DataProvider()
+    with pytest.raises(TypeError):
+        NoNews()
+
+
+def test_recorded_prices_and_news_replay_unchanged(tmp_path):
+    recorder = RecordingProvider(SyntheticProvider(end=END), str(tmp_path))
+    recorded = split(['A', 'B'], recorder.download(['A', 'B'], period='1y'))
+    recorded_news = recorder.news('A')
+
+    fixture = FixtureProvider(str(tmp_path))
+    replayed = split(['A', 'B'], fixture.download(['A', 'B'], period='1y'))
+    for ticker in ('A', 'B'):
+        pd.testing.assert_frame_equal(replayed[ticker], recorded[ticker], check_freq=False)
+    assert fixture.news('A') == recorded_news
+    assert fixture.news('C') == []
+
+
+def test_incremental_recording_keeps_the_whole_range(tmp_path):
+    recorder = RecordingProvider(SyntheticProvider(end=END), str(tmp_path))
+    recorder.download('A', period='1y')
+    recorder.download('A', period='5d')
+
+    fixture = FixtureProvider(str(tmp_path))
+    full = split(['A'], fixture.download('A', period='1y'))['A']
+    assert full.index[0] <= pd.Timestamp(END) - pd.DateOffset(years=1) + pd.Timedelta(days=3)
+    recent = split(['A'], fixture.download('A', start='2026-10-12'))['A']
+    assert list(recent.index) == list(full.index[-5:])
+
+
+def test_missing_fixture_tickers_are_left_out(tmp_path):
+    RecordingProvider(SyntheticProvider(end=END), str(tmp_path)).download('A', period='1mo')
+    data = FixtureProvider(str(tmp_path)).download(['A', 'MISSING'], period='1mo')
+    assert set(split(['A', 'MISSING'], data)) == {'A'}
+
+
+def test_make_provider_specs(tmp_path):
+    assert isinstance(make_provider('synthetic'), SyntheticProvider)
+    assert isinstance(make_provider(f'fixture:{tmp_path}'), FixtureProvider)
+    with pytest.raises(ValueError):
+        make_provider('fixture')
@@ -0,0 +1,39 @@
+import asyncio
+import threading
+
+import pytest
+
+from executor import BlockingExecutor
+
+
+def test_run_returns_result_off_the_event_loop():
+    executor = BlockingExecutor('test', max_workers=2)
+
+    async def scenario():
+        return await executor.run(lambda value, scale=1: (threading.current_thread().name, value * scale), 3, scale=2)
+
+    name, value = asyncio.run(scenario())
+    assert name.startswith('test-worker') and value == 6
+    assert executor.stats()['completed'] == 1
+    executor.shutdown()
+
+
+def test_timeout_cancels_queued_call_without_blocking_the_loop():
+    executor = BlockingExecutor('test', max_workers=1, timeout=5)
+    release = threading.Event()
+    ran = []
+
+    async def scenario():
+        busy = asyncio.ensure_future(executor.run(release.wait))
+        await asyncio.sleep(0.05)
+        with pytest.raises(asyncio.TimeoutError):
+            await executor.run(ran.append, 'queued', timeout=0.1)
+        assert not busy.done()  # 막힌 작업을 기다리는 동안에도 이벤트 루프는 계속 돎
+        release.set()
+        await busy
+
+    asyncio.run(scenario())
+    stats = executor.stats()
+    assert ran == []  # 시작하지 못한 작업은 취소됨
+    assert stats['timeouts'] == 1 and stats['queued'] == 0 and stats['max_queue_depth'] == 1
+    executor.shutdown()
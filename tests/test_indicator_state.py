@@ -0,0 +1,125 @@
+import threading
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from indicator_state import IndicatorStateStore
+
+
+@pytest.fixture
+def prices():
+    index = pd.date_range('2022-01-03', periods=400, freq='B')
+    closes = 100 * np.cumprod(1 + np.random.default_rng(1).normal(0, 0.01, len(index)))
+    return pd.DataFrame({'Close': closes}, index=index)
+
+
+@pytest.fixture
+def store(tmp_path):
+    return IndicatorStateStore(str(tmp_path / 'indicator_state.json'))
+
+
+def test_incremental_update_matches_full_recompute(store, prices):
+    store.update('nvda', prices.iloc[:300])
+    for end in range(301, 400, 7):
+        store.update('NVDA', prices.iloc[:end])
+    snapshot = store.update('NVDA', prices)
+    assert store.states['NVDA'].count == 400
+    assert store.verify('NVDA', prices)
+    assert snapshot['date'] == prices.index[-1].strftime('%Y-%m-%d')
+
+
+def test_save_and_load_round_trip(store, prices):
+    store.update('A', prices)
+    store.save()
+    loaded = IndicatorStateStore(store.path)
+    assert loaded.states['A'].snapshot() == store.states['A'].snapshot()
+
+
+def test_changed_settings_discard_saved_state(store, prices):
+    store.update('A', prices)
+    store.save()
+    assert IndicatorStateStore(store.path, windows=(10, 20)).states == {}
+
+
+def test_adjusted_history_triggers_rebuild(store, prices):
+    store.update('A', prices.iloc[:350])
+    adjusted = prices * 0.5  # 분할 등으로 과거 종가가 모두 바뀜
+    assert store.needs_rebuild('A', adjusted)
+    store.update('A', adjusted)
+    assert store.verify('A', adjusted)
+
+
+def test_needs_rebuild_only_for_new_or_non_overlapping_data(store, prices):
+    assert store.needs_rebuild('A', prices)
+    store.rebuild_many({'a': prices.iloc[:350]})
+    assert not store.needs_rebuild('A', prices)
+    assert store.needs_rebuild('A', prices.iloc[360:])
+
+
+def test_save_while_updating_from_another_thread(store, prices):
+    store.update('A', prices.iloc[:250])
+    errors = []
+
+    def save_repeatedly():
+        try:
+            for _ in range(50):
+                store.save()
+        except Exception as e:
+            errors.append(e)
+
+    saver = threading.Thread(target=save_repeatedly)
+    saver.start()
+    for end in range(251, 401):
+        store.update('A', prices.iloc[:end])
+    saver.join()
+    assert errors == []
+    store.save()
+    assert IndicatorStateStore(store.path).verify('A', prices)
+
+
+def test_empty_frame_keeps_saved_state(store, prices):
+    store.update('A', prices)
+    before = store.states['A'].snapshot()
+    with pytest.raises(ValueError):
+        store.update('A', prices.iloc[:0])
+    assert not store.needs_rebuild('A', prices.iloc[:0])
+    assert store.states['A'].snapshot() == before
+
+
+def test_updated_last_bar_replaces_instead_of_rebuilding(store, prices, monkeypatch):
+    # 장중에 받은 미완성 봉이 상태에 반영된 뒤, 같은 날 갱신되고 다음 날 확정된 종가로 바뀜
+    intraday = prices.iloc[:300].copy()
+    intraday.iloc[-1, 0] *= 1.03
+    store.update('A', intraday)
+    later = prices.iloc[:300].copy()
+    later.iloc[-1, 0] *= 0.98
+
+    def fail(*args):
+        raise AssertionError('rebuilt')
+
+    monkeypatch.setattr(store, 'rebuild', fail)
+    assert not store.needs_rebuild('A', later)
+    store.update('A', later)
+    assert store.verify('A', later)
+    snapshot = store.update('A', prices.iloc[:301])
+    assert store.verify('A', prices.iloc[:301])
+    assert snapshot['prev_close'] == pytest.approx(prices['Close'].iloc[299])
+
+
+def test_replaceable_last_bar_survives_save(store, prices):
+    partial = prices.iloc[:300].copy()
+    partial.iloc[-1, 0] *= 1.03
+    store.update('A', partial)
+    store.save()
+    loaded = IndicatorStateStore(store.path)
+    assert not loaded.needs_rebuild('A', prices.iloc[:305])
+    loaded.update('A', prices.iloc[:305])
+    assert loaded.verify('A', prices.iloc[:305])
+
+
+def test_changed_earlier_bar_still_rebuilds(store, prices):
+    store.update('A', prices.iloc[:300])
+    adjusted = prices.iloc[:300].copy()
+    adjusted.iloc[-2:, 0] *= 0.5
+    assert store.needs_rebuild('A', adjusted)
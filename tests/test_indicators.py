@@ -0,0 +1,65 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+import indicators
+
+
+@pytest.fixture
+def closes():
+    rng = np.random.default_rng(0)
+    matrix = 100 * np.cumprod(1 + rng.normal(0, 0.02, (3, 300)), axis=1)
+    matrix[1, :40] = np.nan  # 데이터가 짧은 티커
+    matrix[2, 150] = np.nan  # 중간에 빠진 봉
+    return matrix
+
+
+def test_sma_matches_pandas_rolling(closes):
+    result = indicators.sma(closes, 20)
+    for row in range(len(closes)):
+        expected = pd.Series(closes[row]).rolling(20).mean().to_numpy()
+        np.testing.assert_allclose(result[row], expected, equal_nan=True)
+
+
+def test_sma_window_longer_than_data_is_nan():
+    assert np.isnan(indicators.sma(np.ones((1, 5)), 10)).all()
+
+
+def test_ema_matches_pandas_ewm(closes):
+    result = indicators.ema(closes[:2], 12)
+    for row in range(2):
+        expected = pd.Series(closes[row]).ewm(span=12, adjust=False).mean().to_numpy()
+        np.testing.assert_allclose(result[row], expected, equal_nan=True)
+
+
+def test_rsi_matches_rolling_mean_formula(closes):
+    series = pd.Series(closes[0])
+    delta = series.diff()
+    gain = delta.where(delta > 0, 0).rolling(14).mean()
+    loss = (-delta.where(delta < 0, 0)).rolling(14).mean()
+    expected = (100 - 100 / (1 + gain / loss)).to_numpy()
+    np.testing.assert_allclose(indicators.rsi(closes[:1], 14)[0], expected, equal_nan=True)
+
+
+def test_cross_direction():
+    series = np.array([[1.0, 3.0, 3.0, 1.0]])
+    line = np.full((1, 4), 2.0)
+    assert indicators.cross_direction(series, line).tolist() == [[0, 1, 0, -1]]
+
+
+def test_close_matrix_right_aligns_short_histories():
+    index = pd.date_range('2024-01-01', periods=3)
+    frames = {
+        'A': pd.DataFrame({'Close': [1.0, 2.0, 3.0]}, index=index),
+        'B': pd.DataFrame({'Close': [5.0]}, index=index[-1:]),
+        'C': pd.DataFrame({'Close': []}),
+    }
+    matrix = indicators.close_matrix(frames, ['A', 'B', 'C'])
+    np.testing.assert_array_equal(matrix, [[1, 2, 3], [np.nan, np.nan, 5], [np.nan] * 3])
+
+
+def test_compute_returns_requested_names(closes):
+    values = indicators.compute(closes, ['sma20', 'rsi14', 'sma20'])
+    assert set(values) == {'close', 'sma20', 'rsi14'}
+    with pytest.raises(ValueError):
+        indicators.compute(closes, ['macd'])
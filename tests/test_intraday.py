@@ -0,0 +1,64 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+import intraday
+from intraday import IntradayMonitor
+from signal_rules import WATCHLIST, Rule
+
+
+SESSION = '2026-10-16'
+
+
+def daily(closes):
+    index = pd.date_range(end='2026-10-15', periods=len(closes), freq='B')
+    return pd.DataFrame({'Close': closes}, index=index)
+
+
+def minutes(closes, start='2026-10-16 09:30'):
+    index = pd.date_range(start, periods=len(closes), freq='min', tz='America/New_York')
+    return pd.DataFrame({'Close': closes}, index=index)
+
+
+@pytest.fixture
+def monitor():
+    monitor = IntradayMonitor([Rule('급등락', WATCHLIST, 'change', threshold=1)], windows=(20,), cooldown=60)
+    monitor.set_base('A', daily(np.full(30, 100.0)), SESSION)
+    return monitor
+
+
+def test_unsupported_rules_are_skipped():
+    monitor = IntradayMonitor([Rule('EMA', WATCHLIST, 'cross', line='ema12')], windows=(20,))
+    assert monitor.engine.rules == []
+
+
+def test_stale_after_session_change(monitor):
+    assert monitor.stale({'A': minutes([101.0]), 'B': minutes([1.0])}) == ['B']
+    assert monitor.stale({'A': minutes([101.0], start='2026-10-19 09:30')}) == ['A']
+
+
+def test_alert_once_per_direction_and_only_on_new_bars(monkeypatch, monitor):
+    now = [0.0]
+    monkeypatch.setattr(intraday.time, 'time', lambda: now[0])
+    watchlist = {'A'}
+    # 전일 종가 100 대비 1% 이상 오르면 알림
+    assert [(s.ticker, s.direction) for s, _ in monitor.update({'A': minutes([101.5])}, watchlist)] == [('A', 1)]
+    assert monitor.update({'A': minutes([101.5])}, watchlist) == []  # 같은 분봉은 다시 평가하지 않음
+    assert monitor.update({'A': minutes([101.5, 102.0])}, watchlist) == []  # 같은 방향은 세션당 한 번
+    # 반대 방향은 cooldown이 지난 뒤에만
+    assert monitor.update({'A': minutes([101.5, 102.0, 98.0])}, watchlist) == []
+    now[0] = 61
+    assert [s.direction for s, _ in monitor.update({'A': minutes([101.5, 102.0, 98.0, 97.5])}, watchlist)] == [-1]
+
+
+def test_straggler_gets_its_own_resume_group(monitor):
+    for ticker in ('B', 'C'):
+        monitor.set_base(ticker, daily(np.full(30, 100.0)), SESSION)
+    # C는 09:30 이후 거래가 없어 마지막 분봉이 오래됨
+    monitor.update({'A': minutes([100.0] * 61), 'B': minutes([100.0] * 63), 'C': minutes([100.0])}, {'A', 'B', 'C'})
+    groups = monitor.resume_groups(['A', 'B', 'C', 'D'])
+    assert groups == [
+        (pd.Timestamp('2026-10-16 09:30', tz='America/New_York'), ['C']),
+        (pd.Timestamp('2026-10-16 10:30', tz='America/New_York'), ['A', 'B']),
+    ]
+    assert monitor.resume_groups(['D']) == []
@@ -0,0 +1,60 @@
+import io
+import os
+import gzip
+import time
+import queue
+import logging
+from logging.handlers import QueueListener
+
+import Discord_Stock as bot
+from metrics import MetricsRegistry
+
+
+def test_deferred_handler_formats_in_listener_with_arguments_applied_at_log_time():
+    log_queue = queue.SimpleQueue()
+    stream = io.StringIO()
+    output = logging.StreamHandler(stream)
+    output.setFormatter(logging.Formatter('%(levelname)s:%(message)s'))
+    listener = QueueListener(log_queue, output)
+    logger = logging.getLogger('test_deferred_handler')
+    logger.propagate = False
+    logger.addHandler(bot.DeferredQueueHandler(log_queue))
+    try:
+        tickers = ['A']
+        logger.warning('tickers: %s', tickers)
+        tickers.append('B')  # 기록 뒤에 바뀐 인자는 메시지에 반영되지 않음
+        record = log_queue.get_nowait()
+        assert (record.msg, record.args) == ("tickers: ['A']", None)
+        log_queue.put(record)
+        listener.start()
+    finally:
+        listener.stop()
+        logger.handlers.clear()
+    assert stream.getvalue() == "WARNING:tickers: ['A']\n"
+
+
+def make_handler(tmp_path):
+    return bot.CustomTimedRotatingFileHandler(str(tmp_path / 'bot.log'), when='midnight', encoding='utf-8',
+                                              metrics=MetricsRegistry())
+
+
+def test_rollover_archives_old_logs_in_background(tmp_path):
+    handler = make_handler(tmp_path)
+    old = tmp_path / 'bot.log.20260901'
+    old.write_text('old log\n', encoding='utf-8')
+    stamp = time.time() - 15 * 86400
+    os.utime(old, (stamp, stamp))
+    recent = tmp_path / 'bot.log.20261015'
+    recent.write_text('recent log\n', encoding='utf-8')
+    try:
+        handler.emit(logging.makeLogRecord({'msg': 'sent', 'data_size': 10, 'levelname': 'INFO'}))
+        handler.doRollover()
+        handler._archiver.join(5)
+    finally:
+        handler.close()
+    archived = tmp_path / 'old_log' / 'bot.log.20260901.gz'
+    with gzip.open(archived, 'rt', encoding='utf-8') as f:
+        assert f.read() == 'old log\n'
+    assert not old.exists() and recent.exists()
+    assert abs(os.path.getmtime(archived) - stamp) < 1
+    assert '어제 전송된 총 데이터 양: 10 bytes' in (tmp_path / 'bot.log').read_text(encoding='utf-8')
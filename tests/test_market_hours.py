@@ -0,0 +1,30 @@
+from datetime import datetime
+
+import pytest
+
+from market_hours import MARKET_TZ, is_market_open, last_market_close, next_market_open, seconds_until_next_open
+
+
+def ny(*args):
+    return datetime(*args, tzinfo=MARKET_TZ)
+
+
+@pytest.mark.parametrize('now, expected', [
+    (ny(2026, 10, 16, 9, 29), False),
+    (ny(2026, 10, 16, 9, 30), True),
+    (ny(2026, 10, 16, 15, 59), True),
+    (ny(2026, 10, 16, 16, 0), False),
+    (ny(2026, 10, 17, 12, 0), False),  # 토요일
+])
+def test_is_market_open(now, expected):
+    assert is_market_open(now) is expected
+
+
+def test_next_open_and_last_close_skip_weekends():
+    friday_evening = ny(2026, 10, 16, 17, 0)
+    assert next_market_open(friday_evening) == ny(2026, 10, 19, 9, 30)
+    assert last_market_close(friday_evening) == ny(2026, 10, 16, 16, 0)
+    monday_morning = ny(2026, 10, 19, 10, 0)
+    assert next_market_open(monday_morning) == ny(2026, 10, 20, 9, 30)
+    assert last_market_close(monday_morning) == ny(2026, 10, 16, 16, 0)
+    assert seconds_until_next_open(ny(2026, 10, 19, 9, 0)) == 30 * 60
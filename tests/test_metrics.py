@@ -0,0 +1,87 @@
+import asyncio
+
+import pytest
+
+from metrics import MetricsRegistry
+
+
+def test_counter_and_histogram_render_in_prometheus_format():
+    registry = MetricsRegistry()
+    registry.counter('jobs_total', 'job runs').inc(job='news')
+    registry.counter('jobs_total').inc(2, job='news')
+    registry.histogram('latency_seconds', buckets=(0.1, 1.0)).observe(0.5)
+
+    text = registry.render()
+    assert '# HELP jobs_total job runs' in text
+    assert 'jobs_total{job="news"} 3' in text
+    assert 'latency_seconds_bucket{le="0.1"} 0' in text
+    assert 'latency_seconds_bucket{le="1.0"} 1' in text
+    assert 'latency_seconds_bucket{le="+Inf"} 1' in text
+    assert 'latency_seconds_count 1' in text
+
+
+def test_timer_records_status():
+    registry = MetricsRegistry()
+    with registry.timer('job', job='a'):
+        pass
+    with pytest.raises(ValueError):
+        with registry.timer('job', job='a'):
+            raise ValueError
+
+    total = registry.counter('job_total')
+    assert total.get(status='ok', job='a') == 1
+    assert total.get(status='error', job='a') == 1
+
+
+def test_timed_marks_cancelled_coroutines():
+    registry = MetricsRegistry()
+
+    @registry.timed('job', job='a')
+    async def job():
+        await asyncio.sleep(1)
+
+    async def run():
+        task = asyncio.create_task(job())
+        await asyncio.sleep(0)
+        task.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await task
+
+    asyncio.run(run())
+    assert registry.counter('job_total').get(status='cancelled', job='a') == 1
+
+
+def test_failing_collector_does_not_break_render():
+    registry = MetricsRegistry()
+    registry.gauge('queue').set(4)
+
+    def broken(_):
+        raise RuntimeError('boom')
+
+    registry.add_collector(broken)
+    assert 'queue 4' in registry.render()
+
+
+def test_save_and_load_round_trip(tmp_path):
+    path = str(tmp_path / 'metrics.json')
+    registry = MetricsRegistry(path)
+    registry.counter('jobs_total').inc(5, job='news')
+    registry.histogram('latency_seconds', buckets=(1.0,)).observe(0.5)
+    registry.counter('unused_total').inc()
+    registry.save()
+
+    restored = MetricsRegistry(path)
+    assert restored.counter('jobs_total').get(job='news') == 5
+    assert restored.histogram('latency_seconds', buckets=(1.0,)).values[()] == [1, 0.5, 1]
+    # 아직 등록하지 않은 지표도 다음 저장에 남음
+    restored.save()
+    assert MetricsRegistry(path).counter('unused_total').get() == 1
+
+
+def test_changed_buckets_discard_saved_histogram(tmp_path):
+    path = str(tmp_path / 'metrics.json')
+    registry = MetricsRegistry(path)
+    registry.histogram('latency_seconds', buckets=(1.0,)).observe(0.5)
+    registry.save()
+
+    assert MetricsRegistry(path).histogram('latency_seconds', buckets=(0.5, 1.0)).values == {}
@@ -0,0 +1,51 @@
+import json
+import time
+
+import pytest
+
+from news_store import SentNewsStore
+
+
+@pytest.fixture
+def store(tmp_path):
+    store = SentNewsStore(str(tmp_path / 'sent_news.db'), retention_days=7)
+    yield store
+    store.close()
+
+
+def test_added_links_are_found(store):
+    store.add_many([('https://a', time.time()), ('https://b', time.time())])
+    store.add_many([('https://a', time.time())])
+    assert 'https://a' in store and 'https://c' not in store
+    assert len(store) == 2
+
+
+def test_expire_removes_records_past_retention(store):
+    now = time.time()
+    store.add_many([('old', now - 8 * 86400), ('new', now)])
+    assert store.expire() == 1
+    assert 'old' not in store and 'new' in store
+
+
+def test_cursors_only_move_forward(store):
+    store.set_cursors({'NVDA': 200, 'AAPL': 100})
+    store.set_cursors({'NVDA': 150})
+    assert store.cursors() == {'NVDA': 200, 'AAPL': 100}
+
+
+def test_migrate_legacy_file(tmp_path, store):
+    legacy = tmp_path / 'sent_news.json'
+    legacy.write_text(json.dumps(['https://a', 'https://b']), encoding='utf-8')
+    store.migrate_legacy(str(legacy))
+    assert 'https://b' in store
+    assert not legacy.exists() and (tmp_path / 'sent_news.json.migrated').exists()
+    store.migrate_legacy(str(legacy))  # 이미 옮긴 뒤에는 아무것도 하지 않음
+
+
+def test_retries_are_kept_per_channel_until_removed(store):
+    now = time.time()
+    store.add_retries([(1, 'https://a', 'A', ['NVDA'], now), (2, 'https://a', 'A', ['NVDA'], now),
+                       (2, 'https://old', 'Old', ['AAPL'], now - 8 * 86400)])
+    store.remove_retries([(1, 'https://a')])
+    store.expire()
+    assert store.retries() == {2: {'https://a': {'tickers': ['NVDA'], 'title': 'A', 'published': int(now)}}}
@@ -0,0 +1,75 @@
+import asyncio
+
+from outbound import Outbound, pack_records, split_record
+
+
+def test_pack_records_joins_records_up_to_the_limit():
+    records = [('a' * 10, []), ('b' * 10, []), ('c' * 10, [])]
+    assert pack_records(records, limit=21) == [('a' * 10 + '\n' + 'b' * 10, []), ('c' * 10, [])]
+
+
+def test_pack_records_never_splits_a_record_that_fits():
+    records = [('a' * 15, []), ('b' * 15, [])]
+    assert [text for text, _ in pack_records(records, limit=20)] == ['a' * 15, 'b' * 15]
+
+
+def test_pack_records_limits_files_per_message():
+    records = [(str(i), [f'file{i}']) for i in range(5)]
+    messages = pack_records(records, max_files=2)
+    assert [files for _, files in messages] == [['file0', 'file1'], ['file2', 'file3'], ['file4']]
+
+
+def test_long_record_is_split_on_lines_and_files_go_with_the_last_piece():
+    text = '\n'.join(['x' * 8] * 5)
+    messages = pack_records([(text, ['chart'])], limit=20)
+    assert all(len(message) <= 20 for message, _ in messages)
+    assert '\n'.join(message for message, _ in messages) == text
+    assert [files for _, files in messages][-1] == ['chart']
+
+
+def test_split_record_keeps_words_whole():
+    pieces = split_record('링크: https://example.com/' + 'a' * 30 + ' 끝', 40)
+    assert pieces[0] == '링크:'
+    assert all(len(piece) <= 40 for piece in pieces)
+
+
+class FakeChannel:
+    id = 1
+
+    def __init__(self, fail_at=None):
+        self.sent = []
+        self.fail_at = fail_at
+
+    async def send(self, text, **kwargs):
+        if len(self.sent) == self.fail_at:
+            raise RuntimeError('send failed')
+        self.sent.append(text)
+
+
+def test_batch_flush_sends_packed_messages():
+    async def run():
+        channel = FakeChannel()
+        batch = Outbound(rate=1000, burst=1000, limit=25).batch(channel)
+        for i in range(4):
+            batch.add(f'record {i}')
+        return channel, await batch.flush()
+
+    channel, count = asyncio.run(run())
+    assert count == len(channel.sent) == 2
+    assert channel.sent[0] == 'record 0\nrecord 1'
+
+
+def test_batch_reports_records_delivered_before_a_failure():
+    async def run():
+        channel = FakeChannel(fail_at=1)
+        batch = Outbound(rate=1000, burst=1000, limit=25).batch(channel)
+        for i in range(4):
+            batch.add(f'record {i}', key=i)
+        try:
+            await batch.flush()
+        except RuntimeError:
+            pass
+        return batch
+
+    batch = asyncio.run(run())
+    assert batch.delivered == [0, 1]
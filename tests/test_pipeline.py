@@ -0,0 +1,96 @@
+import asyncio
+from datetime import datetime, timedelta
+from zoneinfo import ZoneInfo
+
+import pytest
+from apscheduler.triggers.cron import CronTrigger
+
+from pipeline import FAILED, OK, SKIPPED, JobRunStore, Pipeline, Stage, missed_fire_time
+
+
+def recorder(log, name, result=None, delay=0.0, error=None):
+    async def run(results):
+        log.append(('start', name))
+        await asyncio.sleep(delay)
+        log.append(('end', name))
+        if error is not None:
+            raise error
+        return result
+    return run
+
+
+def test_stages_run_after_dependencies_and_receive_results():
+    log = []
+    seen = {}
+
+    async def use(results):
+        seen.update(results)
+
+    pipeline = Pipeline('job', [
+        Stage('send', use, needs=('fetch', 'plan')),
+        Stage('fetch', recorder(log, 'fetch', 'prices', delay=0.01)),
+        Stage('plan', recorder(log, 'plan', 'plan')),
+    ])
+    statuses = asyncio.run(pipeline.run())
+    assert [stage.name for stage in pipeline.stages] == ['fetch', 'plan', 'send']
+    assert {name: status for name, (status, _) in statuses.items()} == {'fetch': OK, 'plan': OK, 'send': OK}
+    assert seen == {'fetch': 'prices', 'plan': 'plan'}
+    # 서로 의존하지 않는 단계는 동시에 실행됨
+    assert log[:2] == [('start', 'fetch'), ('start', 'plan')]
+
+
+def test_failed_need_skips_but_after_still_runs():
+    log = []
+    pipeline = Pipeline('job', [
+        Stage('fetch', recorder(log, 'fetch', error=RuntimeError('down'))),
+        Stage('signals', recorder(log, 'signals'), needs=('fetch',)),
+        Stage('news', recorder(log, 'news'), after=('signals',)),
+    ])
+    statuses = asyncio.run(pipeline.run())
+    assert [statuses[name][0] for name in ('fetch', 'signals', 'news')] == [FAILED, SKIPPED, OK]
+    assert ('start', 'signals') not in log
+
+
+def test_invalid_graphs_are_rejected():
+    noop = recorder([], 'noop')
+    with pytest.raises(ValueError):
+        Pipeline('job', [Stage('a', noop, needs=('b',)), Stage('b', noop, after=('a',))])
+    with pytest.raises(ValueError):
+        Pipeline('job', [Stage('a', noop, needs=('missing',))])
+    with pytest.raises(ValueError):
+        Pipeline('job', [Stage('a', noop), Stage('a', noop)])
+
+
+def test_overlapping_run_is_skipped():
+    async def run():
+        pipeline = Pipeline('job', [Stage('slow', recorder([], 'slow', delay=0.01))])
+        first = asyncio.create_task(pipeline.run())
+        await asyncio.sleep(0)
+        second = await pipeline.run()
+        return await first, second
+
+    first, second = asyncio.run(run())
+    assert first['slow'][0] == OK and second is None
+
+
+def test_missed_fire_time_coalesces_within_grace():
+    tz = ZoneInfo('Asia/Seoul')
+    trigger = CronTrigger(hour=8, minute=0, timezone=tz)
+    last = datetime(2026, 10, 13, 8, 0, tzinfo=tz)
+    now = datetime(2026, 10, 15, 9, 0, tzinfo=tz)
+    assert missed_fire_time(trigger, last, now, grace=3 * 3600) == datetime(2026, 10, 15, 8, 0, tzinfo=tz)
+    assert missed_fire_time(trigger, last, now, grace=1800) is None
+    assert missed_fire_time(trigger, None, now, grace=3600) is None
+
+
+def test_job_run_store_runs_each_scheduled_time_once(tmp_path):
+    store = JobRunStore(str(tmp_path / 'job_runs.db'))
+    scheduled = datetime(2026, 10, 15, 8, 0, tzinfo=ZoneInfo('Asia/Seoul'))
+    assert store.start('evening', scheduled)
+    assert store.last_scheduled('evening') is None  # 실행 중인 기록은 제외
+    store.finish('evening', scheduled, OK, {'fetch': OK})
+    assert not store.start('evening', scheduled)
+    assert store.last_scheduled('evening', scheduled.tzinfo) == scheduled
+    assert store.recent('evening')[0][3:] == (OK, {'fetch': OK})
+    assert store.start('evening', scheduled + timedelta(days=1))
+    store.close()
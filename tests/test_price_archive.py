@@ -0,0 +1,99 @@
+import os
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from price_archive import PriceArchive
+
+
+def bars(start, periods, offset=0.0):
+    index = pd.date_range(start, periods=periods, freq='B', tz='America/New_York')
+    close = np.arange(periods, dtype=float) + 100 + offset
+    return pd.DataFrame({'Close': close, 'Volume': np.arange(periods, dtype=np.int64)}, index=index)
+
+
+@pytest.fixture
+def archive(tmp_path):
+    return PriceArchive(str(tmp_path / 'archive'))
+
+
+def test_write_and_read_round_trip(archive):
+    data = bars('2024-01-01', 10)
+    archive.write('AAPL_1d', data)
+    read = archive.read('AAPL_1d')
+    assert read.index.equals(data.index)
+    assert read['Close'].dtype == np.float64 and read['Volume'].dtype == np.int64
+    np.testing.assert_array_equal(read['Close'], data['Close'])
+    np.testing.assert_array_equal(read['Volume'], data['Volume'])
+    assert 'AAPL_1d' in archive and archive.keys() == ['AAPL_1d']
+
+
+def test_append_new_bars_in_place(archive):
+    data = bars('2024-01-01', 20)
+    archive.write('A', data.iloc[:10])
+    archive.append('A', data.iloc[9:])  # 마지막 봉이 겹치지만 값은 같음
+    assert archive._read_meta('A')['generation'] == 0
+    np.testing.assert_array_equal(archive.read('A')['Close'], data['Close'])
+
+
+def test_append_does_not_change_arrays_already_read(archive):
+    data = bars('2024-01-01', 10)
+    archive.write('A', data)
+    before = archive.read('A')
+    snapshot = before['Close'].to_numpy().copy()
+
+    # 마지막 (미완성) 봉의 값이 바뀌면 제자리에서 덮어쓰지 않고 새 세대로 씀
+    updated = bars('2024-01-12', 3, offset=50)
+    updated.index = pd.DatetimeIndex([data.index[-1]]).append(updated.index[1:])
+    archive.append('A', updated)
+    np.testing.assert_array_equal(before['Close'].to_numpy(), snapshot)
+
+    after = archive.read('A')
+    assert len(after) == 12
+    assert after['Close'].iloc[9] == updated['Close'].iloc[0]
+    assert archive._read_meta('A')['generation'] == 1
+
+
+def test_append_with_changed_columns_rewrites(archive):
+    data = bars('2024-01-01', 5)
+    archive.write('A', data)
+    extra = bars('2024-01-08', 2).assign(Open=1.0)
+    archive.append('A', extra)
+    assert list(archive.read('A').columns) == ['Close', 'Volume', 'Open']
+
+
+def test_compact_removes_stale_generations_and_truncated_files(archive):
+    data = bars('2024-01-01', 5)
+    archive.write('A', data)
+    archive.write('A', data)  # 세대 1
+    os.makedirs(os.path.join(archive.root, 'A', '0'), exist_ok=True)  # 지우지 못한 이전 세대
+    os.makedirs(os.path.join(archive.root, 'orphan'))
+    with open(archive._file('A', 1, 'index.bin'), 'ab') as f:
+        f.write(b'\0' * 8)  # 기록 도중 중단된 덧붙이기
+    assert archive.compact() == 3
+    assert sorted(os.listdir(archive.root)) == ['A']
+    assert len(archive.read('A')) == 5
+    assert archive.compact() == 0
+
+
+def test_delete(archive):
+    archive.write('A', bars('2024-01-01', 3))
+    archive.delete('A')
+    assert archive.read('A') is None and archive.size('A') == 0
+
+
+def test_prices_keep_full_precision_and_float32_is_opt_in(tmp_path):
+    data = bars('2024-01-01', 3, offset=0.123456789)
+    exact = PriceArchive(str(tmp_path / 'exact'))
+    exact.write('A', data)
+    np.testing.assert_array_equal(exact.read('A')['Close'], data['Close'])
+
+    compact = PriceArchive(str(tmp_path / 'compact'), float_dtype='float32')
+    compact.write('A', data)
+    assert compact.read('A')['Close'].dtype == np.float32
+    # float32로 저장된 기존 아카이브도 float64 아카이브에서 덧붙이면 새 형식으로 다시 씀
+    upgraded = PriceArchive(str(tmp_path / 'compact'))
+    upgraded.append('A', bars('2024-01-01', 5, offset=0.123456789))
+    assert upgraded.read('A')['Close'].dtype == np.float64
+    assert len(upgraded.read('A')) == 5
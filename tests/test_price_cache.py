@@ -0,0 +1,130 @@
+import threading
+import time
+
+import pytest
+
+from data_provider import SyntheticProvider
+from price_cache import PriceCache
+
+
+class CountingProvider(SyntheticProvider):
+    """받은 요청의 티커 목록을 기록하고, delay초 동안 다운로드를 끌 수 있는 가상 제공자"""
+
+    def __init__(self, delay=0.0):
+        super().__init__(end='2026-10-16')
+        self.delay = delay
+        self.requests = []
+
+    def download(self, tickers, interval='1d', threads=True, **kwargs):
+        self.requests.append((sorted(tickers), interval, kwargs))
+        time.sleep(self.delay)
+        return super().download(tickers, interval=interval, threads=threads, **kwargs)
+
+
+@pytest.fixture
+def provider():
+    return CountingProvider()
+
+
+@pytest.fixture
+def cache(tmp_path, provider):
+    return PriceCache(str(tmp_path / 'price_cache'), provider=provider)
+
+
+def test_fresh_data_is_served_without_downloading(cache, provider):
+    first = cache.get_many(['aapl', 'MSFT'], period='1y')
+    assert set(first) == {'AAPL', 'MSFT'} and len(provider.requests) == 1
+    second = cache.get_many(['AAPL', 'MSFT'], period='6mo')
+    assert len(provider.requests) == 1
+    assert second['AAPL'].index[-1] == first['AAPL'].index[-1]
+
+
+def test_reopened_cache_uses_stored_index(tmp_path, cache, provider):
+    cache.get('NVDA', period='1y')
+    reopened = PriceCache(cache.cache_dir, provider=provider)
+    assert len(reopened.get('NVDA', period='1y')) == len(cache.get('NVDA', period='1y'))
+    assert len(provider.requests) == 1
+
+
+def test_concurrent_requests_for_the_same_ticker_download_once(tmp_path):
+    provider = CountingProvider(delay=0.2)
+    cache = PriceCache(str(tmp_path / 'price_cache'), provider=provider)
+    results = []
+    threads = [threading.Thread(target=lambda: results.append(cache.get('NVDA', period='1y'))) for _ in range(3)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert len(provider.requests) == 1
+    assert all(len(result) == len(results[0]) > 0 for result in results)
+
+
+def test_cache_hit_does_not_wait_for_another_download(tmp_path):
+    provider = CountingProvider()
+    cache = PriceCache(str(tmp_path / 'price_cache'), provider=provider)
+    cache.get('AAPL', period='1y')
+    provider.delay = 1.0
+    slow = threading.Thread(target=cache.get, args=('NVDA',), kwargs={'period': '1y'})
+    slow.start()
+    time.sleep(0.1)
+    started = time.perf_counter()
+    cache.get('AAPL', period='1y')
+    elapsed = time.perf_counter() - started
+    slow.join()
+    assert elapsed < 0.5
+
+
+def test_direct_download_with_start(cache, provider):
+    bars = cache.download(['AAPL'], interval='1m', period='1d')['AAPL']
+    since = bars.index[-3]
+    recent = cache.download(['AAPL'], interval='1m', start=since)['AAPL']
+    assert list(recent.index) == list(bars.index[-3:])
+    assert provider.requests[-1][2] == {'start': since}
+
+
+def test_stale_entry_downloads_only_recent_bars(tmp_path, provider):
+    cache = PriceCache(str(tmp_path / 'price_cache'), max_age=0, provider=provider)
+    first = cache.get('AAPL', period='1y')
+    refreshed = cache.get('AAPL', period='1y')
+    assert [request[2] for request in provider.requests] == [{'period': '2y'}, {'start': first.index[-2].strftime('%Y-%m-%d')}]
+    assert refreshed.index.equals(first.index)
+
+
+def test_longer_period_than_cached_downloads_full_history(cache, provider):
+    cache.get('AAPL', period='1mo')
+    long = cache.get('AAPL', period='5y')
+    assert provider.requests[-1][2] == {'period': '5y'}
+    assert long.index[0] < cache.get('AAPL', period='2y').index[0]
+    assert len(provider.requests) == 2
+
+
+def test_cache_evicts_least_recently_used_entries(tmp_path, provider):
+    cache = PriceCache(str(tmp_path / 'price_cache'), provider=provider)
+    cache.get('A', period='1y')
+    cache.max_bytes = cache.index['A_1d']['bytes']
+    cache.get('B', period='1y')
+    assert set(cache.index) == {'B_1d'}
+    cache.get('A', period='1y')
+    assert len(provider.requests) == 3
+
+
+def test_downloads_are_split_into_chunks(cache, provider):
+    prices = cache.get_many(['A', 'B', 'C', 'D', 'E'], period='1y', chunk_size=2)
+    assert [request[0] for request in provider.requests] == [['A', 'B'], ['C', 'D'], ['E']]
+    assert all(not data.empty for data in prices.values())
+
+
+def test_failed_batch_is_retried_one_ticker_at_a_time(cache, provider):
+    class BrokenBatch(CountingProvider):
+        def download(self, tickers, interval='1d', threads=True, **kwargs):
+            if len(tickers) > 1:
+                self.requests.append((sorted(tickers), interval, kwargs))
+                raise ValueError('batch failed')
+            if tickers == ['BAD']:
+                raise ValueError('no data')
+            return super().download(tickers, interval=interval, threads=threads, **kwargs)
+
+    cache.provider = BrokenBatch()
+    prices = cache.get_many(['A', 'BAD', 'C'], period='1y')
+    assert [request[0] for request in cache.provider.requests] == [['A', 'BAD', 'C'], ['A'], ['C']]
+    assert prices['BAD'].empty and not prices['A'].empty and not prices['C'].empty
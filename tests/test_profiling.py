@@ -0,0 +1,72 @@
+import os
+import time
+from collections import Counter
+
+from metrics import MetricsRegistry
+from profiling import NULL_SPAN, Profiler, summarize_spans, top_functions
+
+
+def wait_for_saved(profiler, count=1, timeout=5):
+    deadline = time.monotonic() + timeout
+    while len(profiler.recent) < count and time.monotonic() < deadline:
+        time.sleep(0.01)
+    return list(profiler.recent)
+
+
+def test_disabled_profiler_records_nothing():
+    assert Profiler(enabled=False).span('job') is NULL_SPAN
+
+
+def test_nested_timer_blocks_become_span_paths(tmp_path):
+    profiler = Profiler(directory=str(tmp_path), enabled=True, sample_interval=0, min_seconds=0)
+    registry = MetricsRegistry()
+    registry.profiler = profiler
+    with registry.timer('job', job='check_watchlist'):
+        with registry.timer('job_stage', stage='check_watchlist:fetch'):
+            pass
+
+    [(name, _, _, summary_path)] = wait_for_saved(profiler)
+    assert name == 'check_watchlist'
+    with open(summary_path, encoding='utf-8') as f:
+        summary = f.read()
+    assert 'check_watchlist/fetch' in summary
+    # 샘플링이 꺼져 있으면 접힌 스택 파일은 만들지 않음
+    assert not os.path.exists(summary_path[:-len('.txt')] + '.folded')
+
+
+def test_short_runs_are_not_saved(tmp_path):
+    profiler = Profiler(directory=str(tmp_path), enabled=True, sample_interval=0, min_seconds=10)
+    with profiler.span('job'):
+        pass
+    time.sleep(0.05)
+    assert not profiler.recent and not os.listdir(tmp_path)
+
+
+def test_sampler_collects_stacks(tmp_path):
+    profiler = Profiler(directory=str(tmp_path), enabled=True, sample_interval=0.005, min_seconds=0)
+    with profiler.span('job'):
+        time.sleep(0.1)
+
+    [(_, _, _, summary_path)] = wait_for_saved(profiler)
+    with open(summary_path[:-len('.txt')] + '.folded', encoding='utf-8') as f:
+        assert 'test_sampler_collects_stacks' in f.read()
+
+
+def test_summarize_spans_aggregates_by_path():
+    rows = summarize_spans([
+        ('job', 2.0, 1.0, 0.5, 'ok'),
+        ('job/fetch', 0.5, 0.1, None, 'ok'),
+        ('job/fetch', 1.5, 0.2, 0.1, 'error'),
+    ])
+    assert rows[0] == ('job', 1, 2.0, 2.0, 1.0, 0.5, 0)
+    path, count, wall, longest, cpu, thread_cpu, failed = rows[1]
+    assert (path, count, wall, longest, failed) == ('job/fetch', 2, 2.0, 1.5, 1)
+    assert abs(cpu - 0.3) < 1e-9 and abs(thread_cpu - 0.1) < 1e-9
+
+
+def test_top_functions_skips_idle_waits():
+    samples = Counter({
+        'MainThread;run (a.py:1);compute (a.py:10)': 3,
+        'worker;run (a.py:1);wait (threading.py:300)': 10,
+    })
+    assert top_functions(samples) == [('compute (a.py:10)', 3)]
@@ -0,0 +1,39 @@
+import time
+import asyncio
+
+from ratelimit import TokenBucket
+
+
+def test_burst_is_free_then_rate_limited():
+    bucket = TokenBucket(rate=50, capacity=5)
+    started = time.monotonic()
+    for _ in range(5):
+        bucket.acquire_blocking()
+    assert time.monotonic() - started < 0.05
+    bucket.acquire_blocking(5)  # 5개가 다시 찰 때까지 약 0.1초
+    assert time.monotonic() - started >= 0.09
+
+
+def test_request_larger_than_capacity_waits_for_a_full_bucket():
+    bucket = TokenBucket(rate=100, capacity=2)
+    bucket.acquire_blocking(2)
+    started = time.monotonic()
+    bucket.acquire_blocking(10)  # 상한까지만 기다림
+    assert 0.015 <= time.monotonic() - started < 0.5
+
+
+def test_async_acquire_does_not_block_the_loop():
+    bucket = TokenBucket(rate=20, capacity=1)
+    ticks = []
+
+    async def ticker():
+        for _ in range(5):
+            ticks.append(time.monotonic())
+            await asyncio.sleep(0.01)
+
+    async def scenario():
+        await bucket.acquire()
+        await asyncio.gather(bucket.acquire(), ticker())
+
+    asyncio.run(scenario())
+    assert len(ticks) == 5 and ticks[-1] - ticks[0] >= 0.03  # 토큰을 기다리는 동안 다른 코루틴이 실행됨
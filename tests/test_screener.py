@@ -0,0 +1,72 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+import screener
+from price_archive import PriceArchive
+
+
+def table(closes=None):
+    closes = closes or {'A': 10.0, 'B': 20.0, 'C': 30.0, 'D': np.nan}
+    tickers = list(closes)
+    columns = {
+        'close': list(closes.values()),
+        'change': [1.0, -2.0, 5.5, 0.0],
+        'rsi14': [25.0, 50.0, 75.0, np.nan],
+        'cross200': [1, 0, -1, 0],
+    }
+    return screener.ScreenerTable(pd.Timestamp('2026-10-16'), tickers, columns)
+
+
+def query(table, *tokens):
+    rows, total = table.query(table.parse_filters(tokens))
+    return [str(table.tickers[row]) for row in rows], total
+
+
+@pytest.mark.parametrize('tokens, expected', [
+    (('close>10',), ['C', 'B']),
+    (('close>=10',), ['C', 'B', 'A']),
+    (('close<30',), ['A', 'B']),
+    (('close=20',), ['B']),
+    (('rsi<30',), ['A']),
+    (('rsi>0', 'change>0'), ['C', 'A']),
+    (('cross200',), ['C', 'A']),
+    (('cross200up',), ['A']),
+    (('cross200down',), ['C']),
+])
+def test_query_filters_and_ordering(tokens, expected):
+    assert query(table(), *tokens) == (expected, len(expected))
+
+
+def test_nan_values_never_match():
+    assert query(table(), 'rsi<1000')[1] == 3
+
+
+def test_invalid_filters():
+    with pytest.raises(ValueError):
+        table().parse_filters(['macd>1'])
+    with pytest.raises(ValueError):
+        table().parse_filters(['close~1'])
+
+
+def test_save_and_load(tmp_path):
+    path = str(tmp_path / 'table.npz')
+    table().save(path)
+    loaded = screener.ScreenerTable.load(path)
+    assert loaded.date == pd.Timestamp('2026-10-16')
+    assert query(loaded, 'close>10') == (['C', 'B'], 2)
+
+
+def test_build_table_from_archive(tmp_path):
+    archive = PriceArchive(str(tmp_path / 'archive'))
+    index = pd.date_range('2025-01-01', periods=260, freq='B')
+    rising = np.linspace(50, 100, 260)
+    archive.write('UP_1d', pd.DataFrame({'Close': rising, 'Volume': np.full(260, 1000)}, index=index))
+    archive.write('STALE_1d', pd.DataFrame({'Close': rising[:-1]}, index=index[:-1]))
+    archive.write('UP_1m', pd.DataFrame({'Close': rising}, index=index))
+
+    built = screener.build_table(screener.archive_frames([archive]))
+    assert list(built.tickers) == ['UP']  # 마지막 거래일 봉이 없는 티커는 제외
+    row = built.row(0)
+    assert row['close'] == pytest.approx(100) and row['volume'] == 1000
+    assert row['sma200'] == pytest.approx(rising[-200:].mean(), rel=1e-6)
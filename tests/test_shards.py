@@ -0,0 +1,74 @@
+import os
+import asyncio
+
+import pytest
+
+from shards import ShardError, ShardPool, shard_of, shard_path
+
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def make_config(tmp_path):
+    return {
+        'provider': 'synthetic',
+        'price_cache_dir': str(tmp_path / 'price_cache'),
+        'price_cache_max_age': 3600,
+        'price_cache_max_bytes': 10 ** 8,
+        'price_cache_float_dtype': 'float64',
+        'fetch_concurrency': 2,
+        'yahoo_rate': 10 ** 9,
+        'yahoo_burst': 10 ** 9,
+        'batch_size': 50,
+        'indicator_state_file': str(tmp_path / 'indicator_state.json'),
+        'windows': (20, 60),
+        'rsi_period': 14,
+        'signal_rules_file': os.path.join(ROOT, 'signal_rules.json'),
+        'chart_cache_dir': str(tmp_path / 'charts'),
+        'chart_cache_max_files': 10,
+        'news_concurrency': 2,
+        'upstream': {},
+    }
+
+
+def test_shard_routing_is_stable():
+    assert shard_of('aapl', 4) == shard_of('AAPL', 4)
+    assert {shard_of(f'T{index}', 4) for index in range(100)} == {0, 1, 2, 3}
+    assert shard_path('data/indicator_state.json', 1) == 'data/indicator_state.shard1.json'
+
+
+def test_map_merges_shard_results_and_drops_failed_shards(tmp_path):
+    pool = ShardPool(3, make_config(tmp_path))
+    calls = {}
+
+    async def submit(shard, kind, tickers, **kwargs):
+        calls[shard] = tickers
+        if shard == 0:
+            raise ShardError('boom')
+        return {ticker: (kind, shard) for ticker in tickers}
+
+    pool.submit = submit
+    tickers = [f'T{index}' for index in range(30)]
+    merged = asyncio.run(pool.map('prices', tickers))
+    assert all(shard_of(ticker, 3) == shard for shard, group in calls.items() for ticker in group)
+    assert sorted(merged) == sorted(ticker for ticker in tickers if shard_of(ticker, 3) != 0)
+    assert all(merged[ticker] == ('prices', shard_of(ticker, 3)) for ticker in merged)
+
+
+def test_killed_worker_fails_pending_jobs_and_restarts(tmp_path):
+    pool = ShardPool(1, make_config(tmp_path), timeout=600, check_interval=0.1)
+    pool.start()
+    try:
+        async def scenario():
+            job = asyncio.ensure_future(pool.submit(0, 'refresh', ['A']))
+            await asyncio.sleep(0)  # 작업이 대기열에 들어간 뒤 워커를 종료 (워커는 아직 시작 중)
+            pool._processes[0].kill()
+            with pytest.raises(ShardError):
+                await asyncio.wait_for(job, 10)
+            assert pool.stats()['restarts'] == 1
+            return await asyncio.wait_for(pool.submit(0, 'refresh', ['A']), 60)
+
+        assert asyncio.run(scenario())['A'] > 0
+        assert pool.stats()['failed'] == 1
+    finally:
+        pool.shutdown()
@@ -0,0 +1,54 @@
+import numpy as np
+import pytest
+
+from signal_rules import WATCHLIST, Rule, RuleEngine, load_rules, snapshot_values
+
+
+def test_rule_validation():
+    with pytest.raises(ValueError):
+        Rule('bad', ['A'], 'unknown')
+    with pytest.raises(ValueError):
+        Rule('no line', ['A'], 'cross')
+    with pytest.raises(ValueError):
+        Rule('no threshold', ['A'], 'change')
+
+
+def test_bundled_rule_file_loads():
+    rules = load_rules('signal_rules.json')
+    assert RuleEngine(rules).tickers(['NVDA'])[:2] == ['TQQQ', 'SOXL']
+
+
+def test_evaluate_applies_rules_to_their_tickers_only():
+    rules = [
+        Rule('TQQQ 20MA', ['tqqq'], 'cross', line='sma20'),
+        Rule('관심종목 20MA', WATCHLIST, 'cross', line='sma20'),
+        Rule('관심종목 급등락', WATCHLIST, 'change', threshold=5),
+    ]
+    engine = RuleEngine(rules)
+    tickers = ['TQQQ', 'NVDA', 'AAPL']
+    values = {
+        'close': np.array([[9.9, 10.1], [10.1, 9.9], [9.5, 10.5]]),
+        'sma20': np.full((3, 2), 10.0),
+    }
+    signals = engine.evaluate(tickers, values, watchlist={'NVDA', 'AAPL'})
+    assert [(s.rule.name, s.direction) for s in signals['TQQQ']] == [('TQQQ 20MA', 1)]
+    assert [(s.rule.name, s.direction) for s in signals['NVDA']] == [('관심종목 20MA', -1)]
+    assert [(s.rule.name, s.direction) for s in signals['AAPL']] == [('관심종목 20MA', 1), ('관심종목 급등락', 1)]
+
+
+def test_threshold_rules():
+    engine = RuleEngine([
+        Rule('RSI 과매도', WATCHLIST, 'below', series='rsi14', threshold=30),
+        Rule('RSI 과매수', WATCHLIST, 'above', series='rsi14', threshold=70),
+    ])
+    values = {'rsi14': np.array([[40.0, 25.0], [60.0, 75.0], [50.0, 50.0]])}
+    signals = engine.evaluate(['A', 'B', 'C'], values, watchlist={'A', 'B', 'C'})
+    assert [s.direction for s in signals['A']] == [1]
+    assert [s.direction for s in signals['B']] == [-1]
+    assert signals['C'] == []
+
+
+def test_snapshot_values_uses_previous_and_latest():
+    snapshots = {'A': {'close': 11.0, 'prev_close': 9.0}}
+    values = snapshot_values(snapshots, ['A', 'MISSING'], ['close'])
+    np.testing.assert_array_equal(values['close'], [[9.0, 11.0], [np.nan, np.nan]])
@@ -0,0 +1,57 @@
+import os
+import sys
+import json
+import shutil
+import subprocess
+
+REPO_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+HEAVY_MODULES = ('pandas', 'numpy', 'matplotlib', 'yfinance', 'apscheduler')
+
+
+def run_script(cwd, script):
+    """cwd에서 봇 모듈을 처음 불러오는 새 프로세스로 script를 실행하고 마지막 줄의 JSON 반환"""
+    env = dict(os.environ, PYTHONPATH=REPO_DIR, DATA_PROVIDER='synthetic', SHARD_WORKERS='0')
+    env.pop('DISCORD_TOKEN', None)
+    result = subprocess.run([sys.executable, '-c', script], cwd=cwd, env=env, capture_output=True, text=True,
+                            encoding='utf-8', timeout=120)
+    assert result.returncode == 0, result.stderr
+    return json.loads(result.stdout.splitlines()[-1])
+
+
+def test_import_has_no_side_effects_and_defers_heavy_modules(tmp_path):
+    # 차트/샤드/백테스트 워커가 실행 파일을 다시 불러올 때도 파일을 만들거나 읽지 않아야 함 (signal_rules.json도 없음)
+    result = run_script(tmp_path, f"""
+import sys, json
+import Discord_Stock as bot
+print(json.dumps({{'heavy': [name for name in {HEAVY_MODULES!r} if name in sys.modules],
+                  'stages': list(bot.startup_timings)}}))
+""")
+    assert result == {'heavy': [], 'stages': ['import']}
+    assert os.listdir(tmp_path) == []
+
+
+def test_services_and_scheduler_start_once(tmp_path):
+    shutil.copy(os.path.join(REPO_DIR, 'signal_rules.json'), tmp_path)
+    result = run_script(tmp_path, """
+import json, asyncio
+import Discord_Stock as bot
+
+async def main():
+    bot.setup()
+    bot.METRICS_PORT = 0
+    # 게이트웨이에 다시 연결되어도 로그인 직후 단계는 한 번만 실행됨
+    await bot.setup_hook()
+    await bot.setup_hook()
+    jobs = sorted(job.id for job in bot.scheduler.get_jobs())
+    await bot.warmup_task
+    bot.catch_up_task.cancel()
+    bot.scheduler.shutdown(wait=False)
+    await bot.metrics_runner.cleanup()
+    bot.chart_renderer.shutdown()
+    return jobs
+
+jobs = asyncio.run(main())
+print(json.dumps({'jobs': jobs, 'stages': list(bot.startup_timings)}))
+""")
+    assert len(result['jobs']) == 3 and 'evening_pipeline' in result['jobs']
+    assert sorted(result['stages']) == ['import', 'login', 'services', 'warm']
@@ -0,0 +1,40 @@
+import pytest
+
+from subscriptions import SubscriptionStore, plan_tickers
+
+
+@pytest.fixture
+def store(tmp_path):
+    store = SubscriptionStore(str(tmp_path / 'subscriptions.db'))
+    yield store
+    store.close()
+
+
+def test_add_and_remove(store):
+    assert store.add('nvda', 1)
+    assert not store.add('NVDA', 1)
+    assert store.tickers_for(1) == ['NVDA']
+    assert store.remove('nvda', 1)
+    assert not store.remove('nvda', 1)
+    assert store.tickers_for(1) == []
+
+
+def test_plan_merges_channel_and_user_subscriptions(store):
+    store.add('NVDA', 1)
+    store.add('AAPL', 1, user_id=10)
+    store.add('NVDA', 1, user_id=11)
+    store.add('TSLA', 2, user_id=12)
+    plan = store.plan()
+    assert plan == {1: {'NVDA': [11], 'AAPL': [10]}, 2: {'TSLA': [12]}}
+    assert plan_tickers(plan) == ['NVDA', 'AAPL', 'TSLA']
+    assert store.tickers_for(1, None) == ['NVDA', 'AAPL']
+
+
+def test_migrate_legacy_watchlist_keeps_file_order(tmp_path, store):
+    legacy = tmp_path / 'watchlist.txt'
+    legacy.write_text('msft\nAAPL\n\nnvda\n', encoding='utf-8')
+    store.migrate_legacy(str(legacy), channel_id=7)
+    assert store.tickers_for(7) == ['MSFT', 'AAPL', 'NVDA']
+    assert not legacy.exists()
+    store.migrate_legacy(str(legacy), channel_id=7)  # 이미 옮긴 뒤에는 아무것도 하지 않음
+    assert store.stats() == {'subscriptions': 3, 'tickers': 3, 'channels': 1}
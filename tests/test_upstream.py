@@ -0,0 +1,108 @@
+import pytest
+
+import upstream
+from upstream import AdaptiveLimit, CircuitBreaker, CircuitOpenError, RateLimitedError, UpstreamClient, UpstreamError
+
+
+class FakeProvider:
+    def __init__(self, outcomes):
+        self.outcomes = list(outcomes)  # 호출마다 꺼내 쓸 결과 (예외면 발생)
+        self.calls = []
+
+    def download(self, tickers, interval='1d', threads=True, **kwargs):
+        self.calls.append(threads)
+        outcome = self.outcomes.pop(0)
+        if isinstance(outcome, Exception):
+            raise outcome
+        return outcome
+
+    def news(self, ticker):
+        return self.download([ticker])
+
+
+@pytest.fixture(autouse=True)
+def no_sleep(monkeypatch):
+    monkeypatch.setattr(upstream.time, 'sleep', lambda seconds: None)
+
+
+def test_error_classification():
+    assert upstream.is_rate_limited(RuntimeError('YFRateLimitError: Too Many Requests'))
+    assert upstream.is_transient(ConnectionError('reset'))
+    assert upstream.is_transient(RuntimeError('HTTP 503'))
+    assert not upstream.is_transient(ValueError('No data found, symbol may be delisted'))
+
+
+def test_adaptive_limit_halves_and_grows_additively():
+    limit = AdaptiveLimit(8)
+    limit.decrease()
+    assert limit.limit == 4
+    for _ in range(5):  # 성공 한 번에 1/상한씩 늘어남
+        limit.increase()
+    assert limit.limit == 5
+    for _ in range(100):
+        limit.increase()
+    assert limit.limit == 8  # 처음 상한을 넘지 않음
+    for _ in range(10):
+        limit.decrease()
+    assert limit.limit == 1
+
+
+def test_adaptive_limit_caps_granted_units():
+    limit = AdaptiveLimit(4)
+    assert limit.acquire(10) == 4
+    limit.release(4)
+
+
+def test_circuit_breaker_opens_and_half_opens(monkeypatch):
+    now = [0.0]
+    monkeypatch.setattr(upstream.time, 'monotonic', lambda: now[0])
+    breaker = CircuitBreaker(failure_threshold=2, reset_timeout=10)
+    breaker.record_failure()
+    assert breaker.allow()
+    breaker.record_failure()
+    assert breaker.state == CircuitBreaker.OPEN and not breaker.allow()
+    now[0] = 10
+    assert breaker.allow() and not breaker.allow()  # 시험 요청은 하나만
+    breaker.record_failure()
+    assert breaker.state == CircuitBreaker.OPEN
+    now[0] = 20
+    assert breaker.allow()
+    breaker.record_success()
+    assert breaker.state == CircuitBreaker.CLOSED and breaker.allow()
+
+
+def test_client_retries_transient_errors():
+    provider = FakeProvider([ConnectionError('reset'), 'data'])
+    client = UpstreamClient(provider, retries=2)
+    assert client.download(['A']) == 'data'
+    ops = client.stats()['ops']['download']
+    assert ops['ok'] == 1 and ops['failed'] == 1 and ops['retries'] == 1
+
+
+def test_client_does_not_retry_other_errors():
+    provider = FakeProvider([ValueError('bad ticker'), 'data'])
+    client = UpstreamClient(provider, retries=2)
+    with pytest.raises(ValueError):
+        client.download(['A'])
+    assert len(provider.calls) == 1
+
+
+def test_rate_limit_lowers_concurrency_and_raises_after_retries():
+    provider = FakeProvider([RuntimeError('Too Many Requests')] * 3)
+    client = UpstreamClient(provider, retries=2, concurrency=8, failure_threshold=10)
+    with pytest.raises(RateLimitedError):
+        client.download(['A'])
+    assert provider.calls == [8, 4, 2]  # 묶음 안의 다운로드 스레드 수도 함께 줄어듦
+    assert client.stats()['concurrency'] == 1
+
+
+def test_open_circuit_rejects_without_calling_provider():
+    provider = FakeProvider([ConnectionError('reset')] * 2)
+    client = UpstreamClient(provider, retries=5, failure_threshold=2, reset_timeout=60)
+    with pytest.raises(UpstreamError):
+        client.download(['A'])
+    assert len(provider.calls) == 2  # 서킷이 열리면 남은 재시도는 하지 않음
+    with pytest.raises(CircuitOpenError):
+        client.news('A')
+    assert len(provider.calls) == 2
+    assert client.stats()['ops']['news']['rejected'] == 1
@@ -0,0 +1,274 @@
+# 외부 시세/뉴스 제공자(Yahoo) 호출에 재시도, 적응형 동시 요청 수(AIMD), 서킷 브레이커를 적용하는 클라이언트
+import time
+import random
+import logging
+import threading
+from collections import deque
+
+import numpy as np
+
+
+class UpstreamError(RuntimeError):
+    """외부 제공자 호출이 일시적인 이유로 실패함 (재시도 후에도 실패하면 호출한 쪽은 캐시로 대체)"""
+
+
+class RateLimitedError(UpstreamError):
+    """요청 한도 초과 (HTTP 429)"""
+
+
+class CircuitOpenError(UpstreamError):
+    """연속 실패로 서킷이 열려 있어 요청을 보내지 않음"""
+
+
+RATE_LIMIT_MARKERS = ('Too Many Requests', 'Rate limited', 'YFRateLimitError', '429')
+TRANSIENT_MARKERS = ('timed out', 'Timeout', 'Connection', 'connection', 'curl: (', 'Failed to perform',
+                     'Temporary failure', 'Max retries', 'Remote end closed', '502', '503', '504')
+
+
+def is_rate_limited(error):
+    """예외 또는 오류 메시지가 요청 한도 초과(429)인지"""
+    if isinstance(error, RateLimitedError):
+        return True
+    text = f'{type(error).__name__}: {error}' if isinstance(error, BaseException) else str(error)
+    return any(marker in text for marker in RATE_LIMIT_MARKERS)
+
+
+def is_transient(error):
+    """재시도하면 성공할 수 있는 오류인지 (요청 한도 초과, 네트워크 오류, 일시적인 서버 오류)"""
+    if isinstance(error, UpstreamError) or isinstance(error, (OSError, TimeoutError)):
+        return True
+    text = str(error)
+    return is_rate_limited(error) or any(marker in text for marker in TRANSIENT_MARKERS)
+
+
+class AdaptiveLimit:
+    """동시에 보내는 요청 수 상한 (429 응답이면 절반으로 줄이고, 성공할 때마다 1/상한씩 늘림)"""
+
+    def __init__(self, initial, minimum=1, maximum=None):
+        self.minimum = minimum
+        self.maximum = maximum if maximum is not None else initial
+        self.value = float(initial)
+        self.in_flight = 0
+        self.decreases = 0
+        self._condition = threading.Condition()
+
+    @property
+    def limit(self):
+        return max(self.minimum, int(self.value))
+
+    def acquire(self, units=1):
+        """요청 units개를 보낼 자리를 얻을 때까지 대기하고 실제로 얻은 개수(상한 이하) 반환"""
+        with self._condition:
+            units = max(1, min(units, self.limit))
+            while self.in_flight and self.in_flight + units > self.limit:
+                self._condition.wait()
+            self.in_flight += units
+            return units
+
+    def release(self, units):
+        with self._condition:
+            self.in_flight -= units
+            self._condition.notify_all()
+
+    def increase(self):
+        with self._condition:
+            self.value = min(self.maximum, self.value + 1 / self.value)
+            self._condition.notify_all()
+
+    def decrease(self):
+        with self._condition:
+            previous = self.limit
+            self.value = max(self.minimum, self.value / 2)
+            self.decreases += 1
+        if self.limit != previous:
+            logging.warning(f'Upstream rate limited, concurrency limit {previous} -> {self.limit}')
+
+
+class CircuitBreaker:
+    """연속으로 failure_threshold번 실패하면 reset_timeout초 동안 요청을 막고(open),
+    그 뒤 요청 하나만 시험 삼아 보내(half_open) 성공하면 닫고 실패하면 다시 막음"""
+
+    CLOSED = 'closed'
+    OPEN = 'open'
+    HALF_OPEN = 'half_open'
+
+    def __init__(self, failure_threshold=5, reset_timeout=60):
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self.state = self.CLOSED
+        self.failures = 0
+        self.opened_at = 0.0
+        self.opens = 0
+        self._trial = False  # half_open 상태에서 시험 요청을 보냈는지
+        self._lock = threading.Lock()
+
+    def allow(self):
+        with self._lock:
+            if self.state == self.OPEN and time.monotonic() - self.opened_at >= self.reset_timeout:
+                self.state = self.HALF_OPEN
+                self._trial = False
+            if self.state == self.CLOSED:
+                return True
+            if self.state == self.HALF_OPEN and not self._trial:
+                self._trial = True
+                return True
+            return False
+
+    def record_success(self):
+        with self._lock:
+            if self.state != self.CLOSED:
+                logging.info('Upstream circuit closed')
+            self.state = self.CLOSED
+            self.failures = 0
+            self._trial = False
+
+    def record_failure(self):
+        with self._lock:
+            self.failures += 1
+            self._trial = False
+            if self.state == self.HALF_OPEN or (self.state == self.CLOSED and self.failures >= self.failure_threshold):
+                self.state = self.OPEN
+                self.opened_at = time.monotonic()
+                self.opens += 1
+                logging.error(f'Upstream circuit opened after {self.failures} consecutive failures, '
+                              f'blocking requests for {self.reset_timeout}s')
+
+    def retry_after(self):
+        """요청을 다시 보낼 수 있을 때까지 남은 시간(초)"""
+        with self._lock:
+            if self.state != self.OPEN:
+                return 0.0
+            return max(0.0, self.reset_timeout - (time.monotonic() - self.opened_at))
+
+
+class CallStats:
+    """호출 종류 하나의 결과별 횟수와 최근 지연 시간"""
+
+    def __init__(self, window=200):
+        self.counts = {}
+        self.retries = 0
+        self.latencies = deque(maxlen=window)
+        self.last_error = None
+        self.last_error_at = None
+        self._lock = threading.Lock()
+
+    def record(self, status, elapsed=None, error=None):
+        with self._lock:
+            self.counts[status] = self.counts.get(status, 0) + 1
+            if elapsed is not None:
+                self.latencies.append(elapsed)
+            if error is not None:
+                self.last_error = f'{type(error).__name__}: {error}'
+                self.last_error_at = time.time()
+
+    def snapshot(self):
+        with self._lock:
+            latencies = np.array(self.latencies)
+            p50, p95 = np.percentile(latencies, [50, 95]) if len(latencies) else (np.nan, np.nan)
+            return {
+                'calls': sum(self.counts.get(status, 0) for status in ('ok', 'failed', 'rate_limited', 'error')),
+                'ok': self.counts.get('ok', 0),
+                'failed': self.counts.get('failed', 0),
+                'rate_limited': self.counts.get('rate_limited', 0),
+                'error': self.counts.get('error', 0),
+                'rejected': self.counts.get('rejected', 0),
+                'retries': self.retries,
+                'p50': float(p50),
+                'p95': float(p95),
+                'last_error': self.last_error,
+                'last_error_at': self.last_error_at,
+            }
+
+
+class UpstreamClient:
+    """DataProvider를 감싸 일시적인 오류만 재시도하고 동시 요청 수 조절, 서킷 브레이커를 적용 (실패하면 UpstreamError)"""
+
+    OPS = ('download', 'news')
+
+    def __init__(self, provider, retries=3, backoff=1.0, max_backoff=30.0, concurrency=8, min_concurrency=1,
+                 failure_threshold=5, reset_timeout=60, metrics=None):
+        self.provider = provider  # 실제로 요청을 보내는 data_provider.DataProvider
+        self.retries = retries  # 첫 요청 이후 최대 재시도 횟수
+        self.backoff = backoff  # 첫 재시도 대기 시간(초), 재시도마다 두 배 (최대 max_backoff)
+        self.max_backoff = max_backoff
+        self.limit = AdaptiveLimit(concurrency, minimum=min_concurrency)
+        self.breaker = CircuitBreaker(failure_threshold, reset_timeout)
+        self.metrics = metrics  # 호출 지표를 기록할 metrics.MetricsRegistry (없으면 기록하지 않음)
+        self._stats = {op: CallStats() for op in self.OPS}
+
+    def download(self, tickers, interval='1d', threads=True, **kwargs):
+        # 묶음 요청 안의 티커 다운로드 스레드 수를 동시 요청 수로 셈 (상한이 줄면 스레드 수도 줄임)
+        units = self.limit.limit if threads is True else max(1, int(threads))
+        return self._call('download', lambda granted: self.provider.download(
+            tickers, interval=interval, threads=granted, **kwargs), units)
+
+    def news(self, ticker):
+        return self._call('news', lambda granted: self.provider.news(ticker), 1)
+
+    def _delay(self, attempt):
+        """재시도 대기 시간: 지수 백오프의 절반은 고정, 절반은 무작위 (여러 스레드가 한꺼번에 다시 보내지 않도록)"""
+        delay = min(self.max_backoff, self.backoff * 2 ** attempt)
+        return delay / 2 + random.uniform(0, delay / 2)
+
+    def _record(self, op, status, elapsed=None, error=None):
+        self._stats[op].record(status, elapsed, error)
+        if self.metrics is not None:
+            self.metrics.counter('upstream_requests_total', 'Upstream provider calls by result').inc(op=op, status=status)
+            if elapsed is not None:
+                self.metrics.histogram('upstream_request_seconds', 'Duration of one upstream provider call').observe(
+                    elapsed, op=op, status=status)
+
+    def _call(self, op, func, units):
+        for attempt in range(self.retries + 1):
+            if not self.breaker.allow():
+                self._record(op, 'rejected')
+                raise CircuitOpenError(f'연속 실패로 외부 데이터 요청을 잠시 중단했습니다 '
+                                       f'({self.breaker.retry_after():.0f}초 후 다시 시도)')
+            granted = self.limit.acquire(units)
+            started = time.perf_counter()
+            try:
+                result = func(granted)
+                error = None
+            except Exception as e:
+                error = e
+            finally:
+                self.limit.release(granted)
+            elapsed = time.perf_counter() - started
+
+            if error is None:
+                self.limit.increase()
+                self.breaker.record_success()
+                self._record(op, 'ok', elapsed)
+                return result
+            if not is_transient(error):
+                self._record(op, 'error', elapsed, error)
+                raise error
+
+            rate_limited = is_rate_limited(error)
+            if rate_limited:
+                self.limit.decrease()
+            self.breaker.record_failure()
+            self._record(op, 'rate_limited' if rate_limited else 'failed', elapsed, error)
+            # 마지막 시도였거나 이번 실패로 서킷이 열렸으면 기다리지 않고 바로 실패
+            if attempt == self.retries or self.breaker.state == CircuitBreaker.OPEN:
+                if isinstance(error, UpstreamError):
+                    raise error
+                raise (RateLimitedError if rate_limited else UpstreamError)(f'{type(error).__name__}: {error}') from error
+            delay = self._delay(attempt)
+            self._stats[op].retries += 1
+            logging.warning(f'Upstream {op} failed ({type(error).__name__}: {error}), '
+                            f'retry {attempt + 1}/{self.retries} in {delay:.1f}s')
+            time.sleep(delay)
+
+    def stats(self):
+        """{'state': 서킷 상태, 'concurrency': 현재 동시 요청 상한, 'opens': 서킷이 열린 횟수, ...,
+        'ops': {호출 종류: 결과별 횟수, 지연 시간 p50/p95, 마지막 오류}}"""
+        return {
+            'state': self.breaker.state,
+            'retry_after': self.breaker.retry_after(),
+            'opens': self.breaker.opens,
+            'concurrency': self.limit.limit,
+            'max_concurrency': self.limit.maximum,
+            'rate_limit_backoffs': self.limit.decreases,
+            'ops': {op: stats.snapshot() for op, stats in self._stats.items()},
+        }